@@ -1,5 +1,9 @@
-from azure.storage.blob import BlobServiceClient
+import requests
+from requests.adapters import HTTPAdapter
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobServiceClient, BlobPrefix, ExponentialRetry
 from app.core.config import settings
+from app.core.chat_log_writer import chat_log_path
 from app.utils.logger import get_logger
 from datetime import datetime
 import json
@@ -12,13 +16,28 @@ class AzureBlobHandler:
         try:
             self.connection_string = settings.AZURE_CONNECTION_STRING
             self.container_name = settings.AZURE_CONTAINER_NAME
-            self.service_client = BlobServiceClient.from_connection_string(self.connection_string)
+            self.service_client = BlobServiceClient.from_connection_string(
+                self.connection_string,
+                transport=self._pooled_transport(),
+                # The SDK retries 408/429/5xx itself; jitter spreads out concurrent workers' retries
+                retry_policy=ExponentialRetry(initial_backoff=2, increment_base=2,
+                                              retry_total=settings.AZURE_MAX_RETRIES, random_jitter_range=2),
+            )
             self.container_client = self.service_client.get_container_client(self.container_name)
             logger.info("✅ Azure Blob Storage client initialized successfully.")
         except Exception as e:
             logger.error(f"❌ Failed to initialize Azure Blob Storage: {e}")
             raise e
 
+    @staticmethod
+    def _pooled_transport():
+        """HTTP transport whose connection pool fits our parallel download/upload workers."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=settings.AZURE_POOL_CONNECTIONS, pool_maxsize=settings.AZURE_POOL_MAXSIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return RequestsTransport(session=session, session_owner=True)
+
     def upload_file(self, file_path: str, blob_name: str):
         """Upload a file to Azure Blob Storage."""
         try:
@@ -29,11 +48,21 @@ class AzureBlobHandler:
             logger.error(f"❌ Error uploading file to Azure Blob Storage: {e}")
             raise e
 
+    def upload_data(self, blob_name: str, data):
+        """Upload in-memory str/bytes to Azure Blob Storage (no temp file)."""
+        try:
+            self.container_client.upload_blob(name=blob_name, data=data, overwrite=True)
+            logger.info(f"✅ Uploaded data to blob: {blob_name}")
+        except Exception as e:
+            logger.error(f"❌ Error uploading data to Azure Blob Storage: {e}")
+            raise e
+
     def upload_text(self, username: str, question: str, response: str):
         """Upload chat interaction (username, question, response) to Azure Blob Storage as JSON."""
         try:
-            timestamp = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
-            blob_name = f"chat_logs/{username}_{timestamp}.json"
+            now = datetime.utcnow()
+            timestamp = now.strftime("%Y-%m-%d_%H-%M-%S")
+            blob_name = chat_log_path(f"{username}_{timestamp}.json", now)
 
             chat_record = {
                 "username": username,
@@ -49,25 +78,72 @@ class AzureBlobHandler:
             logger.error(f"❌ Failed to upload chat log: {e}")
             raise e
 
-    def list_files(self, container_name: str = None):
-        """List all blobs in a container (uses default container if not specified)."""
+    @staticmethod
+    def _blob_record(blob):
+        return {
+            "name": blob.name,
+            "etag": blob.etag,
+            "last_modified": blob.last_modified.isoformat() if blob.last_modified else None,
+            "size": blob.size,
+        }
+
+    def iter_blobs(self, prefix: str = None, container_name: str = None, exclude_prefixes=()):
+        """
+        Yield {name, etag, last_modified, size} for the blobs under `prefix`, page by page.
+
+        The prefix filter runs server-side (`name_starts_with`), so only matching blobs are
+        transferred. Virtual directories in `exclude_prefixes` (e.g. chat logs) are skipped
+        without enumerating their contents.
+        """
+        container = container_name or self.container_name
+        container_client = self.service_client.get_container_client(container)
+        if exclude_prefixes:
+            blobs = self._walk(container_client, prefix or None, tuple(exclude_prefixes))
+        else:
+            pages = container_client.list_blobs(
+                name_starts_with=prefix or None, results_per_page=settings.BLOB_LIST_PAGE_SIZE
+            ).by_page()
+            blobs = (blob for page in pages for blob in page)
+        count = 0
+        for blob in blobs:
+            count += 1
+            yield self._blob_record(blob)
+        logger.info(f"📄 Listed {count} blobs under '{prefix or ''}' in container '{container}'")
+
+    def _walk(self, container_client, prefix, exclude_prefixes):
+        """Hierarchical listing that descends into every virtual directory except the excluded ones."""
+        for item in container_client.walk_blobs(name_starts_with=prefix, delimiter="/",
+                                                results_per_page=settings.BLOB_LIST_PAGE_SIZE):
+            if isinstance(item, BlobPrefix):
+                if not item.name.startswith(exclude_prefixes):
+                    yield from self._walk(container_client, item.name, exclude_prefixes)
+            else:
+                yield item
+
+    def list_files(self, container_name: str = None, prefix: str = None):
+        """List blob names in a container (uses default container if not specified)."""
         try:
-            container = container_name or self.container_name
-            container_client = self.service_client.get_container_client(container)
-            blobs = [blob.name for blob in container_client.list_blobs()]
-            logger.info(f"📄 Found {len(blobs)} files in container '{container}'")
-            return blobs
+            return [blob["name"] for blob in self.iter_blobs(prefix, container_name)]
         except Exception as e:
+            # Never return a partial/empty list: callers would read it as "everything was deleted"
             logger.error(f"❌ Error listing blobs: {e}")
-            return []
+            raise e
+
+    def list_blob_properties(self, container_name: str = None, prefix: str = None):
+        """List blobs with the properties needed for change detection (name, ETag, last-modified, size)."""
+        try:
+            return list(self.iter_blobs(prefix, container_name))
+        except Exception as e:
+            logger.error(f"❌ Error listing blobs: {e}")
+            raise e
 
     def download_file(self, container_name: str, blob_name: str, download_path: str):
         """Download a blob to a local file."""
         try:
             container_client = self.service_client.get_container_client(container_name)
             with open(download_path, "wb") as file:
-                data = container_client.download_blob(blob_name)
-                file.write(data.readall())
+                # Stream chunk by chunk instead of buffering the whole blob with readall()
+                container_client.download_blob(blob_name).readinto(file)
             logger.info(f"✅ Downloaded blob: {blob_name} to {download_path}")
         except Exception as e:
             logger.error(f"❌ Error downloading blob: {e}")
@@ -0,0 +1,90 @@
+# app/core/blob_catalog.py
+import os
+import json
+import time
+import threading
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class BlobCatalog:
+    """
+    Locally cached listing of one container prefix: blob name → ETag, last-modified, size.
+
+    `refresh()` re-lists the prefix (paged, filtered server-side) and reports which blobs
+    were added, changed or removed since the previous listing. With a TTL, a listing younger
+    than `ttl` seconds is reused as-is, so a restart makes no list calls at all.
+    """
+
+    def __init__(self, path: str = None, ttl: float = None):
+        self.path = path if path is not None else settings.BLOB_CATALOG_PATH
+        self.ttl = settings.BLOB_CATALOG_TTL_SECONDS if ttl is None else ttl
+        self._lock = threading.RLock()
+        self._data = {"container": None, "prefix": None, "listed_at": 0.0, "blobs": {}}
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+            logger.info(f"📒 Loaded blob catalog with {len(self._data.get('blobs', {}))} blobs.")
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"⚠️ Could not read blob catalog ({e}); it will be rebuilt.")
+
+    def __len__(self):
+        return len(self._data["blobs"])
+
+    def is_fresh(self, container_name: str, prefix: str) -> bool:
+        """True when the cached listing is for this container/prefix and younger than the TTL."""
+        with self._lock:
+            return (
+                self.ttl > 0
+                and self._data["container"] == container_name
+                and self._data["prefix"] == prefix
+                and time.time() - self._data["listed_at"] < self.ttl
+            )
+
+    def records(self):
+        """Cached blob records in the same shape as AzureBlobHandler.iter_blobs."""
+        with self._lock:
+            return [{"name": name, **props} for name, props in self._data["blobs"].items()]
+
+    def refresh(self, blob_handler, container_name: str, prefix: str, exclude_prefixes=()):
+        """Re-list the prefix, replace the cached listing and return {added, changed, removed} names."""
+        blobs = {}
+        for blob in blob_handler.iter_blobs(prefix, container_name, exclude_prefixes=exclude_prefixes):
+            blobs[blob["name"]] = {key: value for key, value in blob.items() if key != "name"}
+
+        with self._lock:
+            same_scope = self._data["container"] == container_name and self._data["prefix"] == prefix
+            previous = self._data["blobs"] if same_scope else {}
+            changes = {
+                "added": [name for name in blobs if name not in previous],
+                "changed": [
+                    name for name, props in blobs.items()
+                    if name in previous and props.get("etag") != previous[name].get("etag")
+                ],
+                "removed": [name for name in previous if name not in blobs],
+            }
+            self._data = {"container": container_name, "prefix": prefix, "listed_at": time.time(), "blobs": blobs}
+            self.save()
+        logger.info(
+            f"📒 Blob catalog refreshed: {len(blobs)} blobs "
+            f"(+{len(changes['added'])} ~{len(changes['changed'])} -{len(changes['removed'])})."
+        )
+        return changes
+
+    def save(self):
+        """Write the catalog atomically."""
+        with self._lock:
+            if not self.path:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._data, f)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,248 @@
+# app/core/bm25_index.py
+import os
+import re
+import json
+import math
+import threading
+from collections import Counter
+import numpy as np
+from app.core.config import settings
+from app.core.generations import Generations
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Keeps compound identifiers intact ("LiFePO4", "NMC-811", "IEC/62133") while also
+# indexing their alphanumeric parts, so both exact codes and fragments match
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+(?:[.\-_/+][A-Za-z0-9]+)*")
+_PART_RE = re.compile(r"[A-Za-z0-9]+")
+
+
+def tokenize(text: str):
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        parts = _PART_RE.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    Local inverted-index BM25 retriever over the same chunks as the vector store.
+
+    Postings are stored on disk in CSR form: one int32 array of document rows and one
+    uint16 array of term frequencies, with a term → (offset, length) table. Documents
+    added since the last save live in a small in-memory overlay; deletes are tombstones
+    that are compacted away on `save()`. Each save is a new generation (see Generations),
+    so a query process refreshing mid-save never pairs new docs with old postings.
+    """
+
+    POSTINGS_FILE = "postings.npz"
+    DOCS_FILE = "docs.json"
+
+    def __init__(self, path: str = None, k1: float = None, b: float = None):
+        self.path = path if path is not None else settings.BM25_INDEX_PATH
+        self.k1 = k1 or settings.BM25_K1
+        self.b = b if b is not None else settings.BM25_B
+        self._lock = threading.RLock()
+        self._generations = Generations(self.path) if self.path else None
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self._ids = []               # row → vector id
+        self._metadata = []          # row → metadata (source, text, ...)
+        self._doc_len = []           # row → token count
+        self._alive = []             # row → False once deleted
+        self._id_to_row = {}
+        self._terms = {}             # term → (offset, length) into the CSR arrays
+        self._post_docs = np.empty(0, dtype=np.int32)
+        self._post_tfs = np.empty(0, dtype=np.uint16)
+        self._pending = {}           # term → [(row, tf)] added since the last save
+        self._live_count = 0
+        self._total_len = 0
+        self._dirty = False
+        self._generation = 0
+
+    # ------------------------------------------------------------------ persistence
+    def _load(self):
+        if not self._generations:
+            return
+        generation = self._generations.current()
+        # Generation 0: an index saved before generations existed sits directly in `path`
+        base = self._generations.dir(generation) if generation else self.path
+        if not os.path.exists(os.path.join(base, self.POSTINGS_FILE)):
+            return
+        with np.load(os.path.join(base, self.POSTINGS_FILE)) as data:
+            self._post_docs = data["docs"]
+            self._post_tfs = data["tfs"]
+            self._doc_len = data["doc_len"].tolist()
+        with open(os.path.join(base, self.DOCS_FILE), "r", encoding="utf-8") as f:
+            docs = json.load(f)
+        self._ids = docs["ids"]
+        self._metadata = docs["metadata"]
+        self._terms = {term: tuple(span) for term, span in docs["terms"].items()}
+        self._alive = [True] * len(self._ids)
+        self._id_to_row = {vid: row for row, vid in enumerate(self._ids)}
+        self._live_count = len(self._ids)
+        self._total_len = sum(self._doc_len)
+        self._generation = generation
+        logger.info(f"📒 Loaded BM25 index ({self._live_count} chunks, {len(self._terms)} terms).")
+
+    def refresh(self):
+        """Reload from disk if another process (e.g. ingestion) saved a newer index."""
+        with self._lock:
+            if self._dirty or not self._generations:
+                return
+            if self._generations.current() != self._generation:
+                self._reset()
+                self._load()
+
+    def save(self):
+        """Compact tombstones, merge the in-memory overlay into CSR postings and persist."""
+        with self._lock:
+            if not self._dirty:
+                return
+
+            # Old row → new row (-1 for deleted docs)
+            alive = np.asarray(self._alive, dtype=bool)
+            remap = np.full(len(alive), -1, dtype=np.int32)
+            remap[alive] = np.arange(int(alive.sum()), dtype=np.int32)
+
+            terms, docs_parts, tfs_parts, offset = {}, [], [], 0
+            for term in set(self._terms) | set(self._pending):
+                docs, tfs = self._postings(term)
+                rows = remap[docs]
+                keep = rows >= 0
+                if not keep.any():
+                    continue
+                docs_parts.append(rows[keep])
+                tfs_parts.append(tfs[keep])
+                terms[term] = (offset, int(keep.sum()))
+                offset += int(keep.sum())
+
+            self._post_docs = np.concatenate(docs_parts) if docs_parts else np.empty(0, dtype=np.int32)
+            self._post_tfs = np.concatenate(tfs_parts) if tfs_parts else np.empty(0, dtype=np.uint16)
+            self._terms = terms
+            self._pending = {}
+            self._ids = [vid for vid, ok in zip(self._ids, self._alive) if ok]
+            self._metadata = [meta for meta, ok in zip(self._metadata, self._alive) if ok]
+            self._doc_len = [n for n, ok in zip(self._doc_len, self._alive) if ok]
+            self._alive = [True] * len(self._ids)
+            self._id_to_row = {vid: row for row, vid in enumerate(self._ids)}
+
+            if self._generations:
+                os.makedirs(self.path, exist_ok=True)
+                generation, base = self._generations.prepare()
+                with open(os.path.join(base, self.DOCS_FILE), "w", encoding="utf-8") as f:
+                    json.dump({"ids": self._ids, "metadata": self._metadata, "terms": terms}, f)
+                with open(os.path.join(base, self.POSTINGS_FILE), "wb") as f:
+                    np.savez(f, docs=self._post_docs, tfs=self._post_tfs,
+                             doc_len=np.asarray(self._doc_len, dtype=np.int32))
+                self._generations.publish(generation)
+                self._generation = generation
+            self._dirty = False
+            logger.info(f"💾 Saved BM25 index ({len(self._ids)} chunks, {len(terms)} terms).")
+
+    # ------------------------------------------------------------------ writes
+    def add(self, ids, texts, metadatas=None):
+        """Index chunks (re-adding an existing id replaces it)."""
+        with self._lock:
+            self.delete([vid for vid in ids if vid in self._id_to_row])
+            for i, (vid, text) in enumerate(zip(ids, texts)):
+                counts = Counter(tokenize(text))
+                row = len(self._ids)
+                self._ids.append(vid)
+                self._metadata.append(metadatas[i] if metadatas is not None else {})
+                length = sum(counts.values())
+                self._doc_len.append(length)
+                self._alive.append(True)
+                self._id_to_row[vid] = row
+                self._live_count += 1
+                self._total_len += length
+                for term, tf in counts.items():
+                    self._pending.setdefault(term, []).append((row, min(tf, 65535)))
+            self._dirty = True
+
+    def delete(self, ids):
+        with self._lock:
+            for vid in ids:
+                row = self._id_to_row.pop(vid, None)
+                if row is None or not self._alive[row]:
+                    continue
+                self._alive[row] = False
+                self._live_count -= 1
+                self._total_len -= self._doc_len[row]
+                self._dirty = True
+
+    # ------------------------------------------------------------------ search
+    def _postings(self, term):
+        offset, length = self._terms.get(term, (0, 0))
+        docs = self._post_docs[offset:offset + length]
+        tfs = self._post_tfs[offset:offset + length]
+        extra = self._pending.get(term)
+        if extra:
+            extra_docs, extra_tfs = zip(*extra)
+            docs = np.concatenate([docs, np.asarray(extra_docs, dtype=np.int32)])
+            tfs = np.concatenate([tfs, np.asarray(extra_tfs, dtype=np.uint16)])
+        return docs, tfs
+
+    def query(self, text: str, top_k: int = 5):
+        """Return top-k matches as {"id", "score", "metadata"} dicts (same shape as vector stores)."""
+        terms = set(tokenize(text))
+        with self._lock:
+            if not terms or not self._live_count or top_k <= 0:
+                return []
+            n_rows = len(self._ids)
+            doc_len = np.asarray(self._doc_len, dtype=np.float32)
+            avg_len = self._total_len / self._live_count or 1.0
+            norm = self.k1 * (1 - self.b + self.b * doc_len / avg_len)
+            scores = np.zeros(n_rows, dtype=np.float32)
+
+            for term in terms:
+                docs, tfs = self._postings(term)
+                if not len(docs):
+                    continue
+                df = len(docs)
+                idf = math.log(1 + (self._live_count - df + 0.5) / (df + 0.5))
+                tf = tfs.astype(np.float32)
+                np.add.at(scores, docs, idf * tf * (self.k1 + 1) / (tf + norm[docs]))
+
+            scores[~np.asarray(self._alive, dtype=bool)] = 0.0
+            candidates = np.flatnonzero(scores > 0)
+            if not len(candidates):
+                return []
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [
+                {"id": self._ids[row], "score": float(scores[row]), "metadata": self._metadata[row]}
+                for row in candidates
+            ]
+
+
+def reciprocal_rank_fusion(dense, lexical, top_k: int, dense_weight: float = None,
+                           lexical_weight: float = None, k: int = None):
+    """
+    Merge two ranked match lists with weighted reciprocal-rank fusion.
+
+    Returns match dicts ordered by fused score; `dense_score` keeps the original
+    vector similarity (None for lexical-only hits).
+    """
+    dense_weight = settings.HYBRID_DENSE_WEIGHT if dense_weight is None else dense_weight
+    lexical_weight = settings.HYBRID_LEXICAL_WEIGHT if lexical_weight is None else lexical_weight
+    k = k or settings.RRF_K
+
+    fused = {}
+    for weight, matches, is_dense in ((dense_weight, dense, True), (lexical_weight, lexical, False)):
+        for rank, match in enumerate(matches, start=1):
+            entry = fused.setdefault(match["id"], {
+                "id": match["id"], "score": 0.0, "metadata": match["metadata"], "dense_score": None,
+            })
+            entry["score"] += weight / (k + rank)
+            if is_dense:
+                entry["dense_score"] = match["score"]
+    return sorted(fused.values(), key=lambda m: m["score"], reverse=True)[:top_k]
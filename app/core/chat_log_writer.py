@@ -0,0 +1,152 @@
+# app/core/chat_log_writer.py
+import os
+import json
+import queue
+import atexit
+import socket
+import threading
+import time
+from datetime import datetime
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_FLUSH = object()   # sentinel asking the writer thread to flush right away
+_STOP = object()    # sentinel asking the writer thread to flush and exit
+
+
+def chat_log_path(file_name: str, when: datetime = None) -> str:
+    """Date-partitioned chat-log blob name: <CHAT_LOG_PREFIX>YYYY/MM/DD/<file_name>."""
+    when = when or datetime.utcnow()
+    return f"{settings.CHAT_LOG_PREFIX}{when:%Y/%m/%d}/{file_name}"
+
+
+class ChatLogWriter:
+    """
+    Background chat-log persistence.
+
+    `log()` only enqueues the record; a daemon thread groups records into NDJSON shards
+    and uploads one blob per batch, either when `batch_size` records are waiting or
+    `flush_interval` seconds have passed. The buffer is bounded: when full, the
+    "drop" policy discards new records and "block" waits up to `block_timeout` seconds.
+    After a failed upload the batch is kept and retried with exponential backoff
+    (CHAT_LOG_RETRY_SECONDS doubling up to CHAT_LOG_RETRY_MAX_SECONDS) instead of on every
+    new record. Pending records are flushed at interpreter shutdown.
+    """
+
+    def __init__(self, blob_handler, batch_size: int = None, flush_interval: float = None,
+                 max_buffer: int = None, overflow_policy: str = None, block_timeout: float = None):
+        self.blob = blob_handler
+        self.batch_size = batch_size or settings.CHAT_LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.CHAT_LOG_FLUSH_SECONDS
+        self.overflow_policy = (overflow_policy or settings.CHAT_LOG_OVERFLOW_POLICY).lower()
+        self.block_timeout = block_timeout or settings.CHAT_LOG_BLOCK_TIMEOUT
+        if self.overflow_policy not in ("drop", "block"):
+            raise ValueError(f"❌ Unsupported CHAT_LOG_OVERFLOW_POLICY: {self.overflow_policy} (use 'drop' or 'block')")
+
+        self._queue = queue.Queue(maxsize=max_buffer or settings.CHAT_LOG_MAX_BUFFER)
+        self._shard_prefix = f"{socket.gethostname()}-{os.getpid()}"
+        self._seq = 0
+        self._retry_at = 0.0    # monotonic time before which no upload is attempted
+        self._backoff = 0.0
+        self._closed = False
+        self.dropped = 0
+        self.written = 0
+
+        self._thread = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        logger.info("✅ Chat log writer started.")
+
+    def log(self, username: str, question: str, response) -> bool:
+        """Queue one chat interaction; returns False if it was dropped."""
+        record = {
+            "username": username,
+            "timestamp": datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S"),
+            "question": question,
+            "response": response,
+        }
+        try:
+            if self.overflow_policy == "block":
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self._count_dropped(1)
+            logger.warning(f"⚠️ Chat log buffer full; dropped record for '{username}' ({self.dropped} dropped so far).")
+            return False
+
+    def flush(self):
+        """Ask the writer to upload whatever is buffered now (never blocks the caller)."""
+        try:
+            self._queue.put_nowait(_FLUSH)
+        except queue.Full:
+            pass   # a full buffer already makes the writer upload as soon as it can
+
+    def close(self, timeout: float = 10.0):
+        """Flush pending records and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("⚠️ Chat log buffer still full at shutdown; pending records may be lost.")
+            return
+        self._thread.join(timeout)
+
+    # ------------------------------------------------------------------ writer thread
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = _FLUSH
+
+            if item is _STOP:
+                self._write(batch)
+                return
+            if item is not _FLUSH:
+                batch.append(item)
+                if len(batch) > self._queue.maxsize:   # only while uploads keep failing
+                    del batch[0]
+                    self._count_dropped(1)
+            if (item is _FLUSH or len(batch) >= self.batch_size) and time.monotonic() >= self._retry_at:
+                batch = self._write(batch)
+                # A batch left over from a failed upload is retried once the backoff ends
+                deadline = self._retry_at if batch else time.monotonic() + self.flush_interval
+
+    def _count_dropped(self, count: int):
+        self.dropped += count
+        metrics.incr("rag_chat_logs_dropped_total", count)
+
+    def _write(self, batch):
+        """Upload one NDJSON shard; returns the records still pending (kept for retry on failure)."""
+        if not batch:
+            return []
+        self._seq += 1
+        now = datetime.utcnow()
+        blob_name = chat_log_path(f"{now:%Y-%m-%d_%H-%M-%S}_{self._shard_prefix}-{self._seq:06d}.ndjson", now)
+        data = "\n".join(json.dumps(record, ensure_ascii=False) for record in batch) + "\n"
+        try:
+            with metrics.span("chat_log_write", records=len(batch)):
+                self.blob.upload_data(blob_name, data)
+            self.written += len(batch)
+            metrics.incr("rag_chat_logs_written_total", len(batch))
+            self._backoff = 0.0
+            return []
+        except Exception as e:
+            self._backoff = min(max(self._backoff * 2, settings.CHAT_LOG_RETRY_SECONDS), settings.CHAT_LOG_RETRY_MAX_SECONDS)
+            self._retry_at = time.monotonic() + self._backoff
+            logger.error(f"❌ Failed to upload chat log shard {blob_name}: {e}; retrying in {self._backoff:.1f}s")
+            # Keep the batch for the next attempt, but never beyond the buffer bound
+            overflow = len(batch) - self._queue.maxsize
+            if overflow > 0:
+                self._count_dropped(overflow)
+                batch = batch[overflow:]
+            return batch
@@ -0,0 +1,205 @@
+# app/core/chunk_store.py
+import os
+import mmap
+import threading
+from app.core.config import settings
+from app.core.generations import Generations
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ChunkStore:
+    """
+    Local, append-only store for chunk texts, so vector metadata only has to carry ids.
+
+    - `texts.bin` holds the UTF-8 texts back to back and is memory-mapped for reads.
+    - `index.tsv` is an append-only log of `id<TAB>offset<TAB>length` lines; a length
+      of -1 marks a delete. Replaying it rebuilds the id → (offset, length) table, and
+      readers in other processes pick up new lines incrementally on `refresh()`.
+    - Chunk ids are content hashes, so re-adding an existing id is a no-op.
+    - One writer process at a time (ingestion); any number of readers.
+    - Both files live in a generation directory (see Generations). `save()` writes a new
+      generation without deleted texts once they exceed CHUNK_STORE_COMPACT_RATIO of the
+      data file; readers notice the pointer change and replay the new index from scratch,
+      so they never read offsets from one data file against another.
+    """
+
+    TEXTS_FILE = "texts.bin"
+    INDEX_FILE = "index.tsv"
+
+    def __init__(self, path: str = None):
+        self.path = path if path is not None else settings.CHUNK_STORE_PATH
+        if not self.path:
+            raise ValueError("❌ ChunkStore needs a directory (set CHUNK_STORE_PATH)")
+        os.makedirs(self.path, exist_ok=True)
+        self._generations = Generations(self.path)
+        self._lock = threading.RLock()
+        self._mmap, self._mmap_size = None, 0
+        self._reset()
+        self.refresh()
+        logger.info(f"✅ Chunk store ready ({len(self._offsets)} chunks).")
+
+    @property
+    def _texts_path(self):
+        return os.path.join(self._base, self.TEXTS_FILE)
+
+    @property
+    def _index_path(self):
+        return os.path.join(self._base, self.INDEX_FILE)
+
+    def _reset(self, generation=0):
+        self._close_mmap()
+        self._generation = generation
+        # Generation 0: a store written before generations existed sits directly in `path`
+        self._base = self._generations.dir(generation) if generation else self.path
+        self._offsets = {}      # id → (offset, length)
+        self._index_pos = 0     # bytes of index.tsv already replayed
+        self._data_size = 0     # bytes of texts.bin covered by the index
+        self._dead_bytes = 0
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, chunk_id):
+        return chunk_id in self._offsets
+
+    # ------------------------------------------------------------------ index log
+    def refresh(self):
+        """Replay index lines appended since the last call (e.g. by an ingestion process)."""
+        with self._lock:
+            generation = self._generations.current()
+            if generation != self._generation:   # compacted by another process
+                self._reset(generation)
+            try:
+                size = os.path.getsize(self._index_path)
+            except FileNotFoundError:
+                return
+            if size == self._index_pos:
+                return
+            with open(self._index_path, "rb") as f:
+                f.seek(self._index_pos)
+                data = f.read()
+            end = data.rfind(b"\n") + 1     # ignore a partially written last line
+            for line in data[:end].decode("utf-8").splitlines():
+                self._apply(*line.split("\t"))
+            self._index_pos += end
+
+    def _apply(self, chunk_id, offset, length):
+        offset, length = int(offset), int(length)
+        previous = self._offsets.pop(chunk_id, None)
+        if previous is not None:
+            self._dead_bytes += previous[1]
+        if length >= 0:
+            self._offsets[chunk_id] = (offset, length)
+            self._data_size = max(self._data_size, offset + length)
+
+    # ------------------------------------------------------------------ writes
+    def put_many(self, ids, texts):
+        """Append texts for ids not stored yet; returns how many were written."""
+        with self._lock:
+            self.refresh()
+            self._ensure_generation()
+            offset = os.path.getsize(self._texts_path) if os.path.exists(self._texts_path) else 0
+            blobs, lines = [], []
+            for chunk_id, text in zip(ids, texts):
+                if chunk_id in self._offsets:
+                    continue
+                data = text.encode("utf-8")
+                blobs.append(data)
+                lines.append(f"{chunk_id}\t{offset}\t{len(data)}\n")
+                self._offsets[chunk_id] = (offset, len(data))
+                offset += len(data)
+            if not blobs:
+                return 0
+            # Texts are on disk before the index lines that point at them
+            with open(self._texts_path, "ab") as f:
+                f.write(b"".join(blobs))
+            with open(self._index_path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+            self._index_pos = os.path.getsize(self._index_path)
+            self._data_size = offset
+            return len(blobs)
+
+    def delete(self, ids):
+        with self._lock:
+            self.refresh()
+            self._ensure_generation()
+            lines = []
+            for chunk_id in ids:
+                entry = self._offsets.pop(chunk_id, None)
+                if entry is not None:
+                    self._dead_bytes += entry[1]
+                    lines.append(f"{chunk_id}\t0\t-1\n")
+            if lines:
+                with open(self._index_path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+                self._index_pos = os.path.getsize(self._index_path)
+
+    def save(self):
+        """Compact away deleted texts when they take up too much of the data file."""
+        with self._lock:
+            if not self._data_size or self._dead_bytes / self._data_size < settings.CHUNK_STORE_COMPACT_RATIO:
+                return
+            reclaimed = self._dead_bytes
+            self._rewrite()
+            logger.info(f"🧹 Compacted chunk store ({len(self._offsets)} chunks, {reclaimed} bytes reclaimed).")
+
+    def _ensure_generation(self):
+        """Writes only go into a published generation; the first one adopts any pre-generation files."""
+        if self._generation == 0:
+            self._rewrite()
+
+    def _rewrite(self):
+        """Write the live texts into a new generation, then publish it."""
+        legacy = self._generation == 0
+        live = sorted(self._offsets.items(), key=lambda item: item[1][0])
+        texts = self.get_many([chunk_id for chunk_id, _ in live])
+        generation, base = self._generations.prepare()
+        offsets, offset, lines = {}, 0, []
+        with open(os.path.join(base, self.TEXTS_FILE), "wb") as f:
+            for chunk_id, _ in live:
+                data = texts[chunk_id].encode("utf-8")
+                f.write(data)
+                offsets[chunk_id] = (offset, len(data))
+                lines.append(f"{chunk_id}\t{offset}\t{len(data)}\n")
+                offset += len(data)
+        with open(os.path.join(base, self.INDEX_FILE), "w", encoding="utf-8") as f:
+            f.write("".join(lines))
+        self._generations.publish(generation)
+        if legacy:
+            for name in (self.TEXTS_FILE, self.INDEX_FILE):
+                if os.path.exists(os.path.join(self.path, name)):
+                    os.remove(os.path.join(self.path, name))
+        self._reset(generation)
+        self._offsets, self._data_size = offsets, offset
+        self._index_pos = os.path.getsize(self._index_path)
+
+    # ------------------------------------------------------------------ reads
+    def _close_mmap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap, self._mmap_size = None, 0
+
+    def _view(self):
+        """Read-only mapping of texts.bin, re-mapped when the file has grown or been replaced."""
+        if self._mmap is None or self._data_size > self._mmap_size:
+            self._close_mmap()
+            if not os.path.exists(self._texts_path) or not os.path.getsize(self._texts_path):
+                return None
+            with open(self._texts_path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mmap_size = len(self._mmap)
+        return self._mmap
+
+    def get_many(self, ids):
+        """id → text for the ids present in the store (read in file order for locality)."""
+        with self._lock:
+            self.refresh()
+            entries = sorted(
+                ((self._offsets[chunk_id], chunk_id) for chunk_id in set(ids) if chunk_id in self._offsets)
+            )
+            if not entries:
+                return {}
+            view = self._view()
+            return {chunk_id: view[offset:offset + length].decode("utf-8") for (offset, length), chunk_id in entries}
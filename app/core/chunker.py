@@ -1,3 +1,4 @@
+from bisect import bisect_right
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 class TextChunker:
@@ -12,6 +13,8 @@ class TextChunker:
             chunk_size (int): Number of characters per chunk (default: 800)
             chunk_overlap (int): Overlap between chunks (default: 150)
         """
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
         self.splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
@@ -27,6 +30,8 @@ class TextChunker:
             ]
         )
 
+    PAGE_SEPARATOR = "\n\n"  # same joiner TextExtractor.extract_text uses between pages
+
     def chunk_text(self, text: str):
         """Split a single document into cleaned, non-empty chunks."""
         if not text or not isinstance(text, str):
@@ -34,3 +39,88 @@ class TextChunker:
 
         chunks = self.splitter.split_text(text)
         return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+    def chunk_pages(self, pages, source: str = None, window: int = None):
+        """
+        Stream chunks from an iterator of pages, keeping memory flat for large documents.
+
+        Args:
+            pages: Iterable of (page_number, text) pairs or plain text segments
+                (segments are numbered from 1).
+            source (str): Document name recorded in each chunk's metadata.
+            window (int): Characters buffered before splitting (default: 8 × chunk_size).
+
+        Yields:
+            {"text": str, "metadata": {"source", "page_start", "page_end", "char_start", "char_end"}}
+            where character offsets refer to the pages joined with blank lines.
+        """
+        window = window or self.chunk_size * 8
+        buffer = ""
+        buffer_start = 0     # document offset of buffer[0]
+        page_offsets = []    # document offsets where each buffered page starts
+        page_numbers = []
+
+        for number, page in enumerate(pages, start=1):
+            if isinstance(page, tuple):
+                number, page = page
+            if not page or not page.strip():
+                continue
+            if buffer or page_offsets:
+                buffer += self.PAGE_SEPARATOR
+            page_offsets.append(buffer_start + len(buffer))
+            page_numbers.append(number)
+            buffer += page
+
+            while len(buffer) >= window:
+                consumed = yield from self._emit(buffer, buffer_start, page_offsets, page_numbers, source, final=False)
+                if not consumed:
+                    break
+                buffer = buffer[consumed:]
+                buffer_start += consumed
+                # Forget pages that ended before the retained tail
+                keep = max(bisect_right(page_offsets, buffer_start) - 1, 0)
+                del page_offsets[:keep], page_numbers[:keep]
+
+        if buffer.strip():
+            yield from self._emit(buffer, buffer_start, page_offsets, page_numbers, source, final=True)
+
+    def _emit(self, buffer, buffer_start, page_offsets, page_numbers, source, final):
+        """Split the buffer and yield finished chunks; returns how many chars were consumed."""
+        pieces = [piece.strip() for piece in self.splitter.split_text(buffer)]
+        located = []
+        search_from = 0
+        for piece in pieces:
+            if not piece:
+                continue
+            position = buffer.find(piece, search_from)
+            if position < 0:
+                position = search_from
+            located.append((position, piece))
+            # The next piece repeats at most `chunk_overlap` chars of this one; searching from
+            # there keeps repeated phrases from being located inside an earlier piece
+            search_from = max(position + 1, position + len(piece) - self.chunk_overlap)
+
+        # The last piece may be cut off by the window edge: keep it for the next round,
+        # so it is re-split together with the following text (overlap is preserved)
+        if not final:
+            if len(located) < 2:
+                return 0
+            tail_start = located[-1][0]
+            located = located[:-1]
+
+        for position, piece in located:
+            start = buffer_start + position
+            end = start + len(piece)
+            first = max(bisect_right(page_offsets, start) - 1, 0)
+            last = max(bisect_right(page_offsets, end - 1) - 1, 0)
+            yield {
+                "text": piece,
+                "metadata": {
+                    "source": source or "unknown",
+                    "page_start": page_numbers[first] if page_numbers else None,
+                    "page_end": page_numbers[last] if page_numbers else None,
+                    "char_start": start,
+                    "char_end": end,
+                },
+            }
+        return len(buffer) if final else tail_start
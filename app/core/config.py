@@ -16,6 +16,12 @@ class Settings:
     # Azure Storage
     AZURE_CONNECTION_STRING: str = os.getenv("AZURE_CONNECTION_STRING")
     AZURE_CONTAINER_NAME: str = os.getenv("AZURE_CONTAINER_NAME")
+    DOCUMENTS_PREFIX: str = os.getenv("DOCUMENTS_PREFIX", "")               # e.g. "documents/"; "" = container root
+    CHAT_LOG_PREFIX: str = os.getenv("CHAT_LOG_PREFIX", "chat_logs/")       # never listed during ingestion
+    BLOB_LIST_PAGE_SIZE: int = int(os.getenv("BLOB_LIST_PAGE_SIZE", "1000"))   # Azure caps pages at 5000
+    BLOB_CATALOG_ENABLED: bool = os.getenv("BLOB_CATALOG_ENABLED", "false").lower() == "true"
+    BLOB_CATALOG_PATH: str = os.getenv("BLOB_CATALOG_PATH", os.path.join(BASE_DIR, "data", "blob_catalog.json"))
+    BLOB_CATALOG_TTL_SECONDS: float = float(os.getenv("BLOB_CATALOG_TTL_SECONDS", "0"))   # >0 reuses a recent listing
 
     # Google Gemini API
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY")
@@ -24,6 +30,125 @@ class Settings:
     PINECONE_API_KEY: str = os.getenv("PINECONE_API_KEY")
     PINECONE_ENVIRONMENT: str = os.getenv("PINECONE_ENVIRONMENT")
     PINECONE_INDEX: str = os.getenv("PINECONE_INDEX")
+    PINECONE_UPSERT_BATCH_SIZE: int = int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", "100"))
+    PINECONE_POOL_THREADS: int = int(os.getenv("PINECONE_POOL_THREADS", "8"))      # concurrent requests / pooled connections
+    PINECONE_MAX_RETRIES: int = int(os.getenv("PINECONE_MAX_RETRIES", "4"))
+    PINECONE_RETRY_BASE_SECONDS: float = float(os.getenv("PINECONE_RETRY_BASE_SECONDS", "0.5"))
+
+    # Vector store backend: "pinecone" (remote) or "local" (in-process NumPy index)
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+    LOCAL_INDEX_PATH: str = os.getenv("LOCAL_INDEX_PATH", os.path.join(BASE_DIR, "data", "local_index"))
+    LOCAL_INDEX_MODE: str = os.getenv("LOCAL_INDEX_MODE", "exact").lower()   # "exact" or "ivf"
+    LOCAL_INDEX_NLIST: int = int(os.getenv("LOCAL_INDEX_NLIST", "64"))        # IVF clusters
+    LOCAL_INDEX_NPROBE: int = int(os.getenv("LOCAL_INDEX_NPROBE", "8"))       # IVF clusters scanned per query
+    LOCAL_INDEX_IVF_MIN_SIZE: int = int(os.getenv("LOCAL_INDEX_IVF_MIN_SIZE", "5000"))  # below this, search exactly
+
+    # PDF extraction
+    PDF_EXTRACTOR_BACKEND: str = os.getenv("PDF_EXTRACTOR_BACKEND", "pymupdf")      # "pymupdf" or "pypdf2"
+    PDF_PARALLEL_PAGE_THRESHOLD: int = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "100"))  # pages before going multi-process
+    PDF_EXTRACT_WORKERS: int = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+
+    # Local embedding engine
+    LOCAL_EMBEDDING_MODEL: str = os.getenv("LOCAL_EMBEDDING_MODEL", "all-mpnet-base-v2")
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")           # "torch", "int8" or "onnx"
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    EMBEDDING_PROCESSES: int = int(os.getenv("EMBEDDING_PROCESSES", "0"))      # >1 enables multi-process encoding
+
+    # Embedding cache (persistent, keyed by model + normalised text)
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_DIR: str = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(BASE_DIR, "data", "embedding_cache"))
+    EMBEDDING_CACHE_LRU_SIZE: int = int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", "10000"))
+
+    # Chunk-text store: texts live locally, vector/BM25 metadata keeps only ids and small fields
+    CHUNK_STORE_ENABLED: bool = os.getenv("CHUNK_STORE_ENABLED", "true").lower() == "true"
+    CHUNK_STORE_PATH: str = os.getenv("CHUNK_STORE_PATH", os.path.join(BASE_DIR, "data", "chunk_store"))
+    CHUNK_STORE_COMPACT_RATIO: float = float(os.getenv("CHUNK_STORE_COMPACT_RATIO", "0.3"))   # dead bytes before compaction
+
+    # Hybrid retrieval (BM25 + vectors, merged with reciprocal-rank fusion)
+    HYBRID_SEARCH: bool = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+    BM25_INDEX_PATH: str = os.getenv("BM25_INDEX_PATH", os.path.join(BASE_DIR, "data", "bm25_index"))
+    BM25_K1: float = float(os.getenv("BM25_K1", "1.2"))
+    BM25_B: float = float(os.getenv("BM25_B", "0.75"))
+    HYBRID_DENSE_WEIGHT: float = float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))
+    HYBRID_LEXICAL_WEIGHT: float = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+    HYBRID_CANDIDATE_MULTIPLIER: int = int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "2"))
+
+    # Retrieval-confidence gate (cosine similarity of the best dense match; 0 disables a side)
+    RETRIEVAL_GATE_LOW: float = float(os.getenv("RETRIEVAL_GATE_LOW", "0"))     # below → no-info answer, no LLM call
+    RETRIEVAL_GATE_HIGH: float = float(os.getenv("RETRIEVAL_GATE_HIGH", "0"))   # at/above → extractive answer, no LLM call
+    EXTRACTIVE_MAX_SENTENCES: int = int(os.getenv("EXTRACTIVE_MAX_SENTENCES", "3"))
+    EXTRACTIVE_MIN_COVERAGE: float = float(os.getenv("EXTRACTIVE_MIN_COVERAGE", "0.7"))   # share of question content words
+
+    # Prompt context assembly
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "0"))   # 0 → per-model default below
+    MODEL_CONTEXT_BUDGETS: dict = {
+        "gemini-2.0-flash": 6000,
+        "gemini-1.5-flash": 6000,
+        "gemini-1.5-pro": 12000,
+    }
+    DEFAULT_CONTEXT_BUDGET: int = 4000
+    CONTEXT_DEDUP_THRESHOLD: float = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+
+    # Async query path
+    ASYNC_EMBED_WORKERS: int = int(os.getenv("ASYNC_EMBED_WORKERS", "2"))
+    ASYNC_EMBED_TIMEOUT: float = float(os.getenv("ASYNC_EMBED_TIMEOUT", "10"))
+    ASYNC_RETRIEVE_TIMEOUT: float = float(os.getenv("ASYNC_RETRIEVE_TIMEOUT", "10"))
+    ASYNC_LLM_TIMEOUT: float = float(os.getenv("ASYNC_LLM_TIMEOUT", "60"))
+
+    # Batch querying (offline evaluation / bulk Q&A)
+    QUERY_BATCH_WINDOW: int = int(os.getenv("QUERY_BATCH_WINDOW", "256"))                 # questions embedded per encode call
+    QUERY_BATCH_RETRIEVE_WORKERS: int = int(os.getenv("QUERY_BATCH_RETRIEVE_WORKERS", "8"))  # concurrent remote vector queries
+    QUERY_BATCH_LLM_CONCURRENCY: int = int(os.getenv("QUERY_BATCH_LLM_CONCURRENCY", "4"))
+
+    # Query cache (exact LRU + semantic tier)
+    QUERY_CACHE_ENABLED: bool = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+    QUERY_CACHE_SIZE: int = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+    QUERY_CACHE_TTL_SECONDS: float = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+    SEMANTIC_CACHE_SIZE: int = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))       # 0 disables the semantic tier
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
+    # Query admission control (coalescing, per-user fair queue, load shedding)
+    SCHEDULER_MAX_CONCURRENCY: int = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "4"))   # questions executing at once
+    SCHEDULER_MAX_QUEUE: int = int(os.getenv("SCHEDULER_MAX_QUEUE", "64"))
+    SCHEDULER_QUEUE_DEADLINE_SECONDS: float = float(os.getenv("SCHEDULER_QUEUE_DEADLINE_SECONDS", "10"))
+
+    # Chat-log persistence (background NDJSON shards)
+    CHAT_LOG_BATCH_SIZE: int = int(os.getenv("CHAT_LOG_BATCH_SIZE", "50"))
+    CHAT_LOG_FLUSH_SECONDS: float = float(os.getenv("CHAT_LOG_FLUSH_SECONDS", "10"))
+    CHAT_LOG_MAX_BUFFER: int = int(os.getenv("CHAT_LOG_MAX_BUFFER", "10000"))
+    CHAT_LOG_OVERFLOW_POLICY: str = os.getenv("CHAT_LOG_OVERFLOW_POLICY", "drop")   # "drop" or "block"
+    CHAT_LOG_BLOCK_TIMEOUT: float = float(os.getenv("CHAT_LOG_BLOCK_TIMEOUT", "0.5"))
+    CHAT_LOG_RETRY_SECONDS: float = float(os.getenv("CHAT_LOG_RETRY_SECONDS", "1"))        # first backoff after a failed upload
+    CHAT_LOG_RETRY_MAX_SECONDS: float = float(os.getenv("CHAT_LOG_RETRY_MAX_SECONDS", "60"))  # backoff doubles up to this
+
+    # Provider resilience: token-bucket rate limits, jittered retries, circuit breakers, pools
+    GEMINI_RATE_LIMIT_PER_SECOND: float = float(os.getenv("GEMINI_RATE_LIMIT_PER_SECOND", "0"))  # 0 = unlimited
+    GEMINI_RATE_LIMIT_BURST: float = float(os.getenv("GEMINI_RATE_LIMIT_BURST", "0"))             # 0 = same as rate
+    GEMINI_MAX_RETRIES: int = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+    GEMINI_RETRY_BASE_SECONDS: float = float(os.getenv("GEMINI_RETRY_BASE_SECONDS", "1.0"))
+    PINECONE_RATE_LIMIT_PER_SECOND: float = float(os.getenv("PINECONE_RATE_LIMIT_PER_SECOND", "0"))
+    PINECONE_RATE_LIMIT_BURST: float = float(os.getenv("PINECONE_RATE_LIMIT_BURST", "0"))
+    RETRY_MAX_SECONDS: float = float(os.getenv("RETRY_MAX_SECONDS", "20"))                 # cap on a single backoff
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))      # consecutive failures to open
+    CIRCUIT_RESET_SECONDS: float = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))         # open → half-open after this
+    AZURE_MAX_RETRIES: int = int(os.getenv("AZURE_MAX_RETRIES", "5"))
+    AZURE_POOL_CONNECTIONS: int = int(os.getenv("AZURE_POOL_CONNECTIONS", "10"))           # distinct hosts kept pooled
+    AZURE_POOL_MAXSIZE: int = int(os.getenv("AZURE_POOL_MAXSIZE", "32"))                   # connections per host
+
+    # Metrics / tracing
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_JSON_LOGS: bool = os.getenv("METRICS_JSON_LOGS", "false").lower() == "true"   # one JSON log line per span
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "0"))      # >0 serves /metrics over HTTP
+    METRICS_HOST: str = os.getenv("METRICS_HOST", "0.0.0.0")
+
+    # Ingestion
+    INGEST_MANIFEST_PATH: str = os.getenv("INGEST_MANIFEST_PATH", os.path.join(BASE_DIR, "data", "ingest_manifest.json"))
+    INGEST_DOWNLOAD_WORKERS: int = int(os.getenv("INGEST_DOWNLOAD_WORKERS", "4"))
+    INGEST_EXTRACT_WORKERS: int = int(os.getenv("INGEST_EXTRACT_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+    INGEST_UPSERT_WORKERS: int = int(os.getenv("INGEST_UPSERT_WORKERS", "4"))
+    INGEST_EMBED_BATCH_SIZE: int = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", "8"))   # max items buffered between stages
 
     # Model Configuration
     EMBEDDING_MODEL: str = "models/embedding-001"      # Recommended embedding model
@@ -0,0 +1,171 @@
+# app/core/context_builder.py
+import re
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class ContextBuilder:
+    """
+    Assembles the LLM context from retrieved matches:
+
+    1. merges chunks of the same source that overlap or touch (by char offsets, or by
+       a shared suffix/prefix for vectors stored without offsets),
+    2. drops near-duplicates (word-trigram Jaccard ≥ `dedup_threshold`, or containment),
+    3. orders by retrieval score and keeps chunks until the token budget is spent.
+    """
+
+    CHARS_PER_TOKEN = 4      # rough Gemini average; avoids a count_tokens round trip
+    MIN_TEXT_OVERLAP = 40    # chars of shared suffix/prefix needed to merge without offsets
+
+    def __init__(self, token_budget: int = None, dedup_threshold: float = None):
+        self.token_budget = token_budget or self.budget_for(settings.GENERATIVE_MODEL)
+        self.dedup_threshold = dedup_threshold or settings.CONTEXT_DEDUP_THRESHOLD
+
+    @staticmethod
+    def budget_for(model: str) -> int:
+        """Context token budget: CONTEXT_TOKEN_BUDGET if set, else the per-model default."""
+        if settings.CONTEXT_TOKEN_BUDGET:
+            return settings.CONTEXT_TOKEN_BUDGET
+        return settings.MODEL_CONTEXT_BUDGETS.get(model, settings.DEFAULT_CONTEXT_BUDGET)
+
+    def estimate_tokens(self, text: str) -> int:
+        return len(text) // self.CHARS_PER_TOKEN + 1
+
+    # ------------------------------------------------------------------ pipeline
+    def build(self, matches):
+        """Return (context string, list of passages used) for the given matches."""
+        passages = [self._passage(match) for match in matches]
+        passages = [p for p in passages if p["text"].strip()]
+        before = len(passages)
+
+        passages = self._merge_adjacent(passages)
+        passages = self._dedupe(sorted(passages, key=lambda p: p["score"], reverse=True))
+
+        context_parts, used, spent = [], [], 0
+        for passage in passages:
+            block = self._format(passage)
+            cost = self.estimate_tokens(block)
+            if spent + cost > self.token_budget:
+                if used:
+                    continue  # a smaller passage further down may still fit
+                # Always send something: truncate the best passage to the budget
+                block = block[: self.token_budget * self.CHARS_PER_TOKEN]
+                cost = self.token_budget
+            context_parts.append(block)
+            used.append(passage)
+            spent += cost
+
+        logger.info(f"🧩 Context: {before} matches → {len(used)} passages, ~{spent}/{self.token_budget} tokens.")
+        return "".join(context_parts), used
+
+    @staticmethod
+    def _passage(match):
+        metadata = match["metadata"]
+        return {
+            "source": metadata.get("source", "unknown"),
+            "text": metadata.get("text", ""),
+            "score": match["score"],
+            "page_start": metadata.get("page_start"),
+            "page_end": metadata.get("page_end"),
+            "char_start": metadata.get("char_start"),
+            "char_end": metadata.get("char_end"),
+        }
+
+    @staticmethod
+    def _format(passage) -> str:
+        label = passage["source"]
+        if passage["page_start"] is not None:
+            pages = passage["page_start"]
+            if passage["page_end"] not in (None, passage["page_start"]):
+                pages = f"{passage['page_start']}-{passage['page_end']}"
+            label += f", page {pages}"
+        return f"[Document: {label}]\n{passage['text']}\n\n"
+
+    def _merge_adjacent(self, passages):
+        by_source = {}
+        for passage in passages:
+            by_source.setdefault(passage["source"], []).append(passage)
+
+        merged = []
+        for group in by_source.values():
+            with_offsets = sorted((p for p in group if p["char_start"] is not None), key=lambda p: p["char_start"])
+            without = [p for p in group if p["char_start"] is None]
+
+            current = None
+            for passage in with_offsets:
+                if current is not None and passage["char_start"] <= current["char_end"] + 2:
+                    current = self._splice(current, passage)
+                else:
+                    if current is not None:
+                        merged.append(current)
+                    current = dict(passage)
+            if current is not None:
+                merged.append(current)
+
+            merged.extend(self._merge_by_text(without))
+        return merged
+
+    @staticmethod
+    def _splice(left, right):
+        """Join two offset-annotated passages, dropping the overlapping characters."""
+        if right["char_end"] <= left["char_end"]:
+            text = left["text"]
+        else:
+            skip = max(left["char_end"] - right["char_start"], 0)
+            joiner = "" if skip else "\n"
+            text = left["text"] + joiner + right["text"][skip:]
+        page_ends = [p for p in (left["page_end"], right["page_end"]) if p is not None]
+        return {
+            **left,
+            "text": text,
+            "score": max(left["score"], right["score"]),
+            "page_end": max(page_ends) if page_ends else None,
+            "char_end": max(left["char_end"], right["char_end"]),
+        }
+
+    def _merge_by_text(self, passages):
+        """Merge passages whose text overlaps end-to-start (legacy vectors without offsets)."""
+        result = []
+        for passage in passages:
+            for i, kept in enumerate(result):
+                joined = self._join_overlap(kept["text"], passage["text"]) or self._join_overlap(passage["text"], kept["text"])
+                if joined:
+                    result[i] = {**kept, "text": joined, "score": max(kept["score"], passage["score"])}
+                    break
+            else:
+                result.append(dict(passage))
+        return result
+
+    def _join_overlap(self, left: str, right: str):
+        max_overlap = min(len(left), len(right), 1000)
+        for size in range(max_overlap, self.MIN_TEXT_OVERLAP - 1, -1):
+            if left.endswith(right[:size]):
+                return left + right[size:]
+        return None
+
+    def _dedupe(self, passages):
+        kept, kept_shingles = [], []
+        for passage in passages:
+            shingles = self._shingles(passage["text"])
+            duplicate = False
+            for other, other_shingles in zip(kept, kept_shingles):
+                if passage["text"] in other["text"]:
+                    duplicate = True
+                elif shingles and other_shingles:
+                    jaccard = len(shingles & other_shingles) / len(shingles | other_shingles)
+                    duplicate = jaccard >= self.dedup_threshold
+                if duplicate:
+                    break
+            if not duplicate:
+                kept.append(passage)
+                kept_shingles.append(shingles)
+        return kept
+
+    @staticmethod
+    def _shingles(text: str):
+        words = _WORD_RE.findall(text.lower())
+        return {tuple(words[i:i + 3]) for i in range(len(words) - 2)}
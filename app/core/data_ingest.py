@@ -3,6 +3,7 @@ import os
 from app.core.azure_blob import AzureBlobHandler
 from app.core.text_extractor import TextExtractor
 from app.core.chunker import TextChunker
+from app.core.config import settings
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -20,7 +21,9 @@ class DataIngestor:
         try:
             logger.info(f"📄 Processing file: {local_file_path}")
             
-            # Upload to Azure
+            # Upload to Azure, under the prefix that ingestion lists
+            if not blob_name.startswith(settings.DOCUMENTS_PREFIX):
+                blob_name = settings.DOCUMENTS_PREFIX + blob_name
             self.blob_handler.upload_file(local_file_path, blob_name)
 
             # Extract text
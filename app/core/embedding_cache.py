@@ -0,0 +1,160 @@
+# app/core/embedding_cache.py
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-writer assumption
+    fcntl = None
+
+logger = get_logger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model name, hash of normalised text).
+
+    On disk, per model:
+        entries.bin  append-only fixed-size records: 20-byte SHA-1 digest + float32 vector,
+                     memory-mapped for reads
+        meta.json    vector dimension
+
+    Key and vector share one record, so a torn write can only leave a partial record at the
+    end, which is ignored and cut off before the next append. An in-memory LRU of recently
+    used vectors sits on top; `put_many(..., persist=False)` only fills the LRU (for query
+    texts, which unlike chunk texts are unbounded).
+    """
+
+    KEY_BYTES = 20
+
+    def __init__(self, model_name: str, cache_dir: str = None, lru_size: int = None):
+        self.model_name = model_name
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.path = os.path.join(cache_dir or settings.EMBEDDING_CACHE_DIR, slug)
+        self.lru_size = lru_size or settings.EMBEDDING_CACHE_LRU_SIZE
+
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()   # key → float32 vector
+        self._rows = {}             # key → record number in entries.bin
+        self._dim = None
+        self._mmap = None
+        self._mmap_rows = 0
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    @property
+    def _entries_path(self):
+        return os.path.join(self.path, "entries.bin")
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    @property
+    def _record_dtype(self):
+        return np.dtype([("key", f"S{self.KEY_BYTES}"), ("vector", "<f4", (self._dim,))])
+
+    def _load(self):
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            self._dim = json.load(f)["dim"]
+        records = self._records()
+        if records is not None:
+            # A trailing partial record (torn write) is simply not covered by the map
+            self._rows = {bytes(key).hex(): row for row, key in enumerate(records["key"])}
+        logger.info(f"📒 Loaded embedding cache for {self.model_name} ({len(self._rows)} vectors).")
+
+    def _records(self):
+        """Memory map over the complete records in entries.bin (None when there are none)."""
+        if not os.path.exists(self._entries_path):
+            return None
+        rows = os.path.getsize(self._entries_path) // self._record_dtype.itemsize
+        if not rows:
+            return None
+        return np.memmap(self._entries_path, dtype=self._record_dtype, mode="r", shape=(rows,))
+
+    def key(self, text: str) -> str:
+        normalized = re.sub(r"\s+", " ", text).strip()
+        return hashlib.sha1(f"{self.model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _read_row(self, row: int):
+        if self._mmap is None or row >= self._mmap_rows:
+            self._mmap = self._records()
+            self._mmap_rows = len(self._mmap)
+        return np.array(self._mmap[row]["vector"])
+
+    def _remember(self, key, vector):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, texts):
+        """Return a list aligned with `texts`: a float32 vector on hit, None on miss."""
+        results = []
+        with self._lock:
+            for text in texts:
+                key = self.key(text)
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                elif key in self._rows:
+                    vector = self._read_row(self._rows[key])
+                    self._remember(key, vector)
+                results.append(vector)
+            hits = sum(v is not None for v in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, texts, vectors, persist: bool = True):
+        """Store newly computed vectors (rows of a 2-D array) for `texts`; `persist=False` keeps them in memory only."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            new_keys, new_rows = [], []
+            for text, vector in zip(texts, vectors):
+                key = self.key(text)
+                self._remember(key, vector)
+                if persist and key not in self._rows and key not in new_keys:
+                    new_keys.append(key)
+                    new_rows.append(vector)
+            if new_keys:
+                self._append(new_keys, np.stack(new_rows))
+
+    def _append(self, keys, rows):
+        os.makedirs(self.path, exist_ok=True)
+        if self._dim is None:
+            self._dim = rows.shape[1]
+            with open(self._meta_path, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model_name, "dim": self._dim}, f)
+
+        records = np.empty(len(keys), dtype=self._record_dtype)
+        records["key"] = [bytes.fromhex(k) for k in keys]
+        records["vector"] = rows
+        with open(self._entries_path, "ab") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # Record numbers come from the file size so concurrent writers stay consistent;
+                # a partial record left by a crashed writer is cut off first
+                size = f.seek(0, os.SEEK_END)
+                first_row, torn = divmod(size, records.itemsize)
+                if torn:
+                    f.truncate(first_row * records.itemsize)
+                f.write(records.tobytes())
+                f.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+        for offset, key in enumerate(keys):
+            self._rows[key] = first_row + offset
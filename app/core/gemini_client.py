@@ -1,18 +1,27 @@
 # app/core/gemini_client.py
 import google.generativeai as genai
 from app.core.config import settings
+from app.core.resilience import get_policy
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 class GeminiClient:
-    """Handles text embedding and generation using Gemini."""
+    """
+    Handles text embedding and generation using Gemini.
+
+    One GenerativeModel (and with it one transport channel) is reused for every call,
+    and each request goes through the shared "gemini" resilience policy: token-bucket
+    rate limit, circuit breaker and jittered retry on 429/5xx.
+    """
 
     def __init__(self):
         try:
             genai.configure(api_key=settings.GOOGLE_API_KEY)
             self.embed_model = settings.EMBEDDING_MODEL
             self.gen_model = settings.GENERATIVE_MODEL
+            self.model = genai.GenerativeModel(self.gen_model)
+            self.policy = get_policy("gemini")
             logger.info("✅ Gemini client initialized successfully.")
         except Exception as e:
             logger.error(f"❌ Failed to initialize Gemini client: {e}")
@@ -21,7 +30,9 @@ class GeminiClient:
     def get_embedding(self, text: str):
         """Generate embeddings for text using Gemini."""
         try:
-            response = genai.embed_content(model=self.embed_model, content=text)
+            response = self.policy.call(
+                lambda: genai.embed_content(model=self.embed_model, content=text), "Gemini embedding"
+            )
             embedding = response["embedding"]
             return embedding
         except Exception as e:
@@ -31,13 +42,36 @@ class GeminiClient:
     def generate_text(self, prompt: str):
         """Generate text response using Gemini."""
         try:
-            model = genai.GenerativeModel(self.gen_model)
-            response = model.generate_content(prompt)
+            response = self.policy.call(lambda: self.model.generate_content(prompt), "Gemini generation")
             return response.text
         except Exception as e:
             logger.error(f"❌ Failed to generate text: {e}")
             raise e
 
+    async def agenerate_text(self, prompt: str):
+        """Async text generation (does not block the event loop)."""
+        try:
+            response = await self.policy.acall(
+                lambda: self.model.generate_content_async(prompt), "Gemini generation"
+            )
+            return response.text
+        except Exception as e:
+            logger.error(f"❌ Failed to generate text: {e}")
+            raise e
+
+    def generate_text_stream(self, prompt: str):
+        """Generate text with Gemini, yielding partial text as tokens arrive."""
+        try:
+            # Only opening the stream is retried; a failure mid-answer is surfaced as-is
+            stream = self.policy.call(lambda: self.model.generate_content(prompt, stream=True), "Gemini stream")
+            for chunk in stream:
+                # Safety-filtered or empty chunks carry no parts, and .text raises on them
+                if chunk.parts:
+                    yield chunk.text
+        except Exception as e:
+            logger.error(f"❌ Failed to stream text: {e}")
+            raise e
+
     def generate_response(self, prompt: str):
         """Wrapper for compatibility with RAG pipeline."""
         return self.generate_text(prompt)
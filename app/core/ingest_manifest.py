@@ -0,0 +1,134 @@
+# app/core/ingest_manifest.py
+import os
+import json
+import hashlib
+import threading
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def chunk_hash(text: str) -> str:
+    """
+    Stable content hash for a chunk of text. Location metadata (pages, offsets) is left out
+    on purpose: an edit early in a document shifts every later offset, and those chunks
+    must keep their ids and vectors.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(file_name: str, content_hash: str) -> str:
+    """Vector id derived from the blob name and chunk content (stable across re-ingestion)."""
+    return f"{file_name or 'chunk'}-{content_hash[:16]}"
+
+
+class IngestionManifest:
+    """
+    Persisted record of what has been ingested: per blob its ETag, last-modified
+    time, the content hashes of the chunks currently stored in the vector index and
+    their location metadata (so moved chunks get new metadata without re-embedding).
+
+    `version` is bumped every time a save follows a change, so readers (e.g. caches)
+    can tell when the index contents moved.
+    """
+
+    def __init__(self, path: str = None, embedding_model: str = None):
+        self.path = path if path is not None else settings.INGEST_MANIFEST_PATH
+        self.embedding_model = embedding_model
+        self._lock = threading.RLock()
+        self._data = {"version": 0, "embedding_model": embedding_model, "blobs": {}}
+        self._changed = False
+        self._mtime = None
+        self._load()
+
+        # A different embedding model invalidates every stored vector
+        stored_model = self._data.get("embedding_model")
+        if embedding_model and stored_model and stored_model != embedding_model:
+            logger.warning(f"⚠️ Embedding model changed ({stored_model} → {embedding_model}); forcing full re-ingestion.")
+            for record in self._data["blobs"].values():
+                record["etag"] = None
+                record["last_modified"] = None
+                # Chunk ids don't depend on the model, so stored hashes must not count as "already embedded"
+                record["reembed"] = True
+            self._data["embedding_model"] = embedding_model
+            self._changed = True
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+            self._mtime = os.path.getmtime(self.path)
+            logger.info(f"📒 Loaded ingestion manifest with {len(self._data.get('blobs', {}))} blobs.")
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"⚠️ Could not read ingestion manifest ({e}); starting fresh.")
+
+    @property
+    def version(self) -> int:
+        """Current index version (re-read if another process rewrote the manifest)."""
+        with self._lock:
+            if self.path and os.path.exists(self.path) and not self._changed:
+                mtime = os.path.getmtime(self.path)
+                if mtime != self._mtime:
+                    self._load()
+            return self._data.get("version", 0)
+
+    def blob_names(self):
+        with self._lock:
+            return list(self._data["blobs"].keys())
+
+    def is_unchanged(self, blob_name: str, etag: str, last_modified: str) -> bool:
+        """True when the blob was ingested before and neither its ETag nor mtime moved."""
+        record = self._data["blobs"].get(blob_name)
+        if not record or not record.get("etag"):
+            return False
+        return record["etag"] == etag and record.get("last_modified") == last_modified
+
+    def chunk_hashes(self, blob_name: str) -> dict:
+        """Mapping of vector id → chunk hash currently stored for the blob."""
+        record = self._data["blobs"].get(blob_name)
+        return dict(record["chunks"]) if record else {}
+
+    def chunk_locations(self, blob_name: str) -> dict:
+        """Mapping of vector id → location metadata stored with that vector."""
+        record = self._data["blobs"].get(blob_name)
+        return dict(record.get("locations") or {}) if record else {}
+
+    def needs_reembed(self, blob_name: str) -> bool:
+        """True when the blob's stored vectors were made by a different embedding model."""
+        record = self._data["blobs"].get(blob_name)
+        return bool(record and record.get("reembed"))
+
+    def update(self, blob_name: str, etag: str, last_modified: str, chunks: dict, locations: dict = None):
+        with self._lock:
+            self._data["blobs"][blob_name] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "chunks": chunks,
+                "locations": locations or {},
+            }
+            self._changed = True
+
+    def remove(self, blob_name: str):
+        with self._lock:
+            if self._data["blobs"].pop(blob_name, None) is not None:
+                self._changed = True
+
+    def save(self):
+        """Write the manifest atomically, bumping the version if anything changed."""
+        with self._lock:
+            if not self._changed or not self.path:
+                return
+            self._data["version"] = self._data.get("version", 0) + 1
+            self._data["embedding_model"] = self.embedding_model or self._data.get("embedding_model")
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._data, f)
+            os.replace(tmp_path, self.path)
+            self._mtime = os.path.getmtime(self.path)
+            self._changed = False
+            logger.info(f"💾 Saved ingestion manifest (version {self._data['version']}).")
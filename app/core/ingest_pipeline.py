@@ -0,0 +1,336 @@
+# app/core/ingest_pipeline.py
+import os
+import multiprocessing
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.ingest_manifest import chunk_hash, chunk_id
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_DONE = object()  # end-of-stream marker passed between stages
+
+# Per-process chunker, built once in each extraction worker
+_worker_chunker = None
+
+
+def _extract_chunks(path: str, file_name: str, chunk_size: int, chunk_overlap: int):
+    """Process-pool task: stream pages from a downloaded blob file into chunks with page/offset metadata."""
+    global _worker_chunker
+    from app.core.text_extractor import TextExtractor
+    from app.core.chunker import TextChunker
+
+    if _worker_chunker is None or (_worker_chunker.chunk_size, _worker_chunker.chunk_overlap) != (chunk_size, chunk_overlap):
+        _worker_chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    # Already inside a pool worker, so no nested per-page process pool
+    pages = TextExtractor.iter_pages(path, file_name=file_name, parallel=False)
+    return list(_worker_chunker.chunk_pages(pages, source=file_name))
+
+
+class IngestionPipeline:
+    """
+    Staged producer/consumer ingestion:
+
+        download (threads) → extract + chunk (processes) → embed (one thread, cross-file
+        batches) → upsert (threads)
+
+    Stages are connected by bounded queues, so a slow stage applies back-pressure
+    upstream and memory stays bounded. A file is recorded in the manifest, and its
+    lexical-index changes applied, only once all of its new vectors are upserted and
+    its stale vectors deleted; a file that fails has its partial writes rolled back.
+    """
+
+    def __init__(self, rag, download_workers: int = None, extract_workers: int = None,
+                 upsert_workers: int = None, embed_batch_size: int = None, queue_size: int = None):
+        self.rag = rag
+        self.download_workers = download_workers or settings.INGEST_DOWNLOAD_WORKERS
+        self.extract_workers = extract_workers or settings.INGEST_EXTRACT_WORKERS
+        self.upsert_workers = upsert_workers or settings.INGEST_UPSERT_WORKERS
+        self.embed_batch_size = embed_batch_size or settings.INGEST_EMBED_BATCH_SIZE
+        self.queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+
+        self._lock = threading.Lock()
+        self._files = {}        # blob name → per-file sync state
+        self._failed = set()
+        self._discarded = {}    # failed blob name → ids whose late upserts must be undone
+        self._stage_time = {}   # stage → summed busy seconds
+
+    # ------------------------------------------------------------------ driver
+    def run(self, container_name: str, blobs):
+        """Ingest the given blob property dicts; returns the set of blob names that failed."""
+        blobs = list(blobs)
+        if not blobs:
+            return set()
+
+        self.container_name = container_name
+        started = time.perf_counter()
+
+        pending_q = queue.Queue()
+        for blob in blobs:
+            pending_q.put(blob)
+        pending_q.put(_DONE)
+
+        downloaded_q = queue.Queue(maxsize=self.queue_size)
+        chunked_q = queue.Queue(maxsize=self.queue_size)
+        upsert_q = queue.Queue(maxsize=self.queue_size)
+
+        # "spawn" avoids forking a process that already runs stage threads
+        mp_context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.extract_workers, mp_context=mp_context) as pool:
+            self._pool = pool
+            threads = []
+            threads += self._stage("download", self._download, pending_q, downloaded_q, self.download_workers)
+            threads += self._stage("extract", self._extract, downloaded_q, chunked_q, self.extract_workers)
+            embed_thread = threading.Thread(target=self._embed_loop, args=(chunked_q, upsert_q), daemon=True)
+            embed_thread.start()
+            threads.append(embed_thread)
+            threads += self._stage("upsert", self._upsert, upsert_q, None, self.upsert_workers)
+            for t in threads:
+                t.join()
+
+        elapsed = time.perf_counter() - started
+        breakdown = ", ".join(f"{name}={secs:.1f}s" for name, secs in self._stage_time.items())
+        logger.info(
+            f"🏁 Ingested {len(blobs) - len(self._failed)}/{len(blobs)} files in {elapsed:.1f}s "
+            f"(stage busy time: {breakdown})"
+        )
+        return set(self._failed)
+
+    def _stage(self, name, fn, in_q, out_q, workers):
+        """Start `workers` threads applying `fn` to items of `in_q`; forward results to `out_q`."""
+        remaining = [workers]
+
+        def worker():
+            while True:
+                item = in_q.get()
+                if item is _DONE:
+                    in_q.put(_DONE)  # let sibling workers see it too
+                    break
+                t0 = time.perf_counter()
+                try:
+                    result = fn(item)
+                except Exception as e:
+                    self._fail(item, name, e)
+                    result = None
+                self._timed(name, t0)
+                if result is not None and out_q is not None:
+                    out_q.put(result)
+
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and out_q is not None:
+                out_q.put(_DONE)
+
+        threads = [threading.Thread(target=worker, name=f"ingest-{name}-{i}", daemon=True) for i in range(workers)]
+        for t in threads:
+            t.start()
+        return threads
+
+    def _timed(self, stage, t0):
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            self._stage_time[stage] = self._stage_time.get(stage, 0.0) + elapsed
+        metrics.observe(f"ingest_{stage}", elapsed)
+
+    def _fail(self, item, stage, error):
+        if isinstance(item, dict):          # download stage: blob properties
+            names = [item["name"]]
+        elif isinstance(item, tuple):       # extract stage: (blob, path)
+            names = [item[0]["name"]]
+        else:                               # embed/upsert stage: rows of (file, id, ...)
+            names = sorted({row[0] for row in item})
+        with self._lock:
+            states = {}
+            for name in names:
+                self._failed.add(name)
+                state = self._files.pop(name, None)
+                if state is not None:
+                    states[name] = state
+                    self._discarded[name] = set(state["added_ids"])
+        for name in names:
+            logger.error(f"❌ Error processing file {name} during {stage}: {error}")
+        for name, state in states.items():
+            self._rollback(name, state["added_ids"])
+
+    def _rollback(self, file, ids):
+        """Remove a failed file's new vectors and texts, so every store still matches the manifest."""
+        if not ids:
+            return
+        try:
+            self.rag.vectorstore.delete(ids)
+            if self.rag.chunk_store is not None:
+                self.rag.chunk_store.delete(ids)
+            logger.info(f"↩️ Rolled back {len(ids)} new chunks of {file}.")
+        except Exception as e:
+            logger.error(f"❌ Could not roll back {file}: {e}")
+
+    # ------------------------------------------------------------------ stages
+    def _download(self, blob):
+        """Stream the blob into a temp file; only its path crosses the process boundary."""
+        logger.info(f"📄 Processing file: {blob['name']}")
+        fd, path = tempfile.mkstemp(prefix="ingest_", suffix=os.path.splitext(blob["name"])[1])
+        os.close(fd)
+        try:
+            self.rag.blob.download_file(self.container_name, blob["name"], path)
+        except Exception:
+            os.remove(path)
+            raise
+        return blob, path
+
+    def _extract(self, item):
+        blob, path = item
+        chunker = self.rag.chunker
+        try:
+            chunks = self._pool.submit(
+                _extract_chunks, path, blob["name"], chunker.chunk_size, chunker.chunk_overlap
+            ).result()
+        finally:
+            os.remove(path)
+        metrics.incr("rag_ingest_chunks_total", len(chunks))
+        logger.info(f"✅ Created {len(chunks)} chunks from {blob['name']}")
+        return blob, chunks
+
+    def _embed_loop(self, in_q, out_q):
+        """Diff chunks against the manifest and embed new ones in fixed-size, cross-file batches."""
+        batch = []  # (file, vector id, chunk)
+        while True:
+            try:
+                item = in_q.get(timeout=0.5)
+            except queue.Empty:
+                item = None
+            if item is _DONE:
+                break
+            if item is not None:
+                try:
+                    batch.extend(self._plan_file(*item))
+                except Exception as e:
+                    self._fail(item, "plan", e)
+            # Flush full batches; flush a partial one when upstream goes quiet
+            while len(batch) >= self.embed_batch_size or (item is None and batch):
+                self._embed_batch(batch[: self.embed_batch_size], out_q)
+                batch = batch[self.embed_batch_size:]
+
+        while batch:
+            self._embed_batch(batch[: self.embed_batch_size], out_q)
+            batch = batch[self.embed_batch_size:]
+        out_q.put(_DONE)
+
+    def _plan_file(self, blob, chunks):
+        file = blob["name"]
+        hashes = {}
+        current = {}
+        for chunk in chunks:
+            digest = chunk_hash(chunk["text"])
+            vid = chunk_id(file, digest)
+            if vid not in current:
+                current[vid] = chunk
+                hashes[vid] = digest
+
+        previous = self.rag.manifest.chunk_hashes(file)
+        locations = self.rag.manifest.chunk_locations(file)
+        # After an embedding-model change every chunk is re-embedded (same ids, overwritten in place)
+        reusable = {} if self.rag.manifest.needs_reembed(file) else previous
+        new_ids = [vid for vid in current if vid not in reusable]
+        # Unchanged text at a new position (e.g. after an edit earlier in the document): metadata only
+        moved_ids = [vid for vid in current if vid in reusable and locations.get(vid) != current[vid]["metadata"]]
+        state = {
+            "blob": blob,
+            "hashes": hashes,
+            # Ids the previous version did not have: what a failure has to remove again
+            "added_ids": [vid for vid in new_ids if vid not in previous],
+            "locations": {vid: chunk["metadata"] for vid, chunk in current.items()},
+            "moved_ids": moved_ids,
+            "stale_ids": [vid for vid in previous if vid not in current],
+            "remaining": len(new_ids),
+            "embedded": len(new_ids),
+        }
+        # Postings are applied in _finish_file, together with the manifest update
+        store = self.rag.chunk_store
+        if self.rag.lexical:
+            indexed = new_ids + moved_ids
+            metadatas = [{"source": file, **current[vid]["metadata"]} for vid in indexed]
+            if store is None:
+                for vid, metadata in zip(indexed, metadatas):
+                    metadata["text"] = current[vid]["text"]
+            state["postings"] = (indexed, [current[vid]["text"] for vid in indexed], metadatas)
+        with self._lock:
+            self._files[file] = state
+
+        # Texts reach the chunk store before any vector or posting can point at them
+        if store is not None:
+            store.put_many(new_ids, [current[vid]["text"] for vid in new_ids])
+        if not new_ids:
+            self._finish_file(file)
+        return [(file, vid, current[vid]) for vid in new_ids]
+
+    def _embed_batch(self, batch, out_q):
+        t0 = time.perf_counter()
+        try:
+            embeddings = self.rag.embedder.embed([chunk["text"] for _, _, chunk in batch])
+        except Exception as e:
+            self._fail(batch, "embed", e)
+            return
+        finally:
+            self._timed("embed", t0)
+        out_q.put([(file, vid, chunk, emb) for (file, vid, chunk), emb in zip(batch, embeddings)])
+
+    def _upsert(self, batch):
+        # Group the cross-file batch back into per-file upserts
+        by_file = {}
+        for file, vid, chunk, emb in batch:
+            by_file.setdefault(file, []).append((vid, chunk, emb))
+        for file, rows in by_file.items():
+            with self._lock:
+                if file not in self._files:
+                    continue  # an earlier batch of this file failed
+            ids, chunks, embs = zip(*rows)
+            self.rag.vectorstore.upsert_embeddings(
+                [chunk["text"] for chunk in chunks], list(embs), file_name=file, ids=list(ids),
+                metadatas=[chunk["metadata"] for chunk in chunks],
+            )
+            metrics.incr("rag_vectors_upserted_total", len(rows))
+            with self._lock:
+                state = self._files.get(file)
+                discarded = self._discarded.get(file, ())
+            if state is None:
+                # The file failed while this batch was in flight: undo it as well
+                self._rollback(file, [vid for vid in ids if vid in discarded])
+                continue
+            with self._lock:
+                state["remaining"] -= len(rows)
+                done = state["remaining"] == 0
+            if done:
+                self._finish_file(file)
+        return None
+
+    def _finish_file(self, file):
+        with self._lock:
+            state = self._files.pop(file, None)
+        if state is None:
+            return
+        if state["moved_ids"]:
+            self.rag.vectorstore.update_metadata(
+                state["moved_ids"], [state["locations"][vid] for vid in state["moved_ids"]]
+            )
+        if state["stale_ids"]:
+            self.rag.vectorstore.delete(state["stale_ids"])
+            metrics.incr("rag_vectors_deleted_total", len(state["stale_ids"]))
+            if self.rag.chunk_store is not None:
+                self.rag.chunk_store.delete(state["stale_ids"])
+        lexical = self.rag.lexical
+        if lexical:
+            lexical.delete(state["stale_ids"])
+            lexical.add(*state["postings"])
+        blob = state["blob"]
+        self.rag.manifest.update(file, blob["etag"], blob["last_modified"], state["hashes"], state["locations"])
+        logger.info(
+            f"🧠 Synced {file}: {state['embedded']} embedded, {len(state['moved_ids'])} moved, "
+            f"{len(state['stale_ids'])} deleted, "
+            f"{len(state['hashes']) - state['embedded'] - len(state['moved_ids'])} unchanged"
+        )
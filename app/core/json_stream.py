@@ -0,0 +1,89 @@
+# app/core/json_stream.py
+import re
+import string
+
+_ANSWER_KEY_RE = re.compile(r'"answer"\s*:\s*"')
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def _is_hex(text: str) -> bool:
+    return all(ch in string.hexdigits for ch in text)
+
+
+class IncrementalJSONParser:
+    """
+    Incrementally parse a streamed LLM response shaped like {"answer": "...", ...}.
+
+    `feed()` returns the newly decoded characters of the "answer" string as soon as they
+    arrive, so the UI can render partial answers; `text` is the full buffer for the final
+    parse in RAGPipeline._parse_response.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = None      # index of the next undecoded char inside the answer string
+        self._done = False    # closing quote of the answer seen
+
+    def feed(self, text: str) -> str:
+        """Append a streamed chunk; return the new answer text it completes (may be empty)."""
+        self._buffer += text
+        if self._done:
+            return ""
+
+        if self._pos is None:
+            match = _ANSWER_KEY_RE.search(self._buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        out = []
+        buf = self._buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self._done = True
+                i += 1
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            # Escape sequence: wait for the rest of it to arrive
+            if i + 1 >= len(buf):
+                break
+            code = buf[i + 1]
+            if code == "u":
+                if not _is_hex(buf[i + 2:i + 6]):
+                    # Malformed escape: replace the "\u" and decode what follows as plain text
+                    out.append("\ufffd")
+                    i += 2
+                    continue
+                if i + 6 > len(buf):
+                    break
+                unit = int(buf[i + 2:i + 6], 16)
+                if 0xD800 <= unit < 0xDC00:
+                    # High surrogate: characters outside the BMP (e.g. emoji) arrive as a \uD8xx\uDCxx pair
+                    if i + 12 > len(buf) and "\\u".startswith(buf[i + 6:i + 8]) and _is_hex(buf[i + 8:i + 12]):
+                        break   # the low half may still be on its way
+                    if (buf[i + 6:i + 8] == "\\u" and _is_hex(buf[i + 8:i + 12])
+                            and 0xDC00 <= int(buf[i + 8:i + 12], 16) < 0xE000):
+                        low = int(buf[i + 8:i + 12], 16)
+                        out.append(chr(0x10000 + ((unit - 0xD800) << 10) + (low - 0xDC00)))
+                        i += 12
+                        continue
+                    out.append("\ufffd")
+                elif 0xDC00 <= unit < 0xE000:
+                    out.append("\ufffd")   # low surrogate without its high half
+                else:
+                    out.append(chr(unit))
+                i += 6
+            else:
+                out.append(_ESCAPES.get(code, code))
+                i += 2
+        self._pos = i
+        return "".join(out)
+
+    @property
+    def text(self) -> str:
+        return self._buffer
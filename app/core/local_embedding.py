@@ -1,23 +1,124 @@
 # app/core/local_embedding.py
-from sentence_transformers import SentenceTransformer
+import atexit
+from app.core.config import settings
+from app.core.embedding_cache import EmbeddingCache
+import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
 
 class LocalEmbedding:
-    """Wrapper for SentenceTransformer embedding model."""
+    """
+    Wrapper for SentenceTransformer embedding model, tuned for CPU throughput.
+
+    - Texts are sorted by token length and encoded in fixed-size batches, so each
+      batch pads to similar lengths.
+    - `backend` selects plain PyTorch ("torch"), int8 dynamic quantisation ("int8")
+      or an ONNX Runtime export ("onnx").
+    - Large inputs are spread over `processes` worker processes.
+    - Results are float32 NumPy arrays of shape (n_texts, dim).
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", use_cache: bool = None, backend: str = None,
+                 batch_size: int = None, processes: int = None):
+        self.model_name = model_name
+        self.backend = (backend or settings.EMBEDDING_BACKEND).lower()
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.processes = processes if processes is not None else settings.EMBEDDING_PROCESSES
+        self._pool = None
 
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
         try:
-            self.model = SentenceTransformer(model_name)
-            logger.info(f"✅ Loaded embedding model: {model_name}")
+            self.model = self._load_model()
+            logger.info(f"✅ Loaded embedding model: {model_name} (backend={self.backend})")
         except Exception as e:
             logger.exception(f"❌ Failed to load embedding model {model_name}: {e}")
             raise
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+        use_cache = settings.EMBEDDING_CACHE_ENABLED if use_cache is None else use_cache
+        # Quantised/exported models produce slightly different vectors, so they get their own cache
+        cache_name = model_name if self.backend == "torch" else f"{model_name}@{self.backend}"
+        self.cache = EmbeddingCache(cache_name) if use_cache else None
+
+    def _load_model(self):
+        # Imported here: sentence-transformers pulls in torch, which dominates import time
+        from sentence_transformers import SentenceTransformer
+
+        if self.backend == "torch":
+            return SentenceTransformer(self.model_name, device="cpu")
+        if self.backend == "onnx":
+            # Requires sentence-transformers>=3.2 with the onnx extra (optimum + onnxruntime)
+            return SentenceTransformer(self.model_name, device="cpu", backend="onnx")
+        if self.backend == "int8":
+            import torch
+            model = SentenceTransformer(self.model_name, device="cpu")
+            return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        raise ValueError(f"❌ Unsupported EMBEDDING_BACKEND: {self.backend} (use 'torch', 'int8' or 'onnx')")
+
+    def warm_up(self):
+        """Run one forward pass through the model itself (never answered from the cache)."""
+        self._encode(["warm-up"])
 
-    def embed(self, texts):
-        """Return list of embeddings for a list of texts."""
+    def embed(self, texts, persist: bool = True):
+        """
+        Return a float32 array of embeddings for a list of texts (cached vectors skip the model).
+        `persist=False` (query texts) still reads the cache but keeps new vectors in memory only.
+        """
         if isinstance(texts, str):
             texts = [texts]
-        embeddings = self.model.encode(texts, show_progress_bar=False)
-        return embeddings.tolist()
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        if not self.cache:
+            return self._encode(texts)
+
+        cached = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if missing:
+            miss_texts = [texts[i] for i in missing]
+            encoded = self._encode(miss_texts)
+            self.cache.put_many(miss_texts, encoded, persist=persist)
+            for i, vector in zip(missing, encoded):
+                cached[i] = vector
+        return np.stack(cached)
+
+    # ------------------------------------------------------------------ encoding
+    def _token_lengths(self, texts):
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return [len(t) for t in texts]
+        encoded = tokenizer(texts, add_special_tokens=False, truncation=True,
+                            max_length=self.model.max_seq_length)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def _encode(self, texts):
+        if self.processes > 1 and len(texts) >= self.batch_size * self.processes:
+            return self._encode_multi_process(texts)
+
+        # Length-bucketed batching: similar lengths share a batch, minimising padding
+        order = np.argsort(self._token_lengths(texts), kind="stable")
+        out = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            out[idx] = self.model.encode(
+                [texts[i] for i in idx],
+                batch_size=len(idx),
+                show_progress_bar=False,
+                convert_to_numpy=True,
+            )
+        return out
+
+    def _encode_multi_process(self, texts):
+        if self._pool is None:
+            self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+            atexit.register(self.close)
+            logger.info(f"⚙️ Started {self.processes} embedding worker processes.")
+        # encode_multi_process sorts by length inside each worker chunk
+        embeddings = self.model.encode_multi_process(texts, self._pool, batch_size=self.batch_size)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def close(self):
+        """Stop the worker-process pool, if one was started."""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
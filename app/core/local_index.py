@@ -0,0 +1,308 @@
+# app/core/local_index.py
+import os
+import json
+import threading
+import numpy as np
+from app.core.config import settings
+from app.core.generations import Generations
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LocalVectorIndex:
+    """
+    In-process vector store with the same interface as PineconeClient.
+
+    Vectors are L2-normalised and kept in one contiguous float32 matrix, so cosine
+    similarity is a single matrix product. The matrix is persisted as a .npy file and
+    memory-mapped on load. Search is exact (blocked brute force) or IVF-approximate.
+    Each flush is a new generation (see Generations); queries reload when another process
+    (e.g. ingestion) has published a newer one.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    META_FILE = "meta.json"
+    BLOCK_ROWS = 65536  # rows scored per block during exact search
+
+    def __init__(self, path: str = None, mode: str = None, nlist: int = None, nprobe: int = None,
+                 store_text: bool = None):
+        self.path = path if path is not None else settings.LOCAL_INDEX_PATH
+        # With the chunk store on, texts are hydrated from there instead of kept in metadata
+        self.store_text = not settings.CHUNK_STORE_ENABLED if store_text is None else store_text
+        self.mode = (mode or settings.LOCAL_INDEX_MODE).lower()
+        self.nlist = nlist or settings.LOCAL_INDEX_NLIST
+        self.nprobe = nprobe or settings.LOCAL_INDEX_NPROBE
+
+        if self.mode not in ("exact", "ivf"):
+            raise ValueError(f"❌ Unsupported LOCAL_INDEX_MODE: {self.mode} (use 'exact' or 'ivf')")
+
+        self._lock = threading.RLock()
+        self._generations = Generations(self.path) if self.path else None
+        self._generation = 0
+        self._vectors = None        # float32 (capacity, dim); may be a read-only memmap
+        self._size = 0
+        self._ids = []
+        self._metadata = []
+        self._id_to_row = {}
+        self._dirty = False
+
+        # IVF state (rebuilt lazily after writes)
+        self._centroids = None
+        self._lists = None
+        self._ivf_stale = True
+
+        self._load()
+        logger.info(f"✅ Local vector index ready ({self._size} vectors, mode={self.mode})")
+
+    # ------------------------------------------------------------------ persistence
+    def _load(self):
+        if not self._generations:
+            return
+        generation = self._generations.current()
+        # Generation 0: an index saved before generations existed sits directly in `path`
+        base = self._generations.dir(generation) if generation else self.path
+        vectors_path = os.path.join(base, self.VECTORS_FILE)
+        meta_path = os.path.join(base, self.META_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(meta_path)):
+            return
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self._vectors = np.load(vectors_path, mmap_mode="r")
+        self._ids = meta["ids"]
+        self._metadata = meta["metadata"]
+        self._size = len(self._ids)
+        self._id_to_row = {vid: row for row, vid in enumerate(self._ids)}
+        self._generation = generation
+        self._ivf_stale = True
+
+    def refresh(self):
+        """Reload if another process flushed a newer index (unsaved local writes win)."""
+        with self._lock:
+            if self._dirty or not self._generations:
+                return
+            if self._generations.current() != self._generation:
+                self._vectors, self._size, self._ids, self._metadata, self._id_to_row = None, 0, [], [], {}
+                self._load()
+                logger.info(f"🔄 Reloaded local index ({self._size} vectors, generation {self._generation}).")
+
+    def flush(self):
+        """Persist vectors and metadata to disk (no-op when nothing changed)."""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            # Write a new generation, then atomically point readers at it
+            generation, base = self._generations.prepare()
+            with open(os.path.join(base, self.VECTORS_FILE), "wb") as f:
+                np.save(f, self._matrix())
+            with open(os.path.join(base, self.META_FILE), "w", encoding="utf-8") as f:
+                json.dump({"ids": self._ids, "metadata": self._metadata}, f)
+            self._generations.publish(generation)
+            self._generation = generation
+            self._dirty = False
+            logger.info(f"💾 Saved local index ({self._size} vectors) to {self.path}")
+
+    # ------------------------------------------------------------------ storage helpers
+    def _matrix(self):
+        if self._vectors is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._vectors[: self._size]
+
+    def _reserve(self, extra: int, dim: int):
+        """Ensure writable capacity for `extra` more rows (amortised doubling)."""
+        if self._vectors is None:
+            self._vectors = np.empty((max(extra, 1024), dim), dtype=np.float32)
+            return
+        if self._vectors.shape[1] != dim:
+            raise ValueError(f"❌ Dimension mismatch: index has {self._vectors.shape[1]}, got {dim}")
+
+        needed = self._size + extra
+        writable = isinstance(self._vectors, np.ndarray) and not isinstance(self._vectors, np.memmap)
+        if needed <= self._vectors.shape[0] and writable:
+            return
+        capacity = max(needed, self._vectors.shape[0] * 2 if writable else needed)
+        grown = np.empty((capacity, dim), dtype=np.float32)
+        grown[: self._size] = self._vectors[: self._size]
+        self._vectors = grown
+
+    @staticmethod
+    def _normalize(matrix):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    # ------------------------------------------------------------------ public API
+    def upsert_embeddings(self, chunks, embeddings, file_name=None, ids=None, metadatas=None):
+        """Insert or overwrite text chunks + embeddings (same ids and metadata as PineconeClient)."""
+        if len(chunks) == 0 or len(embeddings) == 0:
+            logger.warning("⚠️ No vectors to upsert (empty chunks or embeddings).")
+            return
+
+        matrix = self._normalize(embeddings)
+        with self._lock:
+            self._reserve(len(chunks), matrix.shape[1])
+            for i, (chunk, vector) in enumerate(zip(chunks, matrix)):
+                vid = ids[i] if ids is not None else f"{file_name or 'chunk'}-{i}"
+                metadata = {"source": file_name or "unknown"}
+                if self.store_text:
+                    metadata["text"] = chunk
+                if metadatas is not None:
+                    metadata.update({k: v for k, v in metadatas[i].items() if v is not None})
+                row = self._id_to_row.get(vid)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._ids.append(vid)
+                    self._metadata.append(metadata)
+                    self._id_to_row[vid] = row
+                else:
+                    self._metadata[row] = metadata
+                self._vectors[row] = vector
+            self._dirty = True
+            self._ivf_stale = True
+
+        logger.info(f"✅ Upserted {len(chunks)} vectors from {file_name} into local index.")
+
+    def update_metadata(self, ids, metadatas):
+        """Merge new metadata fields (e.g. a moved chunk's page span) into existing vectors."""
+        updated = 0
+        with self._lock:
+            for vid, metadata in zip(ids, metadatas):
+                row = self._id_to_row.get(vid)
+                if row is None:
+                    continue
+                self._metadata[row] = {**self._metadata[row], **{k: v for k, v in metadata.items() if v is not None}}
+                updated += 1
+            if updated:
+                self._dirty = True
+        if updated:
+            logger.info(f"✏️ Updated metadata of {updated} vectors in local index.")
+
+    def delete(self, ids):
+        """Delete vectors by id, filling each hole with the last row to stay contiguous."""
+        removed = 0
+        with self._lock:
+            for vid in ids:
+                row = self._id_to_row.pop(vid, None)
+                if row is None:
+                    continue
+                if not removed:
+                    self._reserve(0, self._vectors.shape[1])  # ensure writable (not a memmap)
+                last = self._size - 1
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._vectors[row] = self._vectors[last]
+                    self._ids[row] = moved_id
+                    self._metadata[row] = self._metadata[last]
+                    self._id_to_row[moved_id] = row
+                self._ids.pop()
+                self._metadata.pop()
+                self._size -= 1
+                removed += 1
+            if removed:
+                self._dirty = True
+                self._ivf_stale = True
+        if removed:
+            logger.info(f"🗑️ Deleted {removed} vectors from local index.")
+
+    def query(self, query_vector, top_k=3):
+        """Query top-k similar vectors (cosine similarity)."""
+        matches = self.query_batch([query_vector], top_k=top_k)[0]
+        logger.info(f"🔍 Retrieved {len(matches)} matches from local index.")
+        return matches
+
+    def query_batch(self, query_vectors, top_k=3):
+        """Query top-k matches for each row of a (n_queries, dim) matrix."""
+        queries = self._normalize(query_vectors)
+        with self._lock:
+            self.refresh()
+            if self._size == 0 or top_k <= 0:
+                return [[] for _ in range(len(queries))]
+            use_ivf = self.mode == "ivf" and self._size >= settings.LOCAL_INDEX_IVF_MIN_SIZE
+            if use_ivf:
+                return [self._search_ivf(q, top_k) for q in queries]
+            return self._search_exact(queries, top_k)
+
+    def __len__(self):
+        return self._size
+
+    # ------------------------------------------------------------------ search
+    def _to_matches(self, rows, scores):
+        return [
+            {"id": self._ids[row], "score": float(score), "metadata": self._metadata[row]}
+            for row, score in zip(rows, scores)
+        ]
+
+    @staticmethod
+    def _top_k(rows, scores, k):
+        if len(scores) > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[part], scores[part]
+        order = np.argsort(-scores, kind="stable")
+        return rows[order], scores[order]
+
+    def _search_exact(self, queries, top_k):
+        """Blocked brute-force search; keeps memory bounded for large indexes."""
+        matrix = self._matrix()
+        k = min(top_k, self._size)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+
+        for start in range(0, self._size, self.BLOCK_ROWS):
+            block = matrix[start:start + self.BLOCK_ROWS]
+            scores = queries @ block.T
+            kb = min(k, block.shape[0])
+            part = np.argpartition(-scores, kb - 1, axis=1)[:, :kb]
+            best_rows = np.concatenate([best_rows, part + start], axis=1)
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+
+        results = []
+        for rows, scores in zip(best_rows, best_scores):
+            rows, scores = self._top_k(rows, scores, k)
+            results.append(self._to_matches(rows, scores))
+        return results
+
+    def _build_ivf(self, iterations: int = 10, seed: int = 0):
+        """Train k-means centroids on a sample and bucket every row into its nearest list."""
+        matrix = self._matrix()
+        nlist = max(1, min(self.nlist, self._size // 39 or 1))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(self._size, nlist * 256)
+        sample = matrix[rng.choice(self._size, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = self._normalize(centroids)
+
+        assign = np.empty(self._size, dtype=np.int64)
+        for start in range(0, self._size, self.BLOCK_ROWS):
+            block = matrix[start:start + self.BLOCK_ROWS]
+            assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        self._centroids = centroids
+        self._lists = [np.flatnonzero(assign == c) for c in range(nlist)]
+        self._ivf_stale = False
+        logger.info(f"⚙️ Built IVF index with {nlist} lists over {self._size} vectors.")
+
+    def _search_ivf(self, query, top_k):
+        if self._ivf_stale:
+            self._build_ivf()
+        nprobe = min(self.nprobe, len(self._lists))
+        probe = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        rows = np.concatenate([self._lists[c] for c in probe])
+        if len(rows) == 0:
+            return []
+        scores = self._matrix()[rows] @ query
+        rows, scores = self._top_k(rows, scores, min(top_k, len(rows)))
+        return self._to_matches(rows, scores)
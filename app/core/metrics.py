@@ -0,0 +1,203 @@
+# app/core/metrics.py
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Latency histogram bucket upper bounds (seconds), Prometheus-style cumulative on export
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Span:
+    """Times one stage; records the duration (and whether it raised) on exit."""
+
+    __slots__ = ("_metrics", "_stage", "_fields", "_started")
+
+    def __init__(self, metrics, stage, fields):
+        self._metrics = metrics
+        self._stage = stage
+        self._fields = fields
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metrics.observe(self._stage, time.perf_counter() - self._started,
+                              error=exc_type is not None, **self._fields)
+        return False
+
+
+class Metrics:
+    """
+    In-process stage timings and counters.
+
+    `span(stage)` times a block into the `rag_stage_duration_seconds` histogram,
+    `incr(name, **labels)` bumps a counter. Everything is kept in plain dicts under one
+    lock and rendered on demand as Prometheus text (`render_prometheus`) or a JSON
+    snapshot; with `json_logs` each span is also written as a one-line JSON log record.
+    """
+
+    def __init__(self, json_logs: bool = None):
+        self.json_logs = settings.METRICS_JSON_LOGS if json_logs is None else json_logs
+        self._lock = threading.Lock()
+        self._counters = {}     # (name, sorted label items) → value
+        self._histograms = {}   # stage → [bucket counts..., +Inf count], sum
+        self._json_logger = _json_event_logger()
+
+    def span(self, stage: str, **fields):
+        return _Span(self, stage, fields)
+
+    def observe(self, stage: str, seconds: float, error: bool = False, **fields):
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            entry = self._histograms.get(stage)
+            if entry is None:
+                entry = self._histograms[stage] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += seconds
+            if error:
+                key = ("rag_stage_errors_total", (("stage", stage),))
+                self._counters[key] = self._counters.get(key, 0) + 1
+        if self.json_logs:
+            self._json_logger.info(json.dumps({
+                "event": "span", "stage": stage, "duration_ms": round(seconds * 1000, 3),
+                "error": error, **fields,
+            }, default=str))
+
+    def incr(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    # ------------------------------------------------------------------ export
+    def snapshot(self):
+        """Plain-dict view: counters plus per-stage count/sum/mean."""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self._counters.items()
+            ]
+            stages = {
+                stage: {"count": sum(buckets), "sum_s": total,
+                        "mean_ms": total / sum(buckets) * 1000 if sum(buckets) else 0.0}
+                for stage, (buckets, total) in self._histograms.items()
+            }
+        return {"counters": counters, "stages": stages}
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((stage, list(buckets), total) for stage, (buckets, total) in self._histograms.items())
+
+        lines = []
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                lines.append(f"# TYPE {name} counter")
+                seen.add(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        if histograms:
+            lines.append("# HELP rag_stage_duration_seconds Time spent in each RAG pipeline stage.")
+            lines.append("# TYPE rag_stage_duration_seconds histogram")
+        for stage, buckets, total in histograms:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+                cumulative += count
+                lines.append(f"rag_stage_duration_seconds_bucket{_labels((('stage', stage), ('le', str(bound))))} {cumulative}")
+            lines.append(f"rag_stage_duration_seconds_sum{_labels((('stage', stage),))} {total}")
+            lines.append(f"rag_stage_duration_seconds_count{_labels((('stage', stage),))} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+class NoopMetrics:
+    """Drop-in replacement used when METRICS_ENABLED is off: every call does nothing."""
+
+    json_logs = False
+    _SPAN = nullcontext()
+
+    def span(self, stage: str, **fields):
+        return self._SPAN
+
+    def observe(self, stage: str, seconds: float, error: bool = False, **fields):
+        pass
+
+    def incr(self, name: str, value: float = 1, **labels):
+        pass
+
+    def snapshot(self):
+        return {"counters": [], "stages": {}}
+
+    def render_prometheus(self) -> str:
+        return ""
+
+
+def _json_event_logger() -> logging.Logger:
+    """Logger that writes each record as the bare JSON line, for log shippers to parse."""
+    event_logger = logging.getLogger("app.metrics.events")
+    if not event_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        event_logger.addHandler(handler)
+        event_logger.setLevel(logging.INFO)
+        event_logger.propagate = False
+    return event_logger
+
+
+def _labels(items) -> str:
+    if not items:
+        return ""
+    pairs = []
+    for key, value in items:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+# Chosen once at import so disabled instrumentation costs a single no-op call per site
+metrics = Metrics() if settings.METRICS_ENABLED else NoopMetrics()
+
+_server = None
+_server_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body, content_type = metrics.render_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body, content_type = json.dumps(metrics.snapshot()), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # scrapes would otherwise flood stderr
+
+
+def start_metrics_server(port: int = None, host: str = None):
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread; idempotent."""
+    global _server
+    port = settings.METRICS_PORT if port is None else port
+    if not settings.METRICS_ENABLED or not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host or settings.METRICS_HOST, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info(f"📈 Metrics endpoint listening on {host or settings.METRICS_HOST}:{port}/metrics")
+    return _server
@@ -1,17 +1,37 @@
 # app/core/pinecone_client.py
 import os
+import threading
+from collections import deque
 from dotenv import load_dotenv
 from pinecone import Pinecone, ServerlessSpec
+from app.core.config import settings
+from app.core.resilience import get_policy, is_transient
 from app.utils.logger import get_logger
 import numpy as np
 
 logger = get_logger(__name__)
 load_dotenv()
 
+# One Pinecone client and Index handle per index name, shared by every PineconeClient in
+# the process, so list_indexes/create_index and connection-pool setup happen only once
+_index_handles = {}
+_index_lock = threading.Lock()
+
+
+def _to_list(vector):
+    """Single conversion to the JSON-friendly list Pinecone expects."""
+    if isinstance(vector, np.ndarray):
+        return vector.astype(np.float32, copy=False).tolist()
+    return vector if isinstance(vector, list) else list(vector)
+
 class PineconeClient:
     """Handles Pinecone vector DB operations."""
 
-    def __init__(self):
+    def __init__(self, dimension=None):
+        """
+        `dimension` is only needed when the index does not exist yet; it may be a callable
+        (e.g. `lambda: embedder.dimension`) so the embedding model is not loaded otherwise.
+        """
         api_key = os.getenv("PINECONE_API_KEY")
         index_name = os.getenv("PINECONE_INDEX")
         region = os.getenv("PINECONE_REGION", "us-east-1")
@@ -20,57 +40,120 @@ class PineconeClient:
         if not api_key:
             raise ValueError("❌ PINECONE_API_KEY not found in .env")
 
-        self.pc = Pinecone(api_key=api_key)
         self.index_name = index_name
+        # With the chunk store on, vectors carry only ids and small filterable fields
+        self.store_text = not settings.CHUNK_STORE_ENABLED
+        self.upsert_batch_size = settings.PINECONE_UPSERT_BATCH_SIZE
+        self.pool_threads = settings.PINECONE_POOL_THREADS
+        self.policy = get_policy("pinecone")
+
+        with _index_lock:
+            handle = _index_handles.get(index_name)
+            if handle is None:
+                pc = Pinecone(api_key=api_key, pool_threads=self.pool_threads)
 
-        # ✅ The embedding model all-mpnet-base-v2 has dimension = 768
-        dimension = 768
-
-        # Check if index exists; if not, create with correct dimension
-        existing_indexes = [i.name for i in self.pc.list_indexes()]
-        if self.index_name not in existing_indexes:
-            logger.info(f"⚙️ Creating Pinecone index: {self.index_name} (dim={dimension})")
-            self.pc.create_index(
-                name=self.index_name,
-                dimension=dimension,
-                spec=ServerlessSpec(cloud=cloud, region=region)
-            )
-
-        # Connect to existing index
-        self.index = self.pc.Index(self.index_name)
-        logger.info(f"✅ Connected to Pinecone index: {self.index_name}")
-
-    def upsert_embeddings(self, chunks, embeddings, file_name=None):
-        """Upsert text chunks + embeddings into Pinecone."""
-        vectors = []
+                # Check if index exists; if not, create it with the embedding model's dimension
+                existing_indexes = [i.name for i in self.policy.call(pc.list_indexes, "List indexes")]
+                if self.index_name not in existing_indexes:
+                    dimension = dimension() if callable(dimension) else dimension
+                    if not dimension:
+                        raise ValueError(f"❌ Pinecone index '{self.index_name}' does not exist and no embedding dimension was given")
+                    logger.info(f"⚙️ Creating Pinecone index: {self.index_name} (dim={dimension})")
+                    pc.create_index(
+                        name=self.index_name,
+                        dimension=dimension,
+                        spec=ServerlessSpec(cloud=cloud, region=region)
+                    )
+
+                # pool_threads sizes the connection pool used by async_req upserts and concurrent queries
+                handle = _index_handles[index_name] = (pc, pc.Index(self.index_name, pool_threads=self.pool_threads))
+                logger.info(f"✅ Connected to Pinecone index: {self.index_name}")
+        self.pc, self.index = handle
+
+    def _with_retry(self, fn, what: str):
+        """Call fn() under the shared Pinecone rate limit, circuit breaker and retry policy."""
+        return self.policy.call(fn, what)
+
+    def _batches(self, chunks, embeddings, file_name, ids, metadatas):
+        batch = []
         for i, (chunk, emb) in enumerate(zip(chunks, embeddings)):
-            # Ensure numpy array format
-            emb_array = np.array(emb, dtype=float)
-
-            vectors.append({
-                "id": f"{file_name or 'chunk'}-{i}",
-                "values": emb_array.tolist(),
-                "metadata": {
-                    "text": chunk,
-                    "source": file_name or "unknown"
-                }
+            metadata = {"source": file_name or "unknown"}
+            if self.store_text:
+                metadata["text"] = chunk
+            if metadatas is not None:
+                # Pinecone rejects null metadata values
+                metadata.update({k: v for k, v in metadatas[i].items() if v is not None})
+            batch.append({
+                "id": ids[i] if ids is not None else f"{file_name or 'chunk'}-{i}",
+                "values": _to_list(emb),
+                "metadata": metadata
             })
+            if len(batch) == self.upsert_batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def upsert_embeddings(self, chunks, embeddings, file_name=None, ids=None, metadatas=None):
+        """
+        Upsert text chunks + embeddings into Pinecone (ids default to positional `<file>-<i>`).
+        `metadatas` optionally adds per-chunk fields such as page span and char offsets.
 
-        if vectors:
-            self.index.upsert(vectors=vectors)
-            logger.info(f"✅ Upserted {len(vectors)} vectors from {file_name} into Pinecone.")
+        Vectors are sent in batches of PINECONE_UPSERT_BATCH_SIZE with up to
+        PINECONE_POOL_THREADS requests in flight; failed batches are retried synchronously.
+        """
+        in_flight = deque()   # (batch, async result)
+        total = 0
+
+        def settle(batch, pending):
+            try:
+                pending.get()
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                logger.warning(f"⚠️ Upsert batch failed ({e}); retrying.")
+                self._with_retry(lambda: self.index.upsert(vectors=batch), "Upsert")
+
+        for batch in self._batches(chunks, embeddings, file_name, ids, metadatas):
+            if len(in_flight) >= self.pool_threads:
+                settle(*in_flight.popleft())
+            self.policy.limiter.acquire()
+            in_flight.append((batch, self.index.upsert(vectors=batch, async_req=True)))
+            total += len(batch)
+        while in_flight:
+            settle(*in_flight.popleft())
+
+        if total:
+            logger.info(f"✅ Upserted {total} vectors from {file_name} into Pinecone.")
         else:
             logger.warning("⚠️ No vectors to upsert (empty chunks or embeddings).")
 
+    def update_metadata(self, ids, metadatas):
+        """Merge new metadata fields into existing vectors (one update request per id)."""
+        for vid, metadata in zip(ids, metadatas):
+            fields = {k: v for k, v in metadata.items() if v is not None}
+            self._with_retry(lambda: self.index.update(id=vid, set_metadata=fields), "Update metadata")
+        if ids:
+            logger.info(f"✏️ Updated metadata of {len(ids)} vectors in Pinecone.")
+
+    def delete(self, ids, batch_size: int = 1000):
+        """Delete vectors by id (Pinecone caps ids per delete request)."""
+        ids = list(ids)
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            self._with_retry(lambda: self.index.delete(ids=batch), "Delete")
+        if ids:
+            logger.info(f"🗑️ Deleted {len(ids)} vectors from Pinecone.")
+
+    def flush(self):
+        """Pinecone persists writes server-side; kept for parity with LocalVectorIndex."""
+        return None
+
     def query(self, query_vector, top_k=3):
         """Query top-k similar vectors."""
-        # Ensure query vector is numpy array
-        query_array = np.array(query_vector, dtype=float)
-
-        results = self.index.query(
-            vector=query_array.tolist(),
-            top_k=top_k,
-            include_metadata=True
+        vector = _to_list(query_vector)
+        results = self._with_retry(
+            lambda: self.index.query(vector=vector, top_k=top_k, include_metadata=True), "Query"
         )
 
         matches = results.get("matches", [])
@@ -0,0 +1,154 @@
+# app/core/query_cache.py
+import re
+import copy
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class QueryCache:
+    """
+    Two-tier cache for RAG answers.
+
+    - Exact tier: LRU keyed on normalised query text; a hit skips embedding as well.
+    - Semantic tier: cached query embeddings in a float32 matrix; a new query whose
+      cosine similarity to a cached one reaches `similarity_threshold` reuses its answer.
+
+    Both tiers expire entries after `ttl_seconds`, evict least-recently-used entries
+    when full, and are cleared whenever the index version changes.
+    """
+
+    def __init__(self, max_entries: int = None, semantic_entries: int = None,
+                 ttl_seconds: float = None, similarity_threshold: float = None):
+        self.max_entries = max_entries or settings.QUERY_CACHE_SIZE
+        self.semantic_entries = semantic_entries if semantic_entries is not None else settings.SEMANTIC_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds or settings.QUERY_CACHE_TTL_SECONDS
+        self.similarity_threshold = similarity_threshold or settings.SEMANTIC_CACHE_THRESHOLD
+
+        self._lock = threading.Lock()
+        self._version = None
+        self._exact = OrderedDict()      # key → (expires_at, response)
+        self._semantic = OrderedDict()   # key → (expires_at, slot, top_k, response)
+        self._vectors = None             # (semantic_entries, dim) normalised embeddings
+        self._slot_keys = [None] * self.semantic_entries
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Case-fold, collapse whitespace and drop trailing punctuation."""
+        return re.sub(r"\s+", " ", query.strip().lower()).rstrip("?!. ")
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._version is not None:
+                logger.info(f"♻️ Index version changed ({self._version} → {version}); clearing query cache.")
+            self._reset()
+            self._version = version
+
+    def _reset(self):
+        self._exact.clear()
+        self._semantic.clear()
+        self._slot_keys = [None] * self.semantic_entries
+        if self._vectors is not None:
+            self._vectors[:] = 0.0
+
+    # ------------------------------------------------------------------ lookups
+    def get_exact(self, query: str, top_k: int, version=None):
+        key = (top_k, self.normalize(query))
+        with self._lock:
+            self._check_version(version)
+            entry = self._exact.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at < time.monotonic():
+                del self._exact[key]
+                return None
+            self._exact.move_to_end(key)
+            self.hits["exact"] += 1
+        logger.info("⚡ Query cache hit (exact).")
+        return copy.deepcopy(response)
+
+    def get_semantic(self, embedding, top_k: int, version=None):
+        if not self.semantic_entries:
+            self.misses += 1
+            return None
+        query = self._unit(embedding)
+        with self._lock:
+            self._check_version(version)
+            if self._vectors is None or not self._semantic:
+                self.misses += 1
+                return None
+
+            scores = self._vectors @ query
+            now = time.monotonic()
+            for slot in np.argsort(-scores):
+                if scores[slot] < self.similarity_threshold:
+                    break
+                key = self._slot_keys[slot]
+                if key is None:
+                    continue
+                expires_at, _, entry_top_k, response = self._semantic[key]
+                if expires_at < now:
+                    self._evict_semantic(key)
+                    continue
+                if entry_top_k != top_k:
+                    continue
+                self._semantic.move_to_end(key)
+                self.hits["semantic"] += 1
+                logger.info(f"⚡ Query cache hit (semantic, cosine={scores[slot]:.3f}).")
+                return copy.deepcopy(response)
+
+            self.misses += 1
+            return None
+
+    # ------------------------------------------------------------------ writes
+    def put(self, query: str, embedding, response: dict, top_k: int, version=None):
+        key = (top_k, self.normalize(query))
+        expires_at = time.monotonic() + self.ttl_seconds
+        response = copy.deepcopy(response)
+        with self._lock:
+            self._check_version(version)
+
+            self._exact[key] = (expires_at, response)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+
+            if not self.semantic_entries or embedding is None:
+                return
+            vector = self._unit(embedding)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.semantic_entries, len(vector)), dtype=np.float32)
+
+            if key in self._semantic:
+                slot = self._semantic[key][1]
+            else:
+                if len(self._semantic) >= self.semantic_entries:
+                    self._evict_semantic(next(iter(self._semantic)))
+                slot = self._slot_keys.index(None)
+            self._vectors[slot] = vector
+            self._slot_keys[slot] = key
+            self._semantic[key] = (expires_at, slot, top_k, response)
+            self._semantic.move_to_end(key)
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def _evict_semantic(self, key):
+        _, slot, _, _ = self._semantic.pop(key)
+        self._slot_keys[slot] = None
+        self._vectors[slot] = 0.0
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
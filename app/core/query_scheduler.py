@@ -0,0 +1,183 @@
+# app/core/query_scheduler.py
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.query_cache import QueryCache
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class QueryScheduler:
+    """
+    Admission control in front of `RAGPipeline.query` / `query_stream`.
+
+    - Coalescing: a question equal (after `QueryCache.normalize`) to one already queued or
+      running joins it instead of starting its own embed/retrieve/Gemini round; every caller
+      gets the leader's response (stream followers receive it as one final chunk).
+    - Concurrency cap: at most `max_concurrency` questions execute at once, which bounds
+      concurrent Gemini calls. Exact query-cache hits bypass the scheduler entirely and
+      are answered from the scheduler's own lookup.
+    - Fairness: waiting questions are queued per user and slots are granted round-robin,
+      so one user's burst cannot starve everybody else.
+    - Load shedding: with `max_queue` questions already waiting, or after waiting
+      `deadline` seconds for a slot, callers get BUSY_RESPONSE straight away.
+
+    Queries run on the caller's thread once admitted, so streaming keeps working.
+    """
+
+    BUSY_ANSWER = (
+        "The assistant is handling a burst of questions right now and could not take yours in time. "
+        "Please try again in a moment."
+    )
+
+    def __init__(self, rag, max_concurrency: int = None, max_queue: int = None, deadline: float = None):
+        self.rag = rag
+        self.max_concurrency = max_concurrency or settings.SCHEDULER_MAX_CONCURRENCY
+        self.max_queue = max_queue if max_queue is not None else settings.SCHEDULER_MAX_QUEUE
+        self.deadline = deadline or settings.SCHEDULER_QUEUE_DEADLINE_SECONDS
+        self._lock = threading.Lock()
+        self._inflight = {}            # (top_k, normalized question) → Future shared with followers
+        self._waiting = OrderedDict()  # user → deque of slot tickets; order = round-robin turn
+        self._queued = 0
+        self._active = 0
+
+    @property
+    def busy_response(self):
+        return {"answer": self.BUSY_ANSWER, "relevant_documents": []}
+
+    # ------------------------------------------------------------------ public API
+    def query(self, question: str, username: str = None, top_k: int = 5):
+        """Scheduled `rag.query`; returns the usual response dict (or the busy response)."""
+        cached = self._cached(question, top_k)
+        if cached is not None:
+            metrics.incr("rag_queries_total", mode="sync")
+            return cached
+        key, future, leader = self._join(question, top_k)
+        if not leader:
+            return future.result()
+        if not self._acquire(username):
+            return self._settle(key, future, self.busy_response)
+        try:
+            response = self.rag.query(question, top_k=top_k)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        finally:
+            self._release()
+        return self._settle(key, future, response)
+
+    def stream(self, question: str, username: str = None, top_k: int = 5):
+        """Scheduled `rag.query_stream`, yielding the same events."""
+        cached = self._cached(question, top_k)
+        if cached is not None:
+            metrics.incr("rag_queries_total", mode="stream")
+            yield from self._replay(cached)
+            return
+        key, future, leader = self._join(question, top_k)
+        if not leader:
+            yield from self._replay(future.result())
+            return
+        if not self._acquire(username):
+            yield from self._replay(self._settle(key, future, self.busy_response))
+            return
+        try:
+            for event in self.rag.query_stream(question, top_k=top_k):
+                if event["type"] == "final":
+                    self._settle(key, future, event["response"])
+                yield event
+        except Exception as e:
+            self._settle(key, future, error=e)
+            raise
+        finally:
+            self._release()
+            if not future.done():   # consumer stopped early; don't leave followers waiting
+                self._settle(key, future, self.busy_response)
+
+    # ------------------------------------------------------------------ coalescing
+    def _cached(self, question: str, top_k: int):
+        """The exact query-cache hit for the question, or None. Returned as-is: a second
+        lookup in `rag.query` would count the hit twice and could miss if the entry expired."""
+        cache = self.rag.cache
+        if cache is None:
+            return None
+        return self.rag._cache_lookup("exact", cache.get_exact, question, top_k, self.rag.manifest.version)
+
+    def _join(self, question: str, top_k: int):
+        """(key, shared future, is_leader) for this question."""
+        key = (top_k, QueryCache.normalize(question))
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                metrics.incr("rag_scheduler_total", outcome="coalesced")
+                return key, future, False
+            future = self._inflight[key] = Future()
+            return key, future, True
+
+    def _settle(self, key, future: Future, response=None, error: BaseException = None):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(response)
+        return response
+
+    @staticmethod
+    def _replay(response):
+        yield {"type": "sources", "sources": []}
+        yield {"type": "token", "text": response.get("answer", "")}
+        yield {"type": "final", "response": response}
+
+    # ------------------------------------------------------------------ slots
+    def _acquire(self, username: str) -> bool:
+        """Wait for an execution slot; False when the queue is full or the deadline passed."""
+        user = username or "anonymous"
+        started = time.monotonic()
+        ticket = threading.Event()
+        with self._lock:
+            if self._active < self.max_concurrency and not self._queued:
+                self._active += 1
+                metrics.incr("rag_scheduler_total", outcome="admitted")
+                return True
+            if self._queued >= self.max_queue:
+                metrics.incr("rag_scheduler_total", outcome="rejected")
+                logger.warning(f"⚠️ Query queue full ({self._queued} waiting); turning away '{user}'.")
+                return False
+            self._waiting.setdefault(user, deque()).append(ticket)
+            self._queued += 1
+
+        ticket.wait(self.deadline)
+        with self._lock:
+            if not ticket.is_set():   # still queued: shed instead of answering late
+                tickets = self._waiting[user]
+                tickets.remove(ticket)
+                if not tickets:
+                    del self._waiting[user]
+                self._queued -= 1
+                metrics.incr("rag_scheduler_total", outcome="shed")
+                logger.warning(f"⚠️ '{user}' waited {self.deadline}s for a query slot; returning busy response.")
+                return False
+        metrics.observe("queue_wait", time.monotonic() - started)
+        metrics.incr("rag_scheduler_total", outcome="admitted")
+        return True
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+            # Round-robin: the user at the front gets their oldest ticket served, then goes to the back
+            while self._active < self.max_concurrency and self._waiting:
+                user, tickets = next(iter(self._waiting.items()))
+                ticket = tickets.popleft()
+                if tickets:
+                    self._waiting.move_to_end(user)
+                else:
+                    del self._waiting[user]
+                self._queued -= 1
+                self._active += 1
+                ticket.set()
@@ -1,81 +1,686 @@
 import os
 import re
 import json
+import time
+import asyncio
 import logging
-from app.core.azure_blob import AzureBlobHandler
-from app.core.text_extractor import TextExtractor
-from app.core.chunker import TextChunker
-from app.core.local_embedding import LocalEmbedding
-from app.core.pinecone_client import PineconeClient
-from app.core.gemini_client import GeminiClient
+import threading
+from collections import deque
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor
+from app.core.ingest_manifest import IngestionManifest
+from app.core.chunk_store import ChunkStore
+from app.core.blob_catalog import BlobCatalog
+from app.core.ingest_pipeline import IngestionPipeline
+from app.core.query_cache import QueryCache
+from app.core.json_stream import IncrementalJSONParser
+from app.core.bm25_index import BM25Index, reciprocal_rank_fusion
+from app.core.context_builder import ContextBuilder
+from app.core.retrieval_gate import RetrievalGate
+from app.core.metrics import metrics
+from app.core.resilience import is_unavailable
+from app.core.config import settings
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(name)s | %(message)s")
 logger = logging.getLogger(__name__)
 
+_pipelines = {}
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline(profile: str = "query") -> "RAGPipeline":
+    """Process-wide RAGPipeline per profile, built and warmed up once and shared by all callers."""
+    pipeline = _pipelines.get(profile)
+    if pipeline is None:
+        with _pipeline_lock:
+            pipeline = _pipelines.get(profile)
+            if pipeline is None:
+                pipeline = RAGPipeline(profile=profile)
+                pipeline.warm_up()
+                _pipelines[profile] = pipeline
+    return pipeline
+
+
+class _LazyComponent:
+    """
+    Pipeline attribute built by `RAGPipeline._build_<name>()` on first access (timed into
+    `startup_timings`). Assigning a value, or injecting one in the constructor, skips the build.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, pipeline, owner=None):
+        if pipeline is None:
+            return self
+        component = pipeline._components.get(self.name)
+        if component is None:
+            with pipeline._component_lock:
+                component = pipeline._components.get(self.name)
+                if component is None:
+                    component = pipeline._timed_init(self.name, getattr(pipeline, f"_build_{self.name}"))
+                    pipeline._components[self.name] = component
+        return component
+
+    def __set__(self, pipeline, value):
+        pipeline._components[self.name] = value
+
 class RAGPipeline:
     """RAG pipeline: extract → embed → store → retrieve → generate (JSON output)"""
 
-    def __init__(self):
-        logger.info("🚀 Initializing Enhanced RAG Pipeline with JSON response format...")
-        self.blob = AzureBlobHandler()
-        self.extractor = TextExtractor()
-        self.chunker = TextChunker(chunk_size=800, chunk_overlap=150)
-        self.embedder = LocalEmbedding(model_name="all-mpnet-base-v2")
-        self.vectorstore = PineconeClient()
-        self.llm = GeminiClient()
+    # Components each profile needs ready before serving; anything else is built on first use
+    PROFILES = {
+        "query": ("embedder", "vectorstore", "llm"),
+        "ingest": ("blob", "extractor", "chunker", "embedder", "vectorstore"),
+        "full": ("blob", "extractor", "chunker", "embedder", "vectorstore", "llm"),
+    }
 
-    def process_blobs(self, container_name: str):
-        """Load, chunk, and store embeddings from Azure PDFs."""
-        files = self.blob.list_files(container_name)
-        logger.info(f"📦 Found {len(files)} files in Azure Blob container '{container_name}'")
+    blob = _LazyComponent()
+    extractor = _LazyComponent()
+    chunker = _LazyComponent()
+    embedder = _LazyComponent()
+    vectorstore = _LazyComponent()
+    llm = _LazyComponent()
+
+    def __init__(self, blob=None, embedder=None, vectorstore=None, llm=None, profile: str = "full"):
+        """
+        Components can be injected (e.g. local stand-ins for benchmarks); the rest are
+        imported and built from settings the first time they are used, so a query-only
+        process never loads the Azure SDK or PDF libraries and an ingest-only one never
+        loads Gemini.
+        """
+        if profile not in self.PROFILES:
+            raise ValueError(f"❌ Unknown pipeline profile: {profile} (use one of {', '.join(self.PROFILES)})")
+        logger.info(f"🚀 Initializing Enhanced RAG Pipeline ({profile} profile) with JSON response format...")
+        self.profile = profile
+        self.startup_timings = {}   # component → seconds spent constructing it
+        self._component_lock = threading.RLock()
+        self._components = {"blob": blob, "embedder": embedder, "vectorstore": vectorstore, "llm": llm}
+
+        # The model name is known without loading the model, so the manifest stays cheap
+        self.embedding_model_name = embedder.model_name if embedder is not None else settings.LOCAL_EMBEDDING_MODEL
+        self.manifest = IngestionManifest(embedding_model=self.embedding_model_name)
+        self.cache = QueryCache() if settings.QUERY_CACHE_ENABLED and profile != "ingest" else None
+        self.lexical = BM25Index() if settings.HYBRID_SEARCH else None
+        self.chunk_store = ChunkStore() if settings.CHUNK_STORE_ENABLED else None
+        self.catalog = BlobCatalog() if settings.BLOB_CATALOG_ENABLED and profile != "query" else None
+        self.context_builder = ContextBuilder()
+        self.gate = RetrievalGate()
+        # CPU-bound encoding gets its own executor so it can't starve asyncio.to_thread I/O
+        self._embed_executor = ThreadPoolExecutor(max_workers=settings.ASYNC_EMBED_WORKERS, thread_name_prefix="embed")
+        self._background_tasks = set()
+
+    def close(self):
+        """Shut down the pipeline's embedding executor (queued async embeds are cancelled)."""
+        self._embed_executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _timed_init(self, name: str, factory):
+        started = time.perf_counter()
+        component = factory()
+        self.startup_timings[name] = time.perf_counter() - started
+        logger.info(f"⏱️ {name} ready in {self.startup_timings[name]:.2f}s")
+        return component
+
+    # ------------------------------------------------------------------ component factories
+    # Imports live here so importing this module stays cheap (no torch, SDKs or PDF libraries)
+    @staticmethod
+    def _build_blob():
+        from app.core.azure_blob import AzureBlobHandler
+        return AzureBlobHandler()
+
+    @staticmethod
+    def _build_extractor():
+        from app.core.text_extractor import TextExtractor
+        return TextExtractor()
+
+    @staticmethod
+    def _build_chunker():
+        from app.core.chunker import TextChunker
+        return TextChunker(chunk_size=800, chunk_overlap=150)
+
+    def _build_embedder(self):
+        from app.core.local_embedding import LocalEmbedding
+        return LocalEmbedding(model_name=self.embedding_model_name)
+
+    def _build_vectorstore(self):
+        from app.core.vector_store import create_vector_store
+        # Pinecone asks for the dimension only when it must create the index
+        return create_vector_store(dimension=lambda: self.embedder.dimension)
+
+    @staticmethod
+    def _build_llm():
+        from app.core.gemini_client import GeminiClient
+        return GeminiClient()
+
+    def warm_up(self):
+        """Build this profile's components and run a dummy encode, so the first request pays for neither."""
+        for name in self.PROFILES[self.profile]:
+            getattr(self, name)
+        started = time.perf_counter()
+        warm_up = getattr(self.embedder, "warm_up", None)
+        if warm_up is not None:
+            warm_up()   # bypasses the embedding cache, which would answer "warm-up" from disk
+        else:
+            self.embedder.embed(["warm-up"])
+        self.startup_timings["warm_up"] = time.perf_counter() - started
+        logger.info(f"🔥 Warm-up finished in {self.startup_timings['warm_up']:.2f}s")
+        return self.startup_timings
 
-        for file in files:
-            # ✅ Skip non-PDF files (e.g., chat logs or metadata)
+    def _list_documents(self, container_name: str, prefix: str):
+        """Blob records under the documents prefix; the chat-log prefix is never enumerated."""
+        chat_prefix = settings.CHAT_LOG_PREFIX
+        exclude = (chat_prefix,) if chat_prefix and chat_prefix.startswith(prefix) else ()
+        if self.catalog is None:
+            return self.blob.iter_blobs(prefix, container_name, exclude_prefixes=exclude)
+        if self.catalog.is_fresh(container_name, prefix):
+            logger.info(f"📒 Reusing cached listing of {len(self.catalog)} blobs (BLOB_CATALOG_TTL_SECONDS).")
+        else:
+            self.catalog.refresh(self.blob, container_name, prefix, exclude_prefixes=exclude)
+        return self.catalog.records()
+
+    def process_blobs(self, container_name: str):
+        """Load, chunk, and store embeddings from Azure PDFs (only new or changed content)."""
+        prefix = settings.DOCUMENTS_PREFIX
+        seen = set()
+        todo = []
+        # The listing is consumed completely before anything is deleted: if it fails, the
+        # error propagates from here and no blob is mistaken for removed
+        for blob in self._list_documents(container_name, prefix):
+            file = blob["name"]
+            # ✅ Skip non-PDF files (e.g., metadata)
             if not file.lower().endswith(".pdf"):
                 logger.info(f"⏭️ Skipping non-PDF file: {file}")
                 continue
 
-            safe_filename = os.path.basename(file)
-            download_path = f"temp_{safe_filename}"
-            logger.info(f"📄 Processing file: {file}")
+            seen.add(file)
+            if self.manifest.is_unchanged(file, blob["etag"], blob["last_modified"]):
+                logger.info(f"⏭️ Unchanged since last ingestion: {file}")
+                continue
+            todo.append(blob)
+        logger.info(f"📦 Found {len(seen)} PDFs under '{prefix}' in container '{container_name}' ({len(todo)} new or changed)")
 
-            try:
-                self.blob.download_file(container_name, file, download_path)
-                text = self.extractor.extract_text(download_path)
-                chunks = self.chunker.chunk_text(text)
-                logger.info(f"✅ Created {len(chunks)} chunks from {file}")
+        try:
+            IngestionPipeline(self).run(container_name, todo)
 
-                embeddings = self.embedder.embed(chunks)
-                self.vectorstore.upsert_embeddings(chunks, embeddings, file_name=file)
-                os.remove(download_path)
-                logger.info(f"🧠 Embedded and stored vectors for: {file}")
+            # 🗑️ Blobs that disappeared from the container lose their vectors too
+            for file in self.manifest.blob_names():
+                if file not in seen:
+                    stale_ids = list(self.manifest.chunk_hashes(file).keys())
+                    self.vectorstore.delete(stale_ids)
+                    if self.lexical:
+                        self.lexical.delete(stale_ids)
+                    if self.chunk_store is not None:
+                        self.chunk_store.delete(stale_ids)
+                    self.manifest.remove(file)
+                    logger.info(f"🗑️ Removed {len(stale_ids)} vectors for deleted blob: {file}")
+        finally:
+            self.vectorstore.flush()
+            if self.lexical:
+                self.lexical.save()
+            if self.chunk_store is not None:
+                self.chunk_store.save()
+            self.manifest.save()
 
-            except Exception as e:
-                logger.error(f"❌ Error processing file {file}: {e}")
-                if os.path.exists(download_path):
-                    os.remove(download_path)
-                continue
+    NO_INFO_RESPONSE = {
+        "answer": "No relevant information found in the provided context.",
+        "relevant_documents": []
+    }
 
     def query(self, query: str, top_k: int = 5):
         """Query the vector store and generate structured JSON response."""
         logger.info(f"💬 Query received: {query}")
-        query_vector = self.embedder.embed([query])[0]
-        results = self.vectorstore.query(query_vector, top_k=top_k)
-
-        if not results:
-            return {
-                "answer": "No relevant information found in the provided context.",
-                "relevant_documents": []
-            }
-
-        # Build context string for LLM
-        context = ""
-        for match in results:
-            filename = match["metadata"].get("source", "unknown")
-            chunk_text = match["metadata"].get("text", "")
-            context += f"[Document: {filename}]\n{chunk_text}\n\n"
-
-        prompt = f"""
+        metrics.incr("rag_queries_total", mode="sync")
+        version = self.manifest.version
+        if self.cache:
+            cached = self._cache_lookup("exact", self.cache.get_exact, query, top_k, version)
+            if cached is not None:
+                return cached
+
+        query_vector = self._embed_query(query)
+        if self.cache:
+            cached = self._cache_lookup("semantic", self.cache.get_semantic, query_vector, top_k, version)
+            if cached is not None:
+                return cached
+
+        with metrics.span("retrieve"):
+            results = self._retrieve(query, query_vector, top_k)
+        metrics.incr("rag_retrieved_chunks_total", len(results))
+
+        response, score = self._gate(query, results)
+        if response is not None:
+            if self.cache:
+                self.cache.put(query, query_vector, response, top_k, version)
+            return response
+
+        prompt = self._build_prompt(query, results)
+        try:
+            with metrics.span("llm"):
+                raw_response = self.llm.generate_response(prompt)
+        except Exception as e:
+            if not is_unavailable(e):
+                raise
+            return self._degraded_response(results, e)
+        self._count_llm_tokens(prompt, raw_response)
+        self.gate.record_outcome(score, raw_response)
+        logger.info("✅ Raw LLM response received.")
+
+        parsed, valid = self._parse_response(raw_response)
+        if valid and self.cache:
+            self.cache.put(query, query_vector, parsed, top_k, version)
+        return parsed
+
+    def query_stream(self, query: str, top_k: int = 5):
+        """
+        Streaming variant of `query`. Yields events as they become available:
+
+            {"type": "sources", "sources": [{"filename", "score"}, ...]}
+            {"type": "token", "text": "<next piece of the answer>"}
+            {"type": "final", "response": {...same JSON shape as query()...}}
+        """
+        logger.info(f"💬 Streaming query received: {query}")
+        metrics.incr("rag_queries_total", mode="stream")
+        version = self.manifest.version
+        cached = self._cache_lookup("exact", self.cache.get_exact, query, top_k, version) if self.cache else None
+
+        query_vector = None
+        if cached is None:
+            query_vector = self._embed_query(query)
+            cached = self._cache_lookup("semantic", self.cache.get_semantic, query_vector, top_k, version) if self.cache else None
+        if cached is not None:
+            yield {"type": "sources", "sources": []}
+            yield {"type": "token", "text": cached.get("answer", "")}
+            yield {"type": "final", "response": cached}
+            return
+
+        with metrics.span("retrieve"):
+            results = self._retrieve(query, query_vector, top_k)
+        metrics.incr("rag_retrieved_chunks_total", len(results))
+        yield {"type": "sources", "sources": self._sources(results)}
+
+        response, score = self._gate(query, results)
+        if response is not None:
+            if self.cache:
+                self.cache.put(query, query_vector, response, top_k, version)
+            yield {"type": "token", "text": response["answer"]}
+            yield {"type": "final", "response": response}
+            return
+
+        parser = IncrementalJSONParser()
+        prompt = self._build_prompt(query, results)
+        # The span covers the whole stream, including time the consumer spends per token
+        streamed = False
+        try:
+            with metrics.span("llm", streaming=True):
+                for piece in self.llm.generate_text_stream(prompt):
+                    delta = parser.feed(piece)
+                    if delta:
+                        streamed = True
+                        yield {"type": "token", "text": delta}
+        except Exception as e:
+            # Nothing shown yet → fall back gracefully; mid-answer failures still surface
+            if streamed or not is_unavailable(e):
+                raise
+            response = self._degraded_response(results, e)
+            yield {"type": "token", "text": response["answer"]}
+            yield {"type": "final", "response": response}
+            return
+        self._count_llm_tokens(prompt, parser.text)
+        self.gate.record_outcome(score, parser.text)
+        logger.info("✅ LLM stream finished.")
+
+        parsed, valid = self._parse_response(parser.text)
+        if valid and self.cache:
+            self.cache.put(query, query_vector, parsed, top_k, version)
+        yield {"type": "final", "response": parsed}
+
+    def _retrieve(self, query: str, query_vector, top_k: int):
+        """Dense vector search, fused with BM25 lexical search when hybrid retrieval is on."""
+        if not self.lexical:
+            return self._hydrate(self.vectorstore.query(query_vector, top_k=top_k))
+
+        # Each retriever looks a little deeper so fusion can promote items from either list
+        depth = top_k * settings.HYBRID_CANDIDATE_MULTIPLIER
+        dense = self.vectorstore.query(query_vector, top_k=depth)
+        lexical = self._lexical_search(query, depth)
+        return self._hydrate(self._fuse(dense, lexical, top_k))
+
+    def _hydrate(self, matches):
+        """
+        Return plain-dict copies of the matches with chunk texts filled in from the chunk
+        store in one batched read. Vectors ingested before the store existed still carry
+        `metadata["text"]` and are left as they are.
+        """
+        hydrated = [self._as_dict(match) for match in matches]
+        if self.chunk_store is None:
+            return hydrated
+        missing = [match["id"] for match in hydrated if "text" not in match["metadata"]]
+        if missing:
+            with metrics.span("hydrate"):
+                texts = self.chunk_store.get_many(missing)
+            for match in hydrated:
+                text = texts.get(match["id"])
+                if text is not None:
+                    match["metadata"]["text"] = text
+        return hydrated
+
+    @staticmethod
+    def _as_dict(match):
+        # Copies, because Pinecone returns model objects and local indexes share their metadata dicts
+        if isinstance(match, dict):
+            return {**match, "metadata": dict(match.get("metadata") or {})}
+        return {"id": match["id"], "score": match["score"], "metadata": dict(match["metadata"] or {})}
+
+    def _lexical_search(self, query: str, depth: int):
+        self.lexical.refresh()
+        return self.lexical.query(query, top_k=depth)
+
+    @staticmethod
+    def _fuse(dense, lexical, top_k: int):
+        results = reciprocal_rank_fusion(dense, lexical, top_k)
+        logger.info(f"🔀 Fused {len(dense)} dense + {len(lexical)} lexical matches into {len(results)}.")
+        return results
+
+    # ------------------------------------------------------------------ batch API
+    def query_batch(self, questions, top_k: int = 5, checkpoint_path: str = None,
+                    llm_concurrency: int = None, window: int = None):
+        """
+        Answer many questions, yielding {"index", "question", "response"} in input order.
+
+        Questions are handled in windows of QUERY_BATCH_WINDOW: one batched encode per
+        window, a matrix search on the local index (concurrent queries for Pinecone), then
+        Gemini calls through a bounded thread pool (the client itself applies the
+        GEMINI_RATE_LIMIT_PER_SECOND token bucket). With `checkpoint_path`, every successful answer is
+        appended to an NDJSON file and answers already there are replayed on the next run
+        instead of being recomputed. Failed questions are yielded with an "error" key and
+        left out of the checkpoint so a rerun retries them.
+        """
+        questions = list(questions)
+        window = window or settings.QUERY_BATCH_WINDOW
+        llm_concurrency = llm_concurrency or settings.QUERY_BATCH_LLM_CONCURRENCY
+        done = self._load_checkpoint(checkpoint_path, questions)
+        if done:
+            logger.info(f"♻️ Resuming batch: {len(done)}/{len(questions)} answers loaded from {checkpoint_path}")
+
+        version = self.manifest.version
+        checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+        # (index, question, query_vector, response dict or LLM future, replayed from checkpoint)
+        pending = deque()
+        pool = ThreadPoolExecutor(max_workers=llm_concurrency, thread_name_prefix="batch-llm")
+        try:
+            for start in range(0, len(questions), window):
+                indices = range(start, min(start + window, len(questions)))
+                todo = [i for i in indices if i not in done]
+                prepared = dict(zip(todo, self._prepare_batch([questions[i] for i in todo], top_k, version)))
+
+                for i in indices:
+                    if i in done:
+                        pending.append((i, questions[i], None, done.pop(i), True))
+                        continue
+                    query_vector, response, prompt, score = prepared[i]
+                    if prompt is not None:
+                        response = pool.submit(self._batch_generate, prompt, score)
+                    pending.append((i, questions[i], query_vector, response, False))
+
+                # Emit answers that are ready; block only to keep ~2 windows of LLM work in flight
+                while pending and (not isinstance(pending[0][3], Future) or pending[0][3].done()
+                                   or len(pending) > 2 * window):
+                    yield self._finish_batch_item(pending.popleft(), top_k, version, checkpoint)
+
+            while pending:
+                yield self._finish_batch_item(pending.popleft(), top_k, version, checkpoint)
+        finally:
+            # If the caller stops iterating early, queued Gemini calls are cancelled, not paid for
+            pool.shutdown(wait=True, cancel_futures=True)
+            if checkpoint:
+                checkpoint.close()
+
+    def _prepare_batch(self, questions, top_k: int, version):
+        """Embed and retrieve a window; returns (vector, cached/gated response, prompt, top score) per question."""
+        if not questions:
+            return []
+        prepared = [None] * len(questions)
+        todo = list(range(len(questions)))
+        if self.cache:
+            hits = [self._cache_lookup("exact", self.cache.get_exact, q, top_k, version) for q in questions]
+            prepared = [(None, hit, None, None) if hit is not None else None for hit in hits]
+            todo = [i for i, hit in enumerate(hits) if hit is None]
+        if not todo:
+            return prepared
+
+        with metrics.span("embed_batch", size=len(todo)):
+            vectors = self.embedder.embed([questions[i] for i in todo], persist=False)
+        if self.cache:
+            remaining = []
+            for i, vector in zip(todo, vectors):
+                hit = self._cache_lookup("semantic", self.cache.get_semantic, vector, top_k, version)
+                if hit is not None:
+                    prepared[i] = (vector, hit, None, None)
+                else:
+                    remaining.append((i, vector))
+        else:
+            remaining = list(zip(todo, vectors))
+        if not remaining:
+            return prepared
+
+        with metrics.span("retrieve_batch", size=len(remaining)):
+            all_results = self._retrieve_batch([questions[i] for i, _ in remaining],
+                                               [vector for _, vector in remaining], top_k)
+        for (i, vector), results in zip(remaining, all_results):
+            metrics.incr("rag_retrieved_chunks_total", len(results))
+            response, score = self._gate(questions[i], results)
+            if response is not None:
+                if self.cache:
+                    self.cache.put(questions[i], vector, response, top_k, version)
+                prepared[i] = (vector, response, None, score)
+            else:
+                prepared[i] = (vector, None, self._build_prompt(questions[i], results), score)
+        return prepared
+
+    def _retrieve_batch(self, questions, vectors, top_k: int):
+        depth = top_k * settings.HYBRID_CANDIDATE_MULTIPLIER if self.lexical else top_k
+        with ThreadPoolExecutor(max_workers=settings.QUERY_BATCH_RETRIEVE_WORKERS,
+                                thread_name_prefix="batch-retrieve") as pool:
+            lexical = pool.map(lambda q: self._lexical_search(q, depth), questions) if self.lexical else None
+            if hasattr(self.vectorstore, "query_batch"):
+                # Local index: one matrix multiply for the whole window
+                dense = self.vectorstore.query_batch(vectors, top_k=depth)
+            else:
+                dense = list(pool.map(lambda v: self.vectorstore.query(v, top_k=depth), vectors))
+            if lexical is None:
+                return [self._hydrate(matches) for matches in dense]
+            return [self._hydrate(self._fuse(d, l, top_k)) for d, l in zip(dense, lexical)]
+
+    def _batch_generate(self, prompt: str, score):
+        with metrics.span("llm"):
+            raw_response = self.llm.generate_response(prompt)
+        self._count_llm_tokens(prompt, raw_response)
+        self.gate.record_outcome(score, raw_response)
+        return raw_response
+
+    def _finish_batch_item(self, entry, top_k: int, version, checkpoint):
+        index, question, query_vector, response, replayed = entry
+        record = {"index": index, "question": question}
+        if isinstance(response, Future):
+            try:
+                parsed, valid = self._parse_response(response.result())
+            except Exception as e:
+                logger.error(f"❌ Batch question {index} failed: {e}")
+                metrics.incr("rag_batch_errors_total")
+                record["response"] = {"answer": "", "relevant_documents": []}
+                record["error"] = str(e)
+                return record
+            if valid and self.cache:
+                self.cache.put(question, query_vector, parsed, top_k, version)
+            response = parsed
+        record["response"] = response
+        if checkpoint is not None and not replayed:
+            checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+            checkpoint.flush()
+        return record
+
+    @staticmethod
+    def _load_checkpoint(path: str, questions):
+        """index → response for answers already stored in an NDJSON checkpoint."""
+        done = {}
+        if not path or not os.path.exists(path):
+            return done
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a torn last line from an interrupted run
+                if not isinstance(record, dict):
+                    continue
+                # Partial or hand-edited records are skipped, so their questions are answered again
+                index, response = record.get("index"), record.get("response")
+                if (isinstance(index, int) and 0 <= index < len(questions)
+                        and record.get("question") == questions[index] and isinstance(response, dict)):
+                    done[index] = response
+        return done
+
+    # ------------------------------------------------------------------ asyncio API
+    async def aquery(self, query: str, top_k: int = 5, username: str = None, chat_log=None):
+        """
+        Asyncio-native `query`: embedding runs in a dedicated executor, dense and lexical
+        retrieval run concurrently in threads, and Gemini is called through its async
+        client. Each stage has its own timeout (ASYNC_*_TIMEOUT) and cancelling the
+        awaiting task abandons the remaining stages. If `chat_log` (a ChatLogWriter) is
+        given, the interaction is logged in the background without delaying the answer.
+        """
+        logger.info(f"💬 Async query received: {query}")
+        metrics.incr("rag_queries_total", mode="async")
+        version = self.manifest.version
+        cached = self._cache_lookup("exact", self.cache.get_exact, query, top_k, version) if self.cache else None
+
+        if cached is None:
+            loop = asyncio.get_running_loop()
+            embedding = loop.run_in_executor(self._embed_executor, partial(self.embedder.embed, persist=False), [query])
+            query_vector = (await self._stage("embed", embedding, settings.ASYNC_EMBED_TIMEOUT))[0]
+            cached = self._cache_lookup("semantic", self.cache.get_semantic, query_vector, top_k, version) if self.cache else None
+
+        if cached is not None:
+            response = cached
+        else:
+            results = await self._stage("retrieve", self._aretrieve(query, query_vector, top_k),
+                                        settings.ASYNC_RETRIEVE_TIMEOUT)
+            metrics.incr("rag_retrieved_chunks_total", len(results))
+            response, score = self._gate(query, results)
+            valid = True
+            if response is None:
+                prompt = self._build_prompt(query, results)
+                try:
+                    raw_response = await self._stage("llm", self.llm.agenerate_text(prompt), settings.ASYNC_LLM_TIMEOUT)
+                except TimeoutError:
+                    raise   # stage deadlines are the caller's contract, not a provider outage
+                except Exception as e:
+                    if not is_unavailable(e):
+                        raise
+                    raw_response = None
+                    response, valid = self._degraded_response(results, e), False
+                if raw_response is not None:
+                    self._count_llm_tokens(prompt, raw_response)
+                    self.gate.record_outcome(score, raw_response)
+                    logger.info("✅ Raw LLM response received.")
+                    response, valid = self._parse_response(raw_response)
+            if valid and self.cache:
+                self.cache.put(query, query_vector, response, top_k, version)
+
+        if chat_log is not None:
+            task = asyncio.create_task(asyncio.to_thread(chat_log.log, username, query, response))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        return response
+
+    async def _aretrieve(self, query: str, query_vector, top_k: int):
+        if not self.lexical:
+            return self._hydrate(await asyncio.to_thread(self.vectorstore.query, query_vector, top_k=top_k))
+        depth = top_k * settings.HYBRID_CANDIDATE_MULTIPLIER
+        dense, lexical = await asyncio.gather(
+            asyncio.to_thread(self.vectorstore.query, query_vector, top_k=depth),
+            asyncio.to_thread(self._lexical_search, query, depth),
+        )
+        return self._hydrate(self._fuse(dense, lexical, top_k))
+
+    @staticmethod
+    async def _stage(name: str, awaitable, timeout: float):
+        try:
+            with metrics.span(name):
+                return await asyncio.wait_for(awaitable, timeout=timeout)
+        except asyncio.TimeoutError:
+            metrics.incr("rag_stage_timeouts_total", stage=name)
+            logger.error(f"❌ Stage '{name}' timed out after {timeout}s")
+            raise TimeoutError(f"RAG stage '{name}' exceeded {timeout}s")
+
+    # ------------------------------------------------------------------ instrumentation helpers
+    def _embed_query(self, query: str):
+        with metrics.span("embed"):
+            # Query texts are unbounded, so they never go into the persistent embedding cache
+            return self.embedder.embed([query], persist=False)[0]
+
+    @staticmethod
+    def _cache_lookup(tier: str, lookup, key, top_k: int, version):
+        cached = lookup(key, top_k, version)
+        metrics.incr("rag_cache_hits_total" if cached is not None else "rag_cache_misses_total", tier=tier)
+        return cached
+
+    def _count_llm_tokens(self, prompt: str, completion: str):
+        # Character-based estimate (same heuristic as the context budget), not billed tokens
+        metrics.incr("rag_llm_calls_total")
+        metrics.incr("rag_llm_tokens_total", self.context_builder.estimate_tokens(prompt), kind="prompt")
+        metrics.incr("rag_llm_tokens_total", self.context_builder.estimate_tokens(completion or ""), kind="completion")
+
+    UNAVAILABLE_ANSWER = (
+        "The answer service is temporarily overloaded, so no answer could be generated. "
+        "The most relevant documents are listed below; please try again shortly."
+    )
+
+    def _gate(self, query: str, results):
+        """
+        (response, top score). The response is set when retrieval confidence makes the LLM
+        call unnecessary: no or only weak matches, or matches strong enough to answer
+        extractively. None means the question goes to Gemini.
+        """
+        decision, score = self.gate.decide(results)
+        if decision == "no_info":
+            return dict(self.NO_INFO_RESPONSE), score
+        if decision == "extractive":
+            with metrics.span("extractive"):
+                response = self.gate.extractive_answer(query, results)
+            if response is not None:
+                logger.info(f"⚡ Answered extractively (top score {score:.3f}); LLM skipped.")
+                return response, score
+        return None, score
+
+    def _degraded_response(self, results, error):
+        """Fallback when Gemini is rate-limited or its circuit is open: sources only, never cached."""
+        logger.warning(f"⚠️ LLM unavailable ({error}); returning sources without an answer.")
+        metrics.incr("rag_degraded_responses_total")
+        sources = list(dict.fromkeys(match["metadata"].get("source", "unknown") for match in results))
+        return {
+            "answer": self.UNAVAILABLE_ANSWER,
+            "relevant_documents": [{"filename": source, "matched_chunks": []} for source in sources],
+        }
+
+    @staticmethod
+    def _sources(results):
+        return [
+            {"filename": match["metadata"].get("source", "unknown"), "score": match["score"]}
+            for match in results
+        ]
+
+    def _build_prompt(self, query: str, results) -> str:
+        # Build context string for LLM: merged, de-duplicated and trimmed to the token budget
+        with metrics.span("prompt_build"):
+            context, _ = self.context_builder.build(results)
+
+        return f"""
 You are a highly accurate AI assistant that answers questions ONLY using the provided context.
 
 If the context does not contain the information, say exactly:
@@ -101,15 +706,17 @@ Question:
 {query}
 """
 
-        raw_response = self.llm.generate_response(prompt)
-        logger.info("✅ Raw LLM response received.")
-
+    @staticmethod
+    def _parse_response(raw_response: str):
+        """Clean and parse the LLM output; returns (parsed_dict, is_valid_json)."""
         # ---- 🧹 Clean and parse JSON safely ----
         cleaned = re.sub(r"```json|```", "", raw_response).strip()
-        try:
-            parsed = json.loads(cleaned)
-            logger.info("✅ Parsed LLM response as valid JSON.")
-            return parsed
-        except json.JSONDecodeError as e:
-            logger.warning(f"⚠️ JSON parse error: {e}. Returning raw text instead.")
-            return {"answer": cleaned, "relevant_documents": []}
+        with metrics.span("parse"):
+            try:
+                parsed = json.loads(cleaned)
+            except json.JSONDecodeError as e:
+                metrics.incr("rag_llm_invalid_json_total")
+                logger.warning(f"⚠️ JSON parse error: {e}. Returning raw text instead.")
+                return {"answer": cleaned, "relevant_documents": []}, False
+        logger.info("✅ Parsed LLM response as valid JSON.")
+        return parsed, True
@@ -0,0 +1,51 @@
+# app/core/rate_limiter.py
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at `rate` tokens per second up to `capacity`.
+
+    `acquire()` blocks until enough tokens are available (or `timeout` expires);
+    a rate of 0 or less means unlimited and never blocks.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = max(capacity or rate, 1.0) if rate > 0 else 0.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: float = None) -> bool:
+        """Wait for `tokens`; returns False if `timeout` seconds pass first."""
+        if self.rate <= 0:
+            return True
+        tokens = min(tokens, self.capacity)   # a request larger than the bucket would never fit
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
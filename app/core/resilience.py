@@ -0,0 +1,176 @@
+# app/core/resilience.py
+import time
+import random
+import asyncio
+import threading
+from app.core.config import settings
+from app.core.rate_limiter import TokenBucket
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+# Exception class names used by google.api_core / grpc / pinecone for retryable conditions
+TRANSIENT_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "GatewayTimeout", "BadGateway", "ServiceException",
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+def is_transient(error) -> bool:
+    """Rate limits, server errors and connection drops are worth retrying."""
+    status = getattr(error, "status", None) or getattr(error, "status_code", None) or getattr(error, "code", None)
+    try:
+        if int(status) in TRANSIENT_STATUS:
+            return True
+    except (TypeError, ValueError):
+        pass
+    if type(error).__name__ in TRANSIENT_NAMES:
+        return True
+    return isinstance(error, (ConnectionError, TimeoutError)) or "timed out" in str(error).lower()
+
+
+def is_unavailable(error) -> bool:
+    """True when a call failed because the provider is overloaded or down, not because of our input."""
+    return isinstance(error, CircuitOpenError) or is_transient(error)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker. After `failure_threshold` consecutive failed calls the
+    circuit opens and calls fail fast for `reset_timeout` seconds; then one trial call is
+    let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or settings.CIRCUIT_RESET_SECONDS
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"✅ Circuit '{self.name}' closed again.")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"⚠️ Circuit '{self.name}' opened after {self._failures} failures.")
+                self._opened_at = time.monotonic()
+
+
+class ResiliencePolicy:
+    """
+    Per-provider call wrapper: token-bucket rate limit → circuit breaker → call with
+    jittered exponential retry on transient errors. Only transient failures count
+    towards opening the circuit; bad requests are re-raised straight away.
+    """
+
+    def __init__(self, name: str, max_retries: int, base_delay: float, max_delay: float = None,
+                 rate: float = 0.0, burst: float = 0.0, breaker: CircuitBreaker = None):
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay or settings.RETRY_MAX_SECONDS
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker(name)
+
+    def _before_call(self, what: str):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open; skipping {what}")
+
+    def _after_failure(self, error, attempt: int, what: str):
+        """Returns the delay before the next attempt, or re-raises."""
+        if not is_transient(error):
+            self.breaker.record_success()   # the provider answered; the request itself was bad
+            raise error
+        self.breaker.record_failure()
+        if attempt == self.max_retries:
+            raise error
+        delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+        logger.warning(f"⚠️ {what} failed ({error}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+        return delay
+
+    def call(self, fn, what: str):
+        """Call fn() under this provider's rate limit, breaker and retry policy."""
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            self._before_call(what)
+            try:
+                result = fn()
+            except Exception as e:
+                time.sleep(self._after_failure(e, attempt, what))
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, fn, what: str):
+        """Async `call`: fn() must return an awaitable; waits never block the event loop."""
+        for attempt in range(self.max_retries + 1):
+            while not self.limiter.try_acquire():
+                await asyncio.sleep(1.0 / self.limiter.rate)
+            self._before_call(what)
+            try:
+                result = await fn()
+            except Exception as e:
+                await asyncio.sleep(self._after_failure(e, attempt, what))
+                continue
+            self.breaker.record_success()
+            return result
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(provider: str) -> ResiliencePolicy:
+    """Process-wide policy for "gemini" or "pinecone", configured from <PROVIDER>_* settings."""
+    with _policies_lock:
+        policy = _policies.get(provider)
+        if policy is None:
+            prefix = provider.upper()
+            policy = _policies[provider] = ResiliencePolicy(
+                provider,
+                max_retries=getattr(settings, f"{prefix}_MAX_RETRIES"),
+                base_delay=getattr(settings, f"{prefix}_RETRY_BASE_SECONDS"),
+                rate=getattr(settings, f"{prefix}_RATE_LIMIT_PER_SECOND"),
+                burst=getattr(settings, f"{prefix}_RATE_LIMIT_BURST"),
+            )
+        return policy
@@ -0,0 +1,150 @@
+# app/core/retrieval_gate.py
+import re
+import bisect
+import threading
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+NO_INFO_MARKER = "No relevant information found"
+SCORE_BUCKETS = [round(0.05 * i, 2) for i in range(1, 20)]   # upper edges; last bucket is ≥ 0.95
+# Function words and question scaffolding: matching these says nothing about relevance
+STOPWORDS = frozenset("""
+a about above after all also am an and any are as at be because been being below between both but by
+can could did do does doing down during each few for from further had has have having how i if in
+into is it its itself just me more most my no nor not now of off on once only or other our out over
+own same she should so some such than that the their them then there these they this those through
+to too under until up very was we were what when where which while who whom why will with would you
+your explain describe tell list give show compare difference please main
+""".split())
+
+
+class RetrievalGate:
+    """
+    Decides from retrieval confidence whether a query needs the LLM at all.
+
+    - best similarity < `low`   → "no_info": the canned no-information response
+    - best similarity ≥ `high`  → "extractive": sentences from the top chunks that share
+      the most content words with the question, in the usual answer JSON shape, provided
+      they cover at least `min_coverage` of the question's content words
+    - anything else (or no dense score, e.g. lexical-only hits) → "llm"
+
+    Similarity is the dense cosine score (`dense_score` after hybrid fusion). A threshold of
+    0 disables that side. Top scores are bucketed per decision and per LLM outcome
+    (answered vs. "no relevant information"), so `calibration()` shows where to set them.
+    """
+
+    def __init__(self, low: float = None, high: float = None, max_sentences: int = None,
+                 min_coverage: float = None):
+        self.low = settings.RETRIEVAL_GATE_LOW if low is None else low
+        self.high = settings.RETRIEVAL_GATE_HIGH if high is None else high
+        self.max_sentences = max_sentences or settings.EXTRACTIVE_MAX_SENTENCES
+        self.min_coverage = settings.EXTRACTIVE_MIN_COVERAGE if min_coverage is None else min_coverage
+        self._lock = threading.Lock()
+        self._counts = {}            # kind → per-bucket counts
+        self._range = {}             # kind → [min score, max score]
+
+    @staticmethod
+    def similarity(match):
+        return match["dense_score"] if "dense_score" in match else match.get("score")
+
+    def top_score(self, results):
+        scores = [score for score in map(self.similarity, results) if score is not None]
+        return max(scores) if scores else None
+
+    def decide(self, results):
+        """Return (decision, top score) for a retrieval result list."""
+        if not results:
+            decision, score = "no_info", None
+        else:
+            score = self.top_score(results)
+            if score is None:
+                decision = "llm"
+            elif self.low and score < self.low:
+                decision = "no_info"
+            elif self.high and score >= self.high:
+                decision = "extractive"
+            else:
+                decision = "llm"
+        metrics.incr("rag_retrieval_gate_total", decision=decision)
+        if results and decision != "llm":
+            self._record(decision, score)
+        return decision, score
+
+    def record_outcome(self, score, answer: str):
+        """Record what the LLM made of a query that passed the gate (raw or parsed answer text)."""
+        if score is None:
+            return
+        self._record("llm_no_info" if NO_INFO_MARKER in (answer or "") else "llm_answered", score)
+
+    # ------------------------------------------------------------------ extractive answers
+    @staticmethod
+    def content_terms(text: str):
+        return {word for word in _WORD_RE.findall(text.lower()) if len(word) > 1 and word not in STOPWORDS}
+
+    def extractive_answer(self, query: str, results):
+        """
+        Answer from the confident chunks' best sentences; None (→ ask the LLM) when the chosen
+        sentences don't cover enough of the question's content words.
+        """
+        terms = self.content_terms(query)
+        if not terms:
+            return None
+        candidates, seen = [], set()
+        for rank, match in enumerate(results):
+            score = self.similarity(match)
+            if score is None or score < self.high:
+                continue
+            source = match["metadata"].get("source", "unknown")
+            for position, sentence in enumerate(_SENTENCE_RE.split(match["metadata"].get("text", ""))):
+                sentence = " ".join(sentence.split())
+                if not sentence or sentence in seen:
+                    continue   # overlapping chunks repeat sentences
+                seen.add(sentence)
+                overlap = len(terms & self.content_terms(sentence))
+                if overlap:
+                    candidates.append((overlap, -rank, -position, sentence, source))
+        if not candidates:
+            return None
+
+        best = sorted(candidates, reverse=True)[:self.max_sentences]
+        covered = set().union(*(self.content_terms(c[3]) for c in best)) & terms
+        if len(covered) / len(terms) < self.min_coverage:
+            metrics.incr("rag_extractive_rejected_total")
+            return None
+        best.sort(key=lambda c: (-c[1], -c[2]))   # back to retrieval/reading order
+        documents = {}
+        for *_, sentence, source in best:
+            documents.setdefault(source, []).append(sentence)
+        return {
+            "answer": " ".join(sentence for *_, sentence, _ in best),
+            "relevant_documents": [
+                {"filename": source, "matched_chunks": chunks} for source, chunks in documents.items()
+            ],
+        }
+
+    # ------------------------------------------------------------------ calibration
+    def _record(self, kind: str, score: float):
+        index = bisect.bisect_right(SCORE_BUCKETS, score)
+        with self._lock:
+            counts = self._counts.setdefault(kind, [0] * (len(SCORE_BUCKETS) + 1))
+            counts[index] += 1
+            low_high = self._range.setdefault(kind, [score, score])
+            low_high[0], low_high[1] = min(low_high[0], score), max(low_high[1], score)
+
+    def calibration(self):
+        """
+        Top-score histograms per decision/outcome. A safe `low` is at most the smallest score
+        the LLM still answered; a safe `high` sits above the largest score it couldn't answer.
+        """
+        with self._lock:
+            return {
+                "thresholds": {"low": self.low, "high": self.high},
+                "bucket_upper_edges": SCORE_BUCKETS,
+                "counts": {kind: list(counts) for kind, counts in self._counts.items()},
+                "score_range": {kind: list(bounds) for kind, bounds in self._range.items()},
+            }
@@ -1,22 +1,128 @@
 # app/core/text_extractor.py
+import io
 import os
-from PyPDF2 import PdfReader
+import atexit
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from app.core.config import settings
+
+# One page-extraction pool per process, created on first use and reused for every document
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+
+def _get_page_pool():
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(max_workers=settings.PDF_EXTRACT_WORKERS,
+                                             mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_page_pool.shutdown, cancel_futures=True)
+        return _page_pool
+
+
+def _open_pymupdf(source):
+    import fitz  # PyMuPDF
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def _pymupdf_page_range(source, start: int, stop: int):
+    """Process-pool task: extract pages [start, stop) with PyMuPDF."""
+    with _open_pymupdf(source) as doc:
+        return [(number + 1, doc[number].get_text()) for number in range(start, stop)]
+
 
 class TextExtractor:
-    """Extract text content from PDF or TXT files."""
+    """Extract text content from PDF or TXT files, given a path or the file's bytes."""
+
+    @staticmethod
+    def _normalize_source(source, file_name: str = None):
+        """Return (source, lower-cased name): a path string, or raw bytes for in-memory input."""
+        if isinstance(source, (str, os.PathLike)):
+            file_path = os.fspath(source)
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"File not found: {file_path}")
+            return file_path, (file_name or file_path).lower()
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return bytes(source), (file_name or "").lower()
+        raise TypeError(f"Unsupported source type: {type(source).__name__}")
 
     @staticmethod
-    def extract_text(file_path: str) -> str:
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
+    def iter_pages(source, file_name: str = None, backend: str = None, parallel: bool = True):
+        """
+        Lazily yield (page_number, text) pairs, 1-based, each page extracted once.
 
-        if file_path.lower().endswith(".pdf"):
-            reader = PdfReader(file_path)
-            return " ".join(page.extract_text() for page in reader.pages if page.extract_text())
+        Args:
+            source: A file path or the file's raw bytes.
+            file_name (str): Name used to detect the file type when `source` is not a path.
+            backend (str): "pymupdf" (default) or "pypdf2".
+            parallel (bool): Spread page ranges of large PDFs over worker processes.
+        """
+        source, name = TextExtractor._normalize_source(source, file_name)
 
-        elif file_path.lower().endswith(".txt"):
-            with open(file_path, "r", encoding="utf-8") as f:
-                return f.read()
+        if name.endswith(".txt"):
+            if isinstance(source, str):
+                with open(source, "r", encoding="utf-8") as f:
+                    yield 1, f.read()
+            else:
+                yield 1, source.decode("utf-8")
+            return
 
-        else:
+        if not name.endswith(".pdf"):
             raise ValueError("Unsupported file type. Only .pdf and .txt are supported.")
+
+        backend = (backend or settings.PDF_EXTRACTOR_BACKEND).lower()
+        if backend == "pymupdf":
+            yield from TextExtractor._iter_pymupdf(source, parallel)
+        elif backend == "pypdf2":
+            from PyPDF2 import PdfReader
+            reader = PdfReader(source if isinstance(source, str) else io.BytesIO(source))
+            for number, page in enumerate(reader.pages, start=1):
+                yield number, page.extract_text() or ""
+        else:
+            raise ValueError(f"Unsupported PDF_EXTRACTOR_BACKEND: {backend} (use 'pymupdf' or 'pypdf2')")
+
+    @staticmethod
+    def _iter_pymupdf(source, parallel: bool):
+        with _open_pymupdf(source) as doc:
+            page_count = doc.page_count
+            workers = settings.PDF_EXTRACT_WORKERS
+            if not parallel or workers <= 1 or page_count < settings.PDF_PARALLEL_PAGE_THRESHOLD:
+                for number in range(page_count):
+                    yield number + 1, doc[number].get_text()
+                return
+
+        # Large document: each worker opens its own handle on a contiguous page range;
+        # results are yielded in page order as soon as the next range is ready. Tasks carry
+        # a file path, so in-memory PDFs are written to disk once instead of pickled per task.
+        temp_path = None
+        if not isinstance(source, str):
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+                f.write(source)
+            source = temp_path = f.name
+        step = -(-page_count // (workers * 4))
+        futures = []
+        try:
+            pool = _get_page_pool()
+            futures = [
+                pool.submit(_pymupdf_page_range, source, start, min(start + step, page_count))
+                for start in range(0, page_count, step)
+            ]
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            if temp_path is not None:
+                os.remove(temp_path)
+
+    @staticmethod
+    def extract_text(source, file_name: str = None, backend: str = None, parallel: bool = True) -> str:
+        """Extract the whole document as one string, keeping page boundaries as blank lines."""
+        return "\n\n".join(
+            text for _, text in TextExtractor.iter_pages(source, file_name, backend, parallel) if text.strip()
+        )
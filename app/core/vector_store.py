@@ -0,0 +1,19 @@
+# app/core/vector_store.py
+from app.core.config import settings
+
+
+def create_vector_store(backend: str = None, dimension=None):
+    """
+    Return the configured vector store (PineconeClient or LocalVectorIndex).
+    `dimension` (an int, or a callable returning one) is used if a Pinecone index must be created.
+    """
+    backend = (backend or settings.VECTOR_BACKEND).lower()
+
+    if backend == "local":
+        from app.core.local_index import LocalVectorIndex
+        return LocalVectorIndex()
+    if backend == "pinecone":
+        from app.core.pinecone_client import PineconeClient
+        return PineconeClient(dimension=dimension)
+
+    raise ValueError(f"❌ Unsupported VECTOR_BACKEND: {backend} (use 'pinecone' or 'local')")
@@ -1,8 +1,6 @@
 import sys
 import os
 import streamlit as st
-from datetime import datetime
-import json
 
 # ------------------ Path Fix ------------------
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -11,8 +9,10 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 # ------------------ Imports ------------------
-from app.core.rag_engine import RAGPipeline
-from app.core.azure_blob import AzureBlobHandler
+from app.core.rag_engine import get_pipeline
+from app.core.chat_log_writer import ChatLogWriter
+from app.core.query_scheduler import QueryScheduler
+from app.core.metrics import start_metrics_server
 
 # ------------------ Streamlit App ------------------
 st.set_page_config(page_title="Advanced AI Chatbot", page_icon="🤖", layout="centered")
@@ -26,9 +26,27 @@ if "question" not in st.session_state:
 if "response" not in st.session_state:
     st.session_state.response = {}
 
-# Initialize handlers
-rag = RAGPipeline()
-blob = AzureBlobHandler()
+# Initialize handlers once per process (Streamlit re-runs this script on every interaction)
+@st.cache_resource(show_spinner="⏳ Loading models and connecting to services...")
+def load_pipeline():
+    return get_pipeline("query")
+
+@st.cache_resource
+def load_chat_log_writer(_blob):
+    return ChatLogWriter(_blob)
+
+@st.cache_resource
+def load_scheduler(_rag):
+    return QueryScheduler(_rag)
+
+rag = load_pipeline()
+scheduler = load_scheduler(rag)
+start_metrics_server()   # no-op unless METRICS_PORT is set
+chat_log = load_chat_log_writer(rag.blob)
+
+with st.sidebar.expander("⏱️ Startup report"):
+    for component, seconds in rag.startup_timings.items():
+        st.write(f"**{component}**: {seconds:.2f}s")
 
 # Step 1: Ask username
 st.session_state.username = st.text_input(
@@ -50,37 +68,33 @@ if st.session_state.username:
     if st.session_state.question.strip():
         if st.button("🚀 Submit"):
             with st.spinner("🔎 Searching knowledge base and generating answer..."):
-                # Generate answer
-                response = rag.query(st.session_state.question)
+                # Stream the answer: sources first, then text as Gemini generates it.
+                # The scheduler shares in-flight answers to identical questions and caps concurrent queries.
+                sources_box = st.empty()
+                answer_box = st.empty()
+                partial_answer = ""
+                response = {}
+                for event in scheduler.stream(st.session_state.question, username=st.session_state.username):
+                    if event["type"] == "sources" and event["sources"]:
+                        names = sorted({source["filename"] for source in event["sources"]})
+                        sources_box.caption("📚 Sources: " + ", ".join(names))
+                    elif event["type"] == "token":
+                        partial_answer += event["text"]
+                        answer_box.markdown(partial_answer + "▌")
+                    elif event["type"] == "final":
+                        response = event["response"]
+                answer_box.markdown(response.get("answer", partial_answer))
                 st.session_state.response = response
 
                 # Display JSON response
                 st.subheader("🧠 AI Response (JSON Format):")
                 st.json(response)
 
-                # Save chat log to Azure Blob
-                try:
-                    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-                    data_to_store = {
-                        "username": st.session_state.username,
-                        "question": st.session_state.question,
-                        "response": response,
-                        "timestamp": timestamp
-                    }
-
-                    blob_name = f"chat_logs/{st.session_state.username}_{timestamp}.json"
-                    temp_file = "temp_chat_log.json"
-
-                    with open(temp_file, "w") as f:
-                        json.dump(data_to_store, f, indent=4)
-
-                    blob.upload_file(temp_file, blob_name)
-                    os.remove(temp_file)
-
-                    st.success("✅ Chat successfully stored in Azure Blob Storage!")
-
-                except Exception as e:
-                    st.error(f"❌ Failed to upload chat to Azure Blob: {e}")
+                # Queue chat log; a background writer uploads it to Azure Blob in batches
+                if chat_log.log(st.session_state.username, st.session_state.question, response):
+                    st.success("✅ Chat queued for storage in Azure Blob Storage!")
+                else:
+                    st.warning("⚠️ Chat log buffer is full; this chat was not stored.")
 
     else:
         st.info("✍️ Please type your question to enable the **Submit** button.")
@@ -0,0 +1,81 @@
+# benchmarks/corpus.py
+"""Synthetic document corpus and question set for offline benchmarks."""
+import random
+import importlib.util
+
+_TOPICS = [
+    ("lithium iron phosphate", "LiFePO4", "cycle life"),
+    ("nickel manganese cobalt", "NMC-811", "energy density"),
+    ("lead acid", "PbA", "float charging"),
+    ("nickel metal hydride", "NiMH", "self-discharge"),
+    ("sodium ion", "Na-ion", "cold-temperature performance"),
+    ("solid state", "SSB", "dendrite suppression"),
+]
+_PHRASES = [
+    "The battery management system monitors {metric} across every cell string.",
+    "{name} cells ({code}) are rated for a nominal voltage and a defined {metric} envelope.",
+    "Thermal runaway in {code} packs is mitigated by venting, fusing and cell spacing.",
+    "Table {n} compares {metric} for {name} chemistries under a 1C discharge profile.",
+    "Part number {code}-{n:04d} specifies the module enclosure and its busbar layout.",
+    "State of charge estimation for {name} uses coulomb counting corrected by OCV lookup.",
+    "Balancing circuits equalise {metric} drift between parallel {code} groups.",
+]
+
+
+def make_pages(doc_index: int, pages: int, words_per_page: int = 350, seed: int = 0):
+    """Return a list of page strings with battery-domain vocabulary and part numbers."""
+    rng = random.Random(seed * 100003 + doc_index)
+    out = []
+    for page in range(pages):
+        sentences, words = [], 0
+        while words < words_per_page:
+            name, code, metric = rng.choice(_TOPICS)
+            sentence = rng.choice(_PHRASES).format(name=name, code=code, metric=metric, n=rng.randint(1, 9999))
+            sentences.append(sentence)
+            words += len(sentence.split())
+            if rng.random() < 0.15:
+                sentences.append("\n\n")
+        out.append(f"Document {doc_index} page {page + 1}\n" + " ".join(sentences))
+    return out
+
+
+def make_pdf(pages) -> bytes:
+    """Render pages into a PDF with PyMuPDF (text layer only)."""
+    import fitz
+
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), text, fontsize=7)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_corpus(documents: int, pages_per_doc: int, seed: int = 0, as_pdf: bool = True):
+    """
+    Yield (blob_name, bytes, pages) for a synthetic corpus. Falls back to .txt blobs
+    when PyMuPDF is unavailable or `as_pdf` is False.
+    """
+    as_pdf = as_pdf and importlib.util.find_spec("fitz") is not None
+    for i in range(documents):
+        pages = make_pages(i, pages_per_doc, seed=seed)
+        if as_pdf:
+            yield f"documents/bench_{i:04d}.pdf", make_pdf(pages), pages
+        else:
+            yield f"documents/bench_{i:04d}.txt", "\n\n".join(pages).encode("utf-8"), pages
+
+
+def make_questions(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    templates = [
+        "What is the {metric} of {name} batteries?",
+        "How does the BMS handle {metric} for {code} cells?",
+        "Which part number covers the {code} module enclosure?",
+        "Compare {metric} between {name} and other chemistries.",
+    ]
+    questions = []
+    for _ in range(count):
+        name, code, metric = rng.choice(_TOPICS)
+        questions.append(rng.choice(templates).format(name=name, code=code, metric=metric))
+    return questions
@@ -0,0 +1,155 @@
+# benchmarks/fakes.py
+"""
+In-memory stand-ins for the external services used by RAGPipeline.
+
+Each fake exposes the same methods as the real client and can inject a fixed
+latency per call, so benchmarks measure our own code paths plus a predictable
+network cost instead of whatever Azure/Pinecone/Gemini happen to do that day.
+"""
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from datetime import datetime, timezone
+import numpy as np
+from app.core.local_index import LocalVectorIndex
+
+
+class FakeBlobHandler:
+    """Dict-backed replacement for AzureBlobHandler."""
+
+    def __init__(self, latency: float = 0.0, container_name: str = "bench"):
+        self.latency = latency
+        self.container_name = container_name
+        self._blobs = {}   # name → (bytes, etag, last_modified)
+        self._lock = threading.Lock()
+
+    def _sleep(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def put(self, blob_name: str, data: bytes):
+        etag = hashlib.md5(data).hexdigest()
+        with self._lock:
+            self._blobs[blob_name] = (data, etag, datetime.now(timezone.utc).isoformat())
+
+    def upload_data(self, blob_name: str, data):
+        self._sleep()
+        self.put(blob_name, data.encode("utf-8") if isinstance(data, str) else data)
+
+    def upload_file(self, file_path: str, blob_name: str):
+        with open(file_path, "rb") as f:
+            self.upload_data(blob_name, f.read())
+
+    def iter_blobs(self, prefix: str = None, container_name: str = None, exclude_prefixes=()):
+        self._sleep()
+        with self._lock:
+            records = [
+                {"name": name, "etag": etag, "last_modified": modified, "size": len(data)}
+                for name, (data, etag, modified) in self._blobs.items()
+                if name.startswith(prefix or "") and not name.startswith(tuple(exclude_prefixes))
+            ]
+        yield from records
+
+    def list_files(self, container_name: str = None, prefix: str = None):
+        return [blob["name"] for blob in self.iter_blobs(prefix, container_name)]
+
+    def list_blob_properties(self, container_name: str = None, prefix: str = None):
+        return list(self.iter_blobs(prefix, container_name))
+
+    def download_file(self, container_name: str, blob_name: str, download_path: str):
+        self._sleep()
+        with open(download_path, "wb") as f:
+            f.write(self._blobs[blob_name][0])
+
+
+class FakeVectorStore(LocalVectorIndex):
+    """Non-persistent LocalVectorIndex that sleeps like a remote Pinecone round trip."""
+
+    def __init__(self, latency: float = 0.0, mode: str = "exact"):
+        self.latency = latency
+        super().__init__(path="", mode=mode)
+
+    def upsert_embeddings(self, *args, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().upsert_embeddings(*args, **kwargs)
+
+    def delete(self, ids):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().delete(ids)
+
+    def query_batch(self, query_vectors, top_k=3):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().query_batch(query_vectors, top_k=top_k)
+
+
+class FakeGeminiClient:
+    """Returns a canned JSON answer built from the prompt, after a configurable delay."""
+
+    def __init__(self, latency: float = 0.0, stream_chunks: int = 8):
+        self.latency = latency
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> str:
+        self.calls += 1
+        sources = sorted(set(line[len("[Document: "):].split(",")[0].rstrip("]")
+                             for line in prompt.splitlines() if line.startswith("[Document: ")))
+        return "```json\n" + json.dumps({
+            "answer": f"Synthetic answer drawn from {len(sources)} documents.",
+            "relevant_documents": [{"filename": s, "matched_chunks": []} for s in sources],
+        }) + "\n```"
+
+    def generate_text(self, prompt: str):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(prompt)
+
+    def generate_response(self, prompt: str):
+        return self.generate_text(prompt)
+
+    async def agenerate_text(self, prompt: str):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+    def generate_text_stream(self, prompt: str):
+        text = self._answer(prompt)
+        step = max(1, len(text) // self.stream_chunks)
+        for start in range(0, len(text), step):
+            if self.latency:
+                time.sleep(self.latency / self.stream_chunks)
+            yield text[start:start + step]
+
+
+class FakeEmbedder:
+    """
+    Deterministic hashed bag-of-words embedder (no model download).
+
+    Similar texts share tokens and therefore land close together, which is enough
+    for exercising retrieval; use --real-embedder to benchmark the actual model.
+    """
+
+    def __init__(self, dimension: int = 384, latency_per_text: float = 0.0):
+        self.model_name = f"fake-hash-{dimension}"
+        self.dimension = dimension
+        self.latency_per_text = latency_per_text
+        self.cache = None
+
+    def embed(self, texts, persist: bool = True):
+        if isinstance(texts, str):
+            texts = [texts]
+        if self.latency_per_text:
+            time.sleep(self.latency_per_text * len(texts))
+        out = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in text.lower().split():
+                digest = int(hashlib.blake2b(token.encode("utf-8"), digest_size=8).hexdigest(), 16)
+                out[row, digest % self.dimension] += 1.0 if (digest >> 32) & 1 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
@@ -0,0 +1,225 @@
+# benchmarks/run_benchmarks.py
+"""
+Offline performance benchmarks for the RAG pipeline.
+
+Runs every stage against a synthetic corpus with local stand-ins for Azure, Pinecone
+and Gemini (see benchmarks/fakes.py), then reports throughput and p50/p95/p99 latency
+and saves the results as JSON so runs can be compared.
+
+    python -m benchmarks.run_benchmarks --docs 20 --pages 10 --queries 50
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<previous>.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import platform
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+
+from app.core.config import settings
+from benchmarks.corpus import make_corpus, make_questions
+from benchmarks.fakes import FakeBlobHandler, FakeVectorStore, FakeGeminiClient, FakeEmbedder
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class StageRecorder:
+    """Collects per-call latencies and item counts for each named stage."""
+
+    def __init__(self):
+        self.samples = {}   # stage → list of seconds
+        self.items = {}     # stage → items processed
+
+    @contextmanager
+    def measure(self, stage: str, items: int = 1):
+        started = time.perf_counter()
+        yield
+        self.samples.setdefault(stage, []).append(time.perf_counter() - started)
+        self.items[stage] = self.items.get(stage, 0) + items
+
+    def summary(self):
+        report = {}
+        for stage, samples in self.samples.items():
+            arr = np.asarray(samples)
+            total = float(arr.sum())
+            report[stage] = {
+                "calls": len(samples),
+                "items": self.items[stage],
+                "total_s": total,
+                "throughput_per_s": self.items[stage] / total if total else None,
+                "mean_ms": float(arr.mean() * 1000),
+                "p50_ms": float(np.percentile(arr, 50) * 1000),
+                "p95_ms": float(np.percentile(arr, 95) * 1000),
+                "p99_ms": float(np.percentile(arr, 99) * 1000),
+            }
+        return report
+
+
+def _isolate_settings(workdir: str, use_query_cache: bool):
+    """Point every on-disk artefact at a scratch directory so runs don't touch real data."""
+    settings.VECTOR_BACKEND = "local"
+    settings.LOCAL_INDEX_PATH = os.path.join(workdir, "local_index")
+    settings.INGEST_MANIFEST_PATH = os.path.join(workdir, "ingest_manifest.json")
+    settings.BM25_INDEX_PATH = os.path.join(workdir, "bm25_index")
+    settings.EMBEDDING_CACHE_DIR = os.path.join(workdir, "embedding_cache")
+    settings.CHUNK_STORE_PATH = os.path.join(workdir, "chunk_store")
+    settings.QUERY_CACHE_ENABLED = use_query_cache
+
+
+def run(args):
+    with tempfile.TemporaryDirectory(prefix="rag_bench_") as workdir:
+        _isolate_settings(workdir, args.with_query_cache)
+        return _run_stages(args)
+
+
+def _run_stages(args):
+    from app.core.chunker import TextChunker
+    from app.core.text_extractor import TextExtractor
+    from app.core.rag_engine import RAGPipeline
+
+    recorder = StageRecorder()
+
+    corpus = list(make_corpus(args.docs, args.pages, seed=args.seed, as_pdf=not args.text_corpus))
+    questions = make_questions(args.queries, seed=args.seed)
+
+    if args.real_embedder:
+        from app.core.local_embedding import LocalEmbedding
+        embedder = LocalEmbedding(model_name=args.real_embedder, use_cache=False)
+    else:
+        embedder = FakeEmbedder(latency_per_text=args.embed_latency)
+
+    # ---- Extraction --------------------------------------------------------------
+    extracted = []
+    for name, data, _ in corpus:
+        with recorder.measure("extraction", items=args.pages):
+            pages = list(TextExtractor.iter_pages(data, file_name=name, parallel=False))
+        extracted.append((name, pages))
+
+    # ---- Chunking ----------------------------------------------------------------
+    chunker = TextChunker(chunk_size=800, chunk_overlap=150)
+    chunked = []
+    for name, pages in extracted:
+        started = time.perf_counter()
+        chunks = list(chunker.chunk_pages(pages, source=name))
+        recorder.samples.setdefault("chunking", []).append(time.perf_counter() - started)
+        recorder.items["chunking"] = recorder.items.get("chunking", 0) + len(chunks)
+        chunked.append((name, chunks))
+
+    # ---- Embedding ---------------------------------------------------------------
+    all_chunks = [chunk["text"] for _, chunks in chunked for chunk in chunks]
+    batch_size = settings.INGEST_EMBED_BATCH_SIZE
+    for start in range(0, len(all_chunks), batch_size):
+        batch = all_chunks[start:start + batch_size]
+        with recorder.measure("embedding", items=len(batch)):
+            embedder.embed(batch)
+
+    # ---- Upsert ------------------------------------------------------------------
+    store = FakeVectorStore(latency=args.vector_latency)
+    for name, chunks in chunked:
+        texts = [chunk["text"] for chunk in chunks]
+        embeddings = embedder.embed(texts)
+        with recorder.measure("upsert", items=len(chunks)):
+            store.upsert_embeddings(texts, embeddings, file_name=name,
+                                    metadatas=[chunk["metadata"] for chunk in chunks])
+
+    # ---- Full ingestion through RAGPipeline.process_blobs ---------------------------
+    blob = FakeBlobHandler(latency=args.blob_latency)
+    for name, data, _ in corpus:
+        blob.put(name, data)
+    with RAGPipeline(
+        blob=blob,
+        embedder=embedder,
+        vectorstore=FakeVectorStore(latency=args.vector_latency),
+        llm=FakeGeminiClient(latency=args.llm_latency),
+    ) as rag:
+        if all(name.endswith(".pdf") for name, _, _ in corpus):
+            with recorder.measure("ingestion_end_to_end", items=len(corpus)):
+                rag.process_blobs(blob.container_name)
+        else:
+            reason = "--text-corpus" if args.text_corpus else "PyMuPDF not available"
+            print(f"⚠️ Corpus is .txt ({reason}): process_blobs only ingests PDFs, indexing chunks directly.")
+            for name, chunks in chunked:
+                texts = [chunk["text"] for chunk in chunks]
+                ids = [f"{name}-{i}" for i in range(len(chunks))]
+                if rag.chunk_store is not None:
+                    rag.chunk_store.put_many(ids, texts)
+                rag.vectorstore.upsert_embeddings(texts, embedder.embed(texts), file_name=name, ids=ids)
+
+        # ---- Retrieval & end-to-end query -------------------------------------------------
+        for question in questions:
+            vector = embedder.embed([question])[0]
+            with recorder.measure("retrieval"):
+                rag._retrieve(question, vector, args.top_k)
+        for question in questions:
+            with recorder.measure("query_end_to_end"):
+                rag.query(question, top_k=args.top_k)
+        with recorder.measure("query_batch", items=len(questions)):
+            for _ in rag.query_batch(questions, top_k=args.top_k):
+                pass
+
+    return {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "platform": {"python": sys.version.split()[0], "machine": platform.machine(), "cpus": os.cpu_count()},
+        "config": vars(args),
+        "stages": recorder.summary(),
+    }
+
+
+def print_report(results, baseline=None):
+    header = f"{'stage':<24}{'items/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'Δ p50':>10}{'Δ items/s':>12}"
+    print(header)
+    print("-" * len(header))
+    for stage, s in results["stages"].items():
+        throughput = s["throughput_per_s"] or 0.0
+        line = f"{stage:<24}{throughput:>12.1f}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}"
+        base = (baseline or {}).get("stages", {}).get(stage)
+        if base:
+            d_p50 = (s["p50_ms"] - base["p50_ms"]) / base["p50_ms"] * 100 if base["p50_ms"] else 0.0
+            base_tp = base["throughput_per_s"] or 0.0
+            d_tp = (throughput - base_tp) / base_tp * 100 if base_tp else 0.0
+            line += f"{d_p50:>+9.1f}%{d_tp:>+11.1f}%"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline RAG pipeline benchmarks")
+    parser.add_argument("--docs", type=int, default=20, help="synthetic documents in the corpus")
+    parser.add_argument("--pages", type=int, default=10, help="pages per document")
+    parser.add_argument("--queries", type=int, default=50, help="questions for retrieval/query stages")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--blob-latency", type=float, default=0.02, help="seconds per fake Azure call")
+    parser.add_argument("--vector-latency", type=float, default=0.01, help="seconds per fake Pinecone call")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake Gemini call")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="seconds per text for the fake embedder")
+    parser.add_argument("--real-embedder", metavar="MODEL", help="benchmark a real SentenceTransformer model")
+    parser.add_argument("--text-corpus", action="store_true", help="generate .txt instead of PDF documents")
+    parser.add_argument("--with-query-cache", action="store_true", help="leave the query cache enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", metavar="RESULTS_JSON", help="previous results file to diff against")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"bench_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to {path}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
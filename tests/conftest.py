@@ -0,0 +1,23 @@
+# tests/conftest.py
+import pytest
+from app.core.config import settings
+
+
+@pytest.fixture
+def isolated_settings(tmp_path, monkeypatch):
+    """Point every on-disk artefact at tmp_path and use the in-process backends."""
+    overrides = {
+        "VECTOR_BACKEND": "local",
+        "LOCAL_INDEX_PATH": str(tmp_path / "local_index"),
+        "INGEST_MANIFEST_PATH": str(tmp_path / "ingest_manifest.json"),
+        "BM25_INDEX_PATH": str(tmp_path / "bm25_index"),
+        "CHUNK_STORE_PATH": str(tmp_path / "chunk_store"),
+        "EMBEDDING_CACHE_DIR": str(tmp_path / "embedding_cache"),
+        "BLOB_CATALOG_PATH": str(tmp_path / "blob_catalog.json"),
+        "BLOB_CATALOG_ENABLED": False,
+        "QUERY_CACHE_ENABLED": False,
+        "DOCUMENTS_PREFIX": "",
+    }
+    for name, value in overrides.items():
+        monkeypatch.setattr(settings, name, value)
+    return settings
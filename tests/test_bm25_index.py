@@ -0,0 +1,67 @@
+# tests/test_bm25_index.py
+import os
+import json
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.core.bm25_index import BM25Index, tokenize
+
+
+def ids_of(matches):
+    return [match["id"] for match in matches]
+
+
+def test_tokenize_keeps_compound_codes_and_parts():
+    assert tokenize("NMC-811 cells") == ["nmc-811", "nmc", "811", "cells"]
+
+
+def test_saved_index_reloads_with_deletes_compacted(tmp_path):
+    index = BM25Index(path=str(tmp_path))
+    index.add(["a", "b", "c"], ["lithium iron phosphate", "sodium ion cell", "lithium polymer pouch"],
+              [{"source": "x"}] * 3)
+    index.delete(["c"])
+    index.save()
+
+    reloaded = BM25Index(path=str(tmp_path))
+    assert ids_of(reloaded.query("lithium")) == ["a"]
+    assert ids_of(reloaded.query("sodium cell")) == ["b"]
+
+
+def test_refresh_picks_up_another_writers_save(tmp_path):
+    writer = BM25Index(path=str(tmp_path))
+    writer.add(["a"], ["lithium cell"])
+    writer.save()
+    reader = BM25Index(path=str(tmp_path))
+
+    writer.add(["b"], ["sodium cell"])
+    writer.save()
+    assert ids_of(reader.query("sodium")) == []
+    reader.refresh()
+    assert ids_of(reader.query("sodium")) == ["b"]
+
+
+def test_unpublished_save_is_invisible_to_readers(tmp_path):
+    writer = BM25Index(path=str(tmp_path))
+    writer.add(["a"], ["lithium cell"])
+    writer.save()
+    reader = BM25Index(path=str(tmp_path))
+
+    # A writer that died after writing docs.json but before postings/pointer
+    generation, base = writer._generations.prepare()
+    with open(os.path.join(base, BM25Index.DOCS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"ids": ["z"], "metadata": [{}], "terms": {}}, f)
+
+    reader.refresh()
+    assert ids_of(reader.query("lithium")) == ["a"]
+    assert ids_of(BM25Index(path=str(tmp_path)).query("lithium")) == ["a"]
+
+
+def test_old_generations_are_pruned(tmp_path):
+    index = BM25Index(path=str(tmp_path))
+    for i in range(4):
+        index.add([f"d{i}"], [f"term{i}"])
+        index.save()
+    assert sorted(name for name in os.listdir(tmp_path) if name.startswith("gen-")) == [
+        "gen-000003", "gen-000004",
+    ]
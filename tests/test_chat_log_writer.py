@@ -0,0 +1,84 @@
+# tests/test_chat_log_writer.py
+import time
+import threading
+from app.core.chat_log_writer import ChatLogWriter
+from app.core.config import settings
+
+
+class FlakyBlob:
+    """Fails the first `failures` uploads, then stores shards."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.attempts = 0
+        self.shards = []
+
+    def upload_data(self, blob_name, data):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("blob storage unavailable")
+        self.shards.append(data)
+
+
+def records(blob):
+    return sum(len(shard.splitlines()) for shard in blob.shards)
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_failed_uploads_back_off_instead_of_retrying_per_record(monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_LOG_RETRY_SECONDS", 0.3)
+    blob = FlakyBlob(failures=1)
+    writer = ChatLogWriter(blob, batch_size=1, flush_interval=60, max_buffer=100)
+
+    writer.log("u", "q0", {"answer": "a"})
+    wait_for(lambda: blob.attempts == 1)
+    for i in range(1, 20):
+        writer.log("u", f"q{i}", {"answer": "a"})
+    time.sleep(0.1)
+    assert blob.attempts == 1            # still backing off
+
+    wait_for(lambda: records(blob) == 20)
+    assert blob.attempts == 2
+    assert writer.dropped == 0
+    writer.close()
+
+
+def test_backlog_stays_bounded_during_an_outage(monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_LOG_RETRY_SECONDS", 60)
+    blob = FlakyBlob(failures=1)
+    writer = ChatLogWriter(blob, batch_size=1, flush_interval=60, max_buffer=5)
+    writer.log("u", "first", {})
+    wait_for(lambda: blob.attempts == 1)
+    for i in range(30):
+        writer.log("u", f"q{i}", {})
+    wait_for(lambda: writer._queue.empty())
+
+    writer.close()
+    assert blob.attempts == 2            # one final attempt at shutdown
+    assert records(blob) <= 5
+    assert records(blob) + writer.dropped == 31
+
+
+def test_flush_does_not_block_on_a_full_buffer():
+    blob = FlakyBlob()
+    writer = ChatLogWriter(blob, batch_size=100, flush_interval=60, max_buffer=2)
+    release = threading.Event()
+    original = writer.blob.upload_data
+    writer.blob.upload_data = lambda name, data: release.wait(5) and original(name, data)
+    writer.log("u", "q0", {})
+    writer.flush()
+    wait_for(lambda: writer._queue.empty())   # the writer thread is now stuck uploading q0
+    writer.log("u", "q1", {})
+    writer.log("u", "q2", {})
+
+    started = time.monotonic()
+    writer.flush()
+    assert time.monotonic() - started < 0.5
+    release.set()
+    writer.close()
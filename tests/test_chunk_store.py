@@ -0,0 +1,67 @@
+# tests/test_chunk_store.py
+import os
+import pytest
+
+from app.core.chunk_store import ChunkStore
+from app.core.config import settings
+
+
+@pytest.fixture
+def compact_always(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_STORE_COMPACT_RATIO", 0.0)
+
+
+def test_texts_round_trip_and_survive_reopen(tmp_path):
+    store = ChunkStore(path=str(tmp_path))
+    assert store.put_many(["a", "b"], ["alpha", "béta ✓"]) == 2
+    assert store.put_many(["a"], ["ignored"]) == 0
+
+    reopened = ChunkStore(path=str(tmp_path))
+    assert reopened.get_many(["a", "b", "missing"]) == {"a": "alpha", "b": "béta ✓"}
+
+
+def test_reader_replays_appends_and_deletes(tmp_path):
+    writer = ChunkStore(path=str(tmp_path))
+    writer.put_many(["a"], ["alpha"])
+    reader = ChunkStore(path=str(tmp_path))
+
+    writer.put_many(["b"], ["beta"])
+    writer.delete(["a"])
+    assert reader.get_many(["a", "b"]) == {"b": "beta"}
+
+
+def test_reader_follows_compaction_to_the_new_generation(tmp_path, compact_always):
+    writer = ChunkStore(path=str(tmp_path))
+    writer.put_many(["a", "b", "c"], ["alpha" * 10, "beta", "gamma"])
+    reader = ChunkStore(path=str(tmp_path))
+    assert reader.get_many(["b"]) == {"b": "beta"}
+
+    writer.delete(["a"])
+    writer.save()
+    # Offsets moved in the compacted data file; the reader must not use its old table
+    assert reader.get_many(["a", "b", "c"]) == {"b": "beta", "c": "gamma"}
+    assert reader._generation == writer._generation
+
+
+def test_unpublished_compaction_is_ignored(tmp_path):
+    writer = ChunkStore(path=str(tmp_path))
+    writer.put_many(["a"], ["alpha"])
+    # A compaction that died before swapping the pointer
+    _, base = writer._generations.prepare()
+    with open(os.path.join(base, ChunkStore.INDEX_FILE), "w", encoding="utf-8") as f:
+        f.write("a\t0\t3\n")
+
+    assert ChunkStore(path=str(tmp_path)).get_many(["a"]) == {"a": "alpha"}
+
+
+def test_store_in_flat_layout_is_adopted(tmp_path):
+    with open(tmp_path / ChunkStore.TEXTS_FILE, "wb") as f:
+        f.write(b"alphabeta")
+    with open(tmp_path / ChunkStore.INDEX_FILE, "w", encoding="utf-8") as f:
+        f.write("a\t0\t5\nb\t5\t4\n")
+
+    store = ChunkStore(path=str(tmp_path))
+    assert store.get_many(["a", "b"]) == {"a": "alpha", "b": "beta"}
+    store.put_many(["c"], ["gamma"])
+    assert not os.path.exists(tmp_path / ChunkStore.TEXTS_FILE)
+    assert ChunkStore(path=str(tmp_path)).get_many(["a", "b", "c"]) == {"a": "alpha", "b": "beta", "c": "gamma"}
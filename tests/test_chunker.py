@@ -0,0 +1,82 @@
+# tests/test_chunker.py
+from benchmarks.corpus import make_pages
+from app.core.chunker import TextChunker
+
+
+def joined(pages):
+    return TextChunker.PAGE_SEPARATOR.join(page for page in pages if page and page.strip())
+
+
+def assert_covers(document, chunks):
+    """Every non-blank character of the document is inside some chunk's offsets."""
+    covered = bytearray(len(document))
+    for chunk in chunks:
+        meta = chunk["metadata"]
+        covered[meta["char_start"]:meta["char_end"]] = b"\x01" * (meta["char_end"] - meta["char_start"])
+    assert all(covered[i] or document[i].isspace() for i in range(len(document)))
+
+
+def test_offsets_point_back_into_the_joined_document():
+    pages = make_pages(1, 6)
+    document = joined(pages)
+    chunks = list(TextChunker(chunk_size=120, chunk_overlap=40).chunk_pages(enumerate(pages, start=1), source="doc"))
+
+    assert chunks
+    for chunk in chunks:
+        meta = chunk["metadata"]
+        assert meta["source"] == "doc"
+        assert document[meta["char_start"]:meta["char_end"]] == chunk["text"]
+    # The corpus repeats phrases; each chunk must be located at its own occurrence
+    assert_covers(document, chunks)
+
+
+def words(page, count):
+    return " ".join(f"p{page}w{i}" for i in range(count))
+
+
+def test_page_spans_match_the_pages_holding_each_chunk():
+    pages = [words(1, 4), words(2, 40), words(3, 3), words(4, 5)]
+    starts, offset = [], 0
+    for page in pages:
+        starts.append(offset)
+        offset += len(page) + len(TextChunker.PAGE_SEPARATOR)
+
+    def page_of(position):
+        return max(number for number, start in enumerate(starts, start=1) if start <= position)
+
+    chunks = list(TextChunker(chunk_size=100, chunk_overlap=20).chunk_pages(enumerate(pages, start=1)))
+    assert {chunk["metadata"]["page_start"] for chunk in chunks} >= {1, 2, 3}
+    for chunk in chunks:
+        meta = chunk["metadata"]
+        assert meta["page_start"] == page_of(meta["char_start"])
+        assert meta["page_end"] == page_of(meta["char_end"] - 1)
+    # Short pages are merged into one chunk that spans them
+    assert any(chunk["metadata"]["page_start"] < chunk["metadata"]["page_end"] for chunk in chunks)
+
+
+def test_small_window_keeps_coverage_and_overlap():
+    pages = [words(page, 120) for page in range(1, 5)]
+    document = joined(pages)
+    chunker = TextChunker(chunk_size=120, chunk_overlap=40)
+    chunks = list(chunker.chunk_pages(enumerate(pages, start=1), window=300))
+
+    for chunk in chunks:
+        meta = chunk["metadata"]
+        assert document[meta["char_start"]:meta["char_end"]] == chunk["text"]
+        assert len(chunk["text"]) <= chunker.chunk_size
+    assert_covers(document, chunks)
+
+    # Consecutive chunks inside a page share up to `chunk_overlap` chars, also where the
+    # 300-char window was cut
+    spans = [(chunk["metadata"]["char_start"], chunk["metadata"]["char_end"]) for chunk in chunks]
+    assert spans == sorted(spans)
+    overlaps = [previous_end - start for (_, previous_end), (start, _) in zip(spans, spans[1:])]
+    assert sum(overlap > 0 for overlap in overlaps) >= len(chunks) // 2
+    assert max(overlaps) <= chunker.chunk_overlap
+
+
+def test_plain_segments_are_numbered_from_one_and_blanks_skipped():
+    chunks = list(TextChunker(chunk_size=50, chunk_overlap=0).chunk_pages(["first page", "", "third page"]))
+    assert [chunk["text"] for chunk in chunks] == ["first page\n\nthird page"]
+    assert (chunks[0]["metadata"]["page_start"], chunks[0]["metadata"]["page_end"]) == (1, 3)
+    assert chunks[0]["metadata"]["source"] == "unknown"
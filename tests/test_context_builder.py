@@ -0,0 +1,82 @@
+# tests/test_context_builder.py
+from app.core.context_builder import ContextBuilder
+
+DOCUMENT = " ".join(f"word{i}" for i in range(80))
+
+
+def match(text, score, source="doc.pdf", **location):
+    return {"score": score, "metadata": {"source": source, "text": text, **location}}
+
+
+def span(start, end, score=0.5, page_start=1, page_end=1, source="doc.pdf"):
+    return match(DOCUMENT[start:end], score, source, page_start=page_start, page_end=page_end,
+                 char_start=start, char_end=end)
+
+
+def test_overlapping_spans_are_spliced_once():
+    _, used = ContextBuilder(token_budget=10_000).build([
+        span(0, 120, score=0.4),
+        span(90, 250, score=0.9, page_end=2),
+        span(400, 450, score=0.1),
+    ])
+    merged = next(p for p in used if p["char_start"] == 0)
+    assert merged["text"] == DOCUMENT[0:250]
+    assert (merged["char_end"], merged["page_end"], merged["score"]) == (250, 2, 0.9)
+    assert [p["char_start"] for p in used] == [0, 400]
+
+
+def test_contained_and_touching_spans():
+    builder = ContextBuilder(token_budget=10_000)
+    _, used = builder.build([span(0, 200), span(50, 100)])
+    assert [p["text"] for p in used] == [DOCUMENT[0:200]]
+
+    # Spans separated by a page break ("\n\n", at most 2 chars) are joined with a newline
+    _, used = builder.build([span(0, 100), span(102, 150)])
+    assert [p["text"] for p in used] == [DOCUMENT[0:100] + "\n" + DOCUMENT[102:150]]
+
+
+def test_spans_of_different_sources_are_not_merged():
+    _, used = ContextBuilder(token_budget=10_000).build([span(0, 120), span(90, 250, source="other.pdf")])
+    assert len(used) == 2
+
+
+def test_near_duplicates_follow_the_threshold():
+    words = [f"term{i}" for i in range(20)]
+    original = " ".join(words)
+    variant = " ".join(words[:-1] + ["changed"])
+    shingles_a, shingles_b = ContextBuilder._shingles(original), ContextBuilder._shingles(variant)
+    jaccard = len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+    matches = [match(original, 0.9, "a.pdf"), match(variant, 0.8, "b.pdf")]
+
+    _, used = ContextBuilder(token_budget=10_000, dedup_threshold=jaccard - 0.01).build(matches)
+    assert [p["source"] for p in used] == ["a.pdf"]     # the higher-scoring copy is kept
+    _, used = ContextBuilder(token_budget=10_000, dedup_threshold=jaccard + 0.01).build(matches)
+    assert [p["source"] for p in used] == ["a.pdf", "b.pdf"]
+
+
+def test_contained_text_is_a_duplicate():
+    _, used = ContextBuilder(token_budget=10_000).build([
+        match(DOCUMENT, 0.9, "a.pdf"), match(DOCUMENT[100:160], 0.95, "b.pdf"),
+    ])
+    assert [p["source"] for p in used] == ["b.pdf", "a.pdf"]   # a higher-scoring excerpt keeps its superset...
+    _, used = ContextBuilder(token_budget=10_000).build([
+        match(DOCUMENT, 0.95, "a.pdf"), match(DOCUMENT[100:160], 0.9, "b.pdf"),
+    ])
+    assert [p["source"] for p in used] == ["a.pdf"]            # ...but is dropped once the superset is in
+
+
+def test_budget_skips_passages_that_do_not_fit():
+    builder = ContextBuilder(token_budget=100)
+    small, large, tiny = "s" * 200, "l" * 400, "t" * 40
+    context, used = builder.build([
+        match(small, 0.9, "small.pdf"), match(large, 0.8, "large.pdf"), match(tiny, 0.7, "tiny.pdf"),
+    ])
+    assert [p["source"] for p in used] == ["small.pdf", "tiny.pdf"]
+    assert builder.estimate_tokens(context) <= builder.token_budget + len(used)
+
+
+def test_oversized_best_passage_is_truncated_to_the_budget():
+    builder = ContextBuilder(token_budget=50)
+    context, used = builder.build([match("x" * 1000, 0.9)])
+    assert len(used) == 1
+    assert len(context) == 50 * ContextBuilder.CHARS_PER_TOKEN
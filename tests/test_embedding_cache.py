@@ -0,0 +1,44 @@
+# tests/test_embedding_cache.py
+import os
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.core.embedding_cache import EmbeddingCache
+
+
+def vectors(count, dim=8, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+def test_vectors_survive_reload(tmp_path):
+    texts = [f"chunk {i}" for i in range(5)]
+    expected = vectors(5)
+    EmbeddingCache("m", cache_dir=str(tmp_path)).put_many(texts, expected)
+
+    reloaded = EmbeddingCache("m", cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(np.stack(reloaded.get_many(texts)), expected)
+
+
+def test_torn_write_does_not_shift_later_keys(tmp_path):
+    cache = EmbeddingCache("m", cache_dir=str(tmp_path))
+    cache.put_many(["a", "b"], vectors(2, seed=1))
+    # Simulate a writer that died halfway through a record
+    with open(cache._entries_path, "ab") as f:
+        f.write(b"\x01" * 30)
+
+    reopened = EmbeddingCache("m", cache_dir=str(tmp_path))
+    later = vectors(2, seed=2)
+    reopened.put_many(["c", "d"], later)
+
+    fresh = EmbeddingCache("m", cache_dir=str(tmp_path))
+    assert os.path.getsize(fresh._entries_path) % fresh._record_dtype.itemsize == 0
+    np.testing.assert_array_equal(np.stack(fresh.get_many(["c", "d"])), later)
+    assert all(vector is not None for vector in fresh.get_many(["a", "b"]))
+
+
+def test_non_persistent_vectors_stay_in_memory(tmp_path):
+    cache = EmbeddingCache("m", cache_dir=str(tmp_path))
+    cache.put_many(["what is a bms?"], vectors(1), persist=False)
+    assert cache.get_many(["what is a bms?"])[0] is not None
+    assert EmbeddingCache("m", cache_dir=str(tmp_path)).get_many(["what is a bms?"]) == [None]
@@ -0,0 +1,140 @@
+# tests/test_ingest_pipeline.py
+import os
+import tempfile
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("fitz")
+
+from benchmarks.corpus import make_corpus, make_pages, make_pdf
+from benchmarks.fakes import FakeBlobHandler, FakeVectorStore, FakeGeminiClient, FakeEmbedder
+from app.core.ingest_pipeline import IngestionPipeline
+from app.core.rag_engine import RAGPipeline
+
+CONTAINER = "bench"
+
+
+class BatchRecordingEmbedder(FakeEmbedder):
+    def __init__(self, fail_on: str = None):
+        super().__init__()
+        self.batches = []
+        self.fail_on = fail_on
+
+    def embed(self, texts, persist: bool = True):
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        if self.fail_on is not None and any(self.fail_on in text for text in texts):
+            raise RuntimeError("embedding service unavailable")
+        self.batches.append(len(texts))
+        return super().embed(texts, persist)
+
+
+class FlakyDownloadBlobHandler(FakeBlobHandler):
+    def __init__(self, broken: str, **kwargs):
+        super().__init__(**kwargs)
+        self.broken = broken
+
+    def download_file(self, container_name: str, blob_name: str, download_path: str):
+        if blob_name == self.broken:
+            with open(download_path, "wb") as f:
+                f.write(b"%PDF-partial")
+            raise ConnectionError("download interrupted")
+        super().download_file(container_name, blob_name, download_path)
+
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    """Private temp dir so leftover download files can be counted."""
+    path = tmp_path / "tmp"
+    path.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(path))
+    return path
+
+
+def setup(isolated_settings, blob=None, embedder=None, documents: int = 3):
+    blob = blob or FakeBlobHandler(container_name=CONTAINER)
+    for name, data, _ in make_corpus(documents, 2):
+        blob.put(name, data)
+    rag = RAGPipeline(blob=blob, embedder=embedder or BatchRecordingEmbedder(),
+                      vectorstore=FakeVectorStore(), llm=FakeGeminiClient())
+    return rag, blob.list_blob_properties(CONTAINER)
+
+
+def test_embed_batches_span_files_at_a_fixed_size(isolated_settings, temp_dir):
+    rag, blobs = setup(isolated_settings)
+    failed = IngestionPipeline(rag, embed_batch_size=4, extract_workers=2).run(CONTAINER, blobs)
+
+    assert failed == set()
+    batches = rag.embedder.batches
+    assert sum(batches) == len(rag.vectorstore) > 4
+    assert all(size == 4 for size in batches[:-1])
+    assert sorted(rag.manifest.blob_names()) == sorted(blob["name"] for blob in blobs)
+    assert os.listdir(temp_dir) == []
+
+
+def test_failed_download_only_fails_that_file(isolated_settings, temp_dir):
+    names = [name for name, _, _ in make_corpus(3, 2)]
+    rag, blobs = setup(isolated_settings, blob=FlakyDownloadBlobHandler(names[1], container_name=CONTAINER))
+    failed = IngestionPipeline(rag, extract_workers=2).run(CONTAINER, blobs)
+
+    assert failed == {names[1]}
+    assert sorted(rag.manifest.blob_names()) == [names[0], names[2]]
+    assert os.listdir(temp_dir) == []
+
+
+def test_embed_failure_leaves_file_unrecorded_for_retry(isolated_settings, temp_dir):
+    rag, blobs = setup(isolated_settings, embedder=BatchRecordingEmbedder(fail_on=""), documents=1)
+    assert IngestionPipeline(rag, extract_workers=1).run(CONTAINER, blobs) == {blobs[0]["name"]}
+    assert rag.manifest.blob_names() == [] and len(rag.vectorstore) == 0
+
+    rag.embedder.fail_on = None
+    assert IngestionPipeline(rag, extract_workers=1).run(CONTAINER, blobs) == set()
+    assert list(rag.manifest.blob_names()) == [blobs[0]["name"]]
+    assert len(rag.vectorstore) == sum(rag.embedder.batches)
+
+
+class FailingUpsertVectorStore(FakeVectorStore):
+    """Accepts the first `ok` upsert calls, then fails like a Pinecone outage."""
+
+    def __init__(self, ok: int):
+        super().__init__()
+        self.ok = ok
+
+    def upsert_embeddings(self, *args, **kwargs):
+        if self.ok <= 0:
+            raise ConnectionError("vector store unavailable")
+        self.ok -= 1
+        return super().upsert_embeddings(*args, **kwargs)
+
+
+def snapshot(rag, name):
+    ids = sorted(rag.manifest.chunk_hashes(name))
+    return {
+        "vectors": sorted(rag.vectorstore._ids),
+        "lexical": sorted(vid for vid, alive in zip(rag.lexical._ids, rag.lexical._alive) if alive),
+        "chunks": sorted(rag.chunk_store._offsets),
+        "manifest": ids,
+    }
+
+
+def test_failed_update_leaves_every_store_on_the_old_version(isolated_settings, temp_dir):
+    rag, blobs = setup(isolated_settings, documents=1)
+    name = blobs[0]["name"]
+    IngestionPipeline(rag, extract_workers=1).run(CONTAINER, blobs)
+    before = snapshot(rag, name)
+
+    edited = [page.replace("page", "revised page") for page in make_pages(0, 2)]
+    rag.blob.put(name, make_pdf(edited))
+    rag.embedder.fail_on = ""
+    assert IngestionPipeline(rag, extract_workers=1).run(CONTAINER, rag.blob.list_blob_properties()) == {name}
+    assert snapshot(rag, name) == before
+
+
+def test_partial_upsert_is_rolled_back(isolated_settings, temp_dir):
+    rag, blobs = setup(isolated_settings, documents=1)
+    rag.vectorstore = FailingUpsertVectorStore(ok=1)
+    failed = IngestionPipeline(rag, embed_batch_size=2, extract_workers=1, upsert_workers=1).run(CONTAINER, blobs)
+
+    assert failed == {blobs[0]["name"]}
+    assert len(rag.vectorstore) == 0
+    assert len(rag.chunk_store) == 0
+    assert rag.lexical.query("document page") == []
@@ -0,0 +1,125 @@
+# tests/test_ingestion.py
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("fitz")
+
+from benchmarks.corpus import make_corpus, make_pages, make_pdf
+from benchmarks.fakes import FakeBlobHandler, FakeVectorStore, FakeGeminiClient, FakeEmbedder
+from app.core.rag_engine import RAGPipeline
+
+CONTAINER = "bench"
+
+
+class CountingEmbedder(FakeEmbedder):
+    def __init__(self, model_name: str = None):
+        super().__init__()
+        if model_name:
+            self.model_name = model_name
+        self.texts = 0
+
+    def embed(self, texts, persist: bool = True):
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        self.texts += len(texts)
+        return super().embed(texts, persist)
+
+
+class FailingListingBlobHandler(FakeBlobHandler):
+    """Yields one blob, then fails like a dropped Azure connection."""
+
+    def iter_blobs(self, prefix: str = None, container_name: str = None, exclude_prefixes=()):
+        yield from list(super().iter_blobs(prefix, container_name, exclude_prefixes))[:1]
+        raise ConnectionError("listing interrupted")
+
+
+def make_blob(cls=FakeBlobHandler, documents: int = 3):
+    blob = cls(container_name=CONTAINER)
+    for name, data, _ in make_corpus(documents, 2):
+        blob.put(name, data)
+    return blob
+
+
+def make_pipeline(blob, embedder=None, vectorstore=None):
+    return RAGPipeline(blob=blob, embedder=embedder or CountingEmbedder(),
+                       vectorstore=vectorstore or FakeVectorStore(), llm=FakeGeminiClient())
+
+
+def test_second_run_skips_unchanged_blobs(isolated_settings):
+    blob = make_blob()
+    rag = make_pipeline(blob)
+    rag.process_blobs(CONTAINER)
+    embedded = rag.embedder.texts
+    assert embedded > 0 and len(rag.vectorstore) == embedded
+
+    rag.process_blobs(CONTAINER)
+    assert rag.embedder.texts == embedded
+
+
+def test_embedding_model_change_reembeds_every_chunk(isolated_settings):
+    blob = make_blob()
+    first = make_pipeline(blob, CountingEmbedder("model-a"))
+    first.process_blobs(CONTAINER)
+    chunks = len(first.vectorstore)
+
+    store = first.vectorstore
+    second = make_pipeline(blob, CountingEmbedder("model-b"), vectorstore=store)
+    second.process_blobs(CONTAINER)
+    assert second.embedder.texts == chunks
+    assert len(store) == chunks   # same ids, overwritten in place
+    assert not any(second.manifest.needs_reembed(name) for name in second.manifest.blob_names())
+
+    # ...and only once
+    third = make_pipeline(blob, CountingEmbedder("model-b"), vectorstore=store)
+    third.process_blobs(CONTAINER)
+    assert third.embedder.texts == 0
+
+
+def test_removed_blob_loses_its_vectors(isolated_settings):
+    blob = make_blob()
+    rag = make_pipeline(blob)
+    rag.process_blobs(CONTAINER)
+    removed = sorted(blob.list_files())[0]
+    removed_ids = list(rag.manifest.chunk_hashes(removed))
+    del blob._blobs[removed]
+
+    rag.process_blobs(CONTAINER)
+    assert removed not in rag.manifest.blob_names()
+    assert len(rag.vectorstore) == rag.embedder.texts - len(removed_ids)
+    assert not any(vid in rag.chunk_store for vid in removed_ids)
+
+
+def test_listing_failure_deletes_nothing(isolated_settings):
+    rag = make_pipeline(make_blob())
+    rag.process_blobs(CONTAINER)
+    blobs, vectors, chunks = sorted(rag.manifest.blob_names()), len(rag.vectorstore), len(rag.chunk_store)
+
+    failing = make_pipeline(make_blob(FailingListingBlobHandler), vectorstore=rag.vectorstore)
+    with pytest.raises(ConnectionError):
+        failing.process_blobs(CONTAINER)
+    assert sorted(failing.manifest.blob_names()) == blobs
+    assert len(rag.vectorstore) == vectors
+    assert len(failing.chunk_store) == chunks
+
+
+def test_edit_on_first_page_keeps_later_chunks(isolated_settings):
+    blob = FakeBlobHandler(container_name=CONTAINER)
+    pages = make_pages(0, 10)
+    blob.put("documents/manual.pdf", make_pdf(pages))
+    rag = make_pipeline(blob)
+    rag.process_blobs(CONTAINER)
+    before = rag.manifest.chunk_locations("documents/manual.pdf")
+    embedded = rag.embedder.texts
+
+    pages[0] = pages[0].replace("\n", "\nRevised ", 1)
+    blob.put("documents/manual.pdf", make_pdf(pages))
+    rag.process_blobs(CONTAINER)
+
+    after = rag.manifest.chunk_locations("documents/manual.pdf")
+    kept = before.keys() & after.keys()
+    assert len(kept) >= len(after) - 2
+    assert rag.embedder.texts - embedded <= 2
+    # Kept chunks moved by the inserted word; their vectors carry the new offsets
+    moved = [vid for vid in kept if before[vid]["char_start"] != after[vid]["char_start"]]
+    assert moved
+    rows = {vid: rag.vectorstore._metadata[row] for vid, row in rag.vectorstore._id_to_row.items()}
+    assert all(rows[vid]["char_start"] == after[vid]["char_start"] for vid in moved)
@@ -0,0 +1,34 @@
+# tests/test_json_stream.py
+import json
+from app.core.json_stream import IncrementalJSONParser
+
+
+def stream(text, cut):
+    parser = IncrementalJSONParser()
+    return parser.feed(text[:cut]) + parser.feed(text[cut:])
+
+
+def test_answer_is_decoded_whatever_the_chunk_boundaries():
+    raw = "```json\n" + json.dumps({"answer": 'Cells "A" \\ B\n\tend', "relevant_documents": []}) + "\n```"
+    for cut in range(len(raw)):
+        assert stream(raw, cut) == 'Cells "A" \\ B\n\tend'
+
+
+def test_surrogate_pairs_become_one_character():
+    raw = json.dumps({"answer": "Charge 🔋 done"})   # ensure_ascii → 🔋
+    assert "\\ud83d\\udd0b" in raw
+    for cut in range(len(raw)):
+        answer = stream(raw, cut)
+        assert answer == "Charge 🔋 done"
+        answer.encode("utf-8")
+
+
+def test_unpaired_surrogates_are_replaced():
+    raw = '{"answer": "a\\ud83d\\nb\\udd0bc"}'
+    assert stream(raw, len(raw)) == "a�\nb�c"
+
+
+def test_malformed_unicode_escapes_are_replaced():
+    raw = '{"answer": "a\\uZZ12b \\ud83d\\u12G4 c\\u12"}'
+    for cut in range(len(raw)):
+        assert stream(raw, cut) == "a�ZZ12b ��12G4 c�12"
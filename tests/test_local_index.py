@@ -0,0 +1,42 @@
+# tests/test_local_index.py
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.core.local_index import LocalVectorIndex
+
+
+def unit(*values):
+    return np.asarray(values, dtype=np.float32)
+
+
+def test_exact_search_ranks_by_cosine(tmp_path):
+    index = LocalVectorIndex(path=str(tmp_path), mode="exact", store_text=True)
+    index.upsert_embeddings(["x", "y"], [unit(1, 0), unit(0, 1)], file_name="f", ids=["a", "b"])
+    matches = index.query(unit(0.9, 0.1), top_k=2)
+    assert [match["id"] for match in matches] == ["a", "b"]
+    assert matches[0]["metadata"] == {"source": "f", "text": "x"}
+
+
+def test_query_reloads_after_another_process_flushes(tmp_path):
+    writer = LocalVectorIndex(path=str(tmp_path), mode="exact")
+    writer.upsert_embeddings(["x"], [unit(1, 0)], file_name="f", ids=["a"])
+    writer.flush()
+    reader = LocalVectorIndex(path=str(tmp_path), mode="exact")
+
+    writer.upsert_embeddings(["y"], [unit(0, 1)], file_name="f", ids=["b"])
+    writer.delete(["a"])
+    writer.flush()
+    assert [match["id"] for match in reader.query(unit(0, 1), top_k=5)] == ["b"]
+
+
+def test_unsaved_writes_are_not_discarded_by_reload(tmp_path):
+    writer = LocalVectorIndex(path=str(tmp_path), mode="exact")
+    writer.upsert_embeddings(["x"], [unit(1, 0)], file_name="f", ids=["a"])
+    writer.flush()
+    other = LocalVectorIndex(path=str(tmp_path), mode="exact")
+    other.upsert_embeddings(["y"], [unit(0, 1)], file_name="f", ids=["b"])
+
+    writer.upsert_embeddings(["z"], [unit(1, 1)], file_name="f", ids=["c"])
+    writer.flush()
+    assert {match["id"] for match in other.query(unit(1, 0), top_k=5)} == {"a", "b"}
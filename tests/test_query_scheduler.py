@@ -0,0 +1,168 @@
+# tests/test_query_scheduler.py
+import time
+import threading
+import types
+
+from app.core.query_scheduler import QueryScheduler
+
+
+class GatedRag:
+    """Stands in for RAGPipeline; each question blocks until `release()` lets it finish."""
+
+    cache = None
+    manifest = types.SimpleNamespace(version=0)
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+        self._gates = {}
+
+    @staticmethod
+    def _cache_lookup(tier, lookup, key, top_k, version):
+        return lookup(key, top_k, version)
+
+    def _gate(self, question):
+        with self._lock:
+            return self._gates.setdefault(question, threading.Event())
+
+    def release(self, *questions):
+        for question in questions:
+            self._gate(question).set()
+
+    def query(self, question, top_k=5):
+        with self._lock:
+            self.calls.append(question)
+        self._gate(question).wait(5)
+        if question.startswith("boom"):
+            raise ValueError(question)
+        return {"answer": f"answer to {question}", "relevant_documents": []}
+
+    def query_stream(self, question, top_k=5):
+        yield {"type": "sources", "sources": []}
+        response = self.query(question, top_k)
+        yield {"type": "token", "text": response["answer"]}
+        yield {"type": "final", "response": response}
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def spawn(fn, *args):
+    box = {}
+
+    def run():
+        try:
+            box["result"] = fn(*args)
+        except Exception as e:
+            box["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, box
+
+
+def test_equal_questions_share_one_execution():
+    rag = GatedRag()
+    scheduler = QueryScheduler(rag, max_concurrency=4, max_queue=10, deadline=5)
+    leader = spawn(scheduler.query, "What is a BMS?", "u1")
+    wait_for(lambda: rag.calls)
+    followers = [
+        spawn(scheduler.query, "what is a  bms", "u2"),
+        spawn(lambda: list(scheduler.stream("WHAT IS A BMS?", "u3"))[-1]["response"]),
+    ]
+    time.sleep(0.05)
+    rag.release("What is a BMS?")
+
+    for thread, box in [leader] + followers:
+        thread.join(5)
+        assert box["result"]["answer"] == "answer to What is a BMS?"
+    assert rag.calls == ["What is a BMS?"]
+    assert scheduler._inflight == {}
+
+
+def test_waiting_users_are_served_round_robin():
+    rag = GatedRag()
+    scheduler = QueryScheduler(rag, max_concurrency=1, max_queue=10, deadline=5)
+    rag.release("a1", "a2", "a3", "b1")
+    threads = [spawn(scheduler.query, "hold", "a")]
+    wait_for(lambda: rag.calls == ["hold"])
+    for question, user in [("a1", "a"), ("a2", "a"), ("a3", "a"), ("b1", "b")]:
+        queued = scheduler._queued
+        threads.append(spawn(scheduler.query, question, user))
+        wait_for(lambda: scheduler._queued == queued + 1)
+
+    rag.release("hold")
+    for thread, _ in threads:
+        thread.join(5)
+    assert rag.calls == ["hold", "a1", "b1", "a2", "a3"]
+    assert (scheduler._active, scheduler._queued) == (0, 0)
+
+
+def test_full_queue_and_deadline_shed_load():
+    rag = GatedRag()
+    scheduler = QueryScheduler(rag, max_concurrency=1, max_queue=1, deadline=0.2)
+    holder = spawn(scheduler.query, "hold", "a")
+    wait_for(lambda: rag.calls == ["hold"])
+    waiting = spawn(scheduler.query, "late", "b")
+    wait_for(lambda: scheduler._queued == 1)
+
+    assert scheduler.query("rejected", "c") == scheduler.busy_response
+    waiting[0].join(5)
+    assert waiting[1]["result"] == scheduler.busy_response
+    rag.release("hold")
+    holder[0].join(5)
+    assert rag.calls == ["hold"]
+    assert (scheduler._active, scheduler._queued) == (0, 0)
+
+
+def test_leader_error_reaches_followers_and_frees_the_slot():
+    rag = GatedRag()
+    scheduler = QueryScheduler(rag, max_concurrency=1, max_queue=10, deadline=5)
+    leader = spawn(scheduler.query, "boom", "u1")
+    wait_for(lambda: rag.calls)
+    follower = spawn(scheduler.query, "Boom", "u2")
+    time.sleep(0.05)
+    rag.release("boom")
+
+    for thread, box in (leader, follower):
+        thread.join(5)
+        assert isinstance(box["error"], ValueError)
+    assert rag.calls == ["boom"]
+    assert (scheduler._inflight, scheduler._active) == ({}, 0)
+
+
+def test_abandoned_stream_releases_followers():
+    rag = GatedRag()
+    rag.release("early")
+    scheduler = QueryScheduler(rag, max_concurrency=1, max_queue=10, deadline=5)
+    stream = scheduler.stream("early", "u1")
+    next(stream)
+    stream.close()
+    assert (scheduler._inflight, scheduler._active) == ({}, 0)
+
+
+class ExpiringCache:
+    """Exact-match cache whose only entry expires after the first lookup."""
+
+    def __init__(self, response):
+        self.response = response
+        self.lookups = 0
+
+    def get_exact(self, question, top_k, version):
+        self.lookups += 1
+        return self.response if self.lookups == 1 else None
+
+
+def test_cache_hit_is_served_from_the_first_lookup():
+    for consume in (lambda s: s.query("cached", "u1"), lambda s: list(s.stream("cached", "u1"))[-1]["response"]):
+        rag = GatedRag()
+        rag.cache = ExpiringCache({"answer": "from cache", "relevant_documents": []})
+        scheduler = QueryScheduler(rag, max_concurrency=1, max_queue=0, deadline=0.1)
+
+        assert consume(scheduler) == {"answer": "from cache", "relevant_documents": []}
+        assert rag.cache.lookups == 1
+        assert rag.calls == []
@@ -0,0 +1,164 @@
+# tests/test_rag_engine.py
+import re
+import json
+import asyncio
+import time
+import threading
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from benchmarks.fakes import FakeEmbedder, FakeVectorStore, FakeGeminiClient
+from app.core.config import settings
+from app.core.rag_engine import RAGPipeline
+
+_QUESTION_RE = re.compile(r"Question:\s*(Q\d+)")
+
+
+class EchoLLM(FakeGeminiClient):
+    """Answers with the question's id; `delay(id)` seconds per call."""
+
+    def __init__(self, delay=lambda qid: 0.0):
+        super().__init__()
+        self.delay = delay
+        self.asked = []
+        self.cancelled = None
+        self._lock = threading.Lock()
+
+    def generate_response(self, prompt: str):
+        qid = _QUESTION_RE.search(prompt).group(1)
+        with self._lock:
+            self.asked.append(qid)
+        time.sleep(self.delay(qid))
+        return json.dumps({"answer": qid, "relevant_documents": []})
+
+    async def agenerate_text(self, prompt: str):
+        qid = _QUESTION_RE.search(prompt).group(1)
+        with self._lock:
+            self.asked.append(qid)
+        try:
+            await asyncio.sleep(self.delay(qid))
+        except asyncio.CancelledError:
+            self.cancelled = qid
+            raise
+        return json.dumps({"answer": qid, "relevant_documents": []})
+
+
+@pytest.fixture
+def rag_factory(isolated_settings, monkeypatch):
+    monkeypatch.setattr(isolated_settings, "HYBRID_SEARCH", False)
+    monkeypatch.setattr(isolated_settings, "CHUNK_STORE_ENABLED", False)
+
+    built = []
+
+    def build(llm):
+        embedder = FakeEmbedder()
+        vectorstore = FakeVectorStore()
+        texts = ["lithium cells age slowly", "sodium cells tolerate cold", "lead acid needs float charging"]
+        vectorstore.upsert_embeddings(texts, embedder.embed(texts), file_name="doc.pdf", ids=["a", "b", "c"])
+        built.append(RAGPipeline(embedder=embedder, vectorstore=vectorstore, llm=llm, profile="query"))
+        return built[-1]
+
+    yield build
+    for rag in built:
+        rag.close()
+
+
+def questions(count):
+    return [f"Q{i} how do cells age?" for i in range(count)]
+
+
+def test_batch_yields_in_input_order_across_windows(rag_factory):
+    # Later questions finish first; answers must still come back in input order
+    rag = rag_factory(EchoLLM(delay=lambda qid: 0.02 * (10 - int(qid[1:]))))
+    records = list(rag.query_batch(questions(10), window=3, llm_concurrency=4))
+
+    assert [record["index"] for record in records] == list(range(10))
+    assert [record["response"]["answer"] for record in records] == [f"Q{i}" for i in range(10)]
+
+
+def test_checkpoint_resume_skips_answered_and_malformed_records(rag_factory, tmp_path):
+    path = str(tmp_path / "answers.ndjson")
+    asked = questions(6)
+    first = list(rag_factory(EchoLLM()).query_batch(asked, checkpoint_path=path, window=2))
+
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(lines[:3])
+        f.write(json.dumps({"index": 3, "question": asked[3]}) + "\n")                 # no response
+        f.write(json.dumps({"index": 4, "question": "edited", "response": {}}) + "\n")  # other question
+        f.write("[1, 2]\n")
+        f.write(lines[5][: len(lines[5]) // 2])                                         # torn last line
+
+    llm = EchoLLM()
+    resumed = list(rag_factory(llm).query_batch(asked, checkpoint_path=path, window=2))
+    assert sorted(llm.asked) == ["Q3", "Q4", "Q5"]
+    assert [record["response"] for record in resumed] == [record["response"] for record in first]
+
+
+def test_closing_the_batch_early_cancels_queued_llm_calls(rag_factory):
+    llm = EchoLLM(delay=lambda qid: 0.05)
+    batch = rag_factory(llm).query_batch(questions(20), window=2, llm_concurrency=1)
+
+    assert next(batch)["index"] == 0
+    batch.close()
+    asked = len(llm.asked)
+    time.sleep(0.2)
+    assert len(llm.asked) == asked < 20
+
+
+class RecordingChatLog:
+    def __init__(self):
+        self.records = []
+
+    def log(self, username, question, response):
+        self.records.append((username, question, response["answer"]))
+
+
+def test_aquery_answers_and_logs_in_the_background(rag_factory):
+    rag = rag_factory(EchoLLM())
+    chat_log = RecordingChatLog()
+
+    async def ask():
+        response = await rag.aquery("Q1 how do cells age?", username="ana", chat_log=chat_log)
+        await asyncio.gather(*rag._background_tasks)
+        return response
+
+    assert asyncio.run(ask())["answer"] == "Q1"
+    assert chat_log.records == [("ana", "Q1 how do cells age?", "Q1")]
+
+
+def test_aquery_stage_timeout_raises(rag_factory, monkeypatch):
+    monkeypatch.setattr(settings, "ASYNC_LLM_TIMEOUT", 0.05)
+    llm = EchoLLM(delay=lambda qid: 1.0)
+    rag = rag_factory(llm)
+
+    with pytest.raises(TimeoutError, match="llm"):
+        asyncio.run(rag.aquery("Q2 how do cells age?"))
+    assert llm.cancelled == "Q2"
+
+
+def test_cancelling_aquery_abandons_the_llm_call(rag_factory):
+    llm = EchoLLM(delay=lambda qid: 5.0)
+    rag = rag_factory(llm)
+    chat_log = RecordingChatLog()
+
+    async def ask_then_cancel():
+        task = asyncio.create_task(rag.aquery("Q3 how do cells age?", chat_log=chat_log))
+        while not llm.asked:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(ask_then_cancel())
+    assert llm.cancelled == "Q3"
+    assert chat_log.records == []
+
+
+def test_close_shuts_down_the_embedding_executor(rag_factory):
+    with rag_factory(EchoLLM()) as rag:
+        asyncio.run(rag.aquery("Q4 how do cells age?"))
+    with pytest.raises(RuntimeError):
+        rag._embed_executor.submit(print)
@@ -0,0 +1,30 @@
+# tests/test_retrieval_gate.py
+from app.core.retrieval_gate import RetrievalGate
+
+
+def match(text, score=0.9, source="doc.pdf"):
+    return {"id": text[:8], "score": score, "metadata": {"source": source, "text": text}}
+
+
+def test_decisions_follow_thresholds():
+    gate = RetrievalGate(low=0.3, high=0.8)
+    assert gate.decide([]) == ("no_info", None)
+    assert gate.decide([match("x", 0.2)])[0] == "no_info"
+    assert gate.decide([match("x", 0.5)])[0] == "llm"
+    assert gate.decide([match("x", 0.85)])[0] == "extractive"
+    # Hybrid results are judged by their dense similarity, not the fused rank score
+    assert gate.decide([{**match("x", 0.03), "dense_score": 0.9}])[0] == "extractive"
+
+
+def test_function_words_alone_do_not_make_an_extractive_answer():
+    gate = RetrievalGate(low=0.0, high=0.8, min_coverage=0.7)
+    results = [match("What is the energy density of the NMC-811 cells? It is high for the pack.")]
+    assert gate.extractive_answer("What is the cold-temperature performance of sodium ion cells?", results) is None
+
+
+def test_extractive_answer_when_question_is_covered():
+    gate = RetrievalGate(low=0.0, high=0.8, min_coverage=0.7)
+    results = [match("Intro text. Sodium ion cells keep their cold-temperature performance down to -20 C. Other.")]
+    response = gate.extractive_answer("What is the cold-temperature performance of sodium ion cells?", results)
+    assert response["answer"] == "Sodium ion cells keep their cold-temperature performance down to -20 C."
+    assert response["relevant_documents"] == [{"filename": "doc.pdf", "matched_chunks": [response["answer"]]}]
@@ -0,0 +1,38 @@
+# tests/test_text_extractor.py
+import io
+import glob
+import os
+import tempfile
+import pytest
+
+pytest.importorskip("fitz")
+
+from benchmarks.corpus import make_pages, make_pdf
+from app.core.text_extractor import TextExtractor
+
+
+@pytest.fixture
+def pdf_bytes():
+    return make_pdf(make_pages(0, 6))
+
+
+def test_parallel_extraction_matches_serial(pdf_bytes, tmp_path, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "PDF_PARALLEL_PAGE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "PDF_EXTRACT_WORKERS", 2)
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(pdf_bytes)
+    before = set(glob.glob(os.path.join(tempfile.gettempdir(), "*.pdf")))
+
+    serial = list(TextExtractor.iter_pages(pdf_bytes, file_name="doc.pdf", parallel=False))
+    assert len(serial) == 6
+    assert list(TextExtractor.iter_pages(pdf_bytes, file_name="doc.pdf")) == serial
+    assert list(TextExtractor.iter_pages(str(path))) == serial
+    # The spilled copy of the in-memory PDF is cleaned up
+    assert set(glob.glob(os.path.join(tempfile.gettempdir(), "*.pdf"))) <= before
+
+
+def test_file_objects_are_rejected(pdf_bytes):
+    # Ingestion hands workers a downloaded file's path; streams are not a supported input
+    with pytest.raises(TypeError):
+        list(TextExtractor.iter_pages(io.BytesIO(pdf_bytes), file_name="doc.pdf"))